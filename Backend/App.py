@@ -29,6 +29,21 @@ app.config['SECRET_KEY'] = os.getenv('SECRET_KEY')
 # Setup logging
 setup_logging(app)
 
+# Metrics and slow query log: Mongo command listeners must be registered before any MongoClient exists
+from metrics import init_metrics, register_mongo_listener
+from slow_queries import register_slow_query_listener
+register_mongo_listener()
+register_slow_query_listener()
+init_metrics(app)
+
+# On-demand request profiling (signed header, admin flag or sampled traffic)
+from profiling import init_profiling
+init_profiling(app)
+
+# Structured debug tracing (TRACE_MODULES or an X-Trace: 1 request header)
+from tracing import init_tracing
+init_tracing(app)
+
 
 if os.getenv('FLASK_ENV') == 'production':
     CORS(app,
@@ -45,7 +60,7 @@ if os.getenv('FLASK_ENV') == 'production':
      methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
      allow_headers=["Content-Type", "Authorization", "X-Requested-With"],
      supports_credentials=True,
-     expose_headers=["Content-Type", "Authorization"]  # CRITICAL
+     expose_headers=["Content-Type", "Authorization", "X-Next-Cursor", "X-Has-More"]  # CRITICAL
 
 )
 else:
@@ -53,6 +68,7 @@ else:
          origins=["http://localhost:4200"],
          methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
          allow_headers=["Content-Type", "Authorization"],
+         expose_headers=["X-Next-Cursor", "X-Has-More"],
          supports_credentials=True)
 
 jwt = JWTManager(app)
@@ -94,6 +110,18 @@ app.config['DB_CONNECTION_AVAILABLE'] = db_connection_available
 from health_check import create_health_check
 create_health_check(app, db)
 
+# bcrypt runs on a bounded pool; a saturated pool answers 429
+from password_hashing import init_password_hashing
+init_password_hashing(app)
+
+# Rate limit counters are shared across workers when RATE_LIMIT_BACKEND=mongo
+from rate_limiting import init_rate_limiting
+init_rate_limiting(app, db)
+
+# Ended admin sessions are rejected through an in-memory JTI blocklist
+from token_revocation import init_token_revocation
+init_token_revocation(app, jwt, db)
+
 @app.route('/api/db_status', methods=['GET'])
 def db_status():
     try:
@@ -124,7 +152,7 @@ def db_status():
 
 # === REGISTER BLUEPRINTS (ALL IMPORTS BEFORE USE) ===
 from auth import auth_bp
-from admin_auth import admin_auth_bp
+from admin_auth import admin_auth_bp, init_mfa
 from routes import routes_bp
 
 # Optional: manage_resources
@@ -138,6 +166,9 @@ app.register_blueprint(auth_bp, url_prefix='/api')
 app.register_blueprint(admin_auth_bp, url_prefix='/api')
 app.register_blueprint(routes_bp, url_prefix='/api')
 
+# Loads qrcode/Pillow in the background so the first MFA setup is not slow
+init_mfa(app)
+
 # === JWT ERROR HANDLERS ===
 @jwt.invalid_token_loader
 def invalid_token_callback(error_string):
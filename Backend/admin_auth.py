@@ -1,7 +1,6 @@
-from flask import Blueprint, request, jsonify, current_app
-from flask_jwt_extended import jwt_required, get_jwt_identity, create_access_token, create_refresh_token
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity, create_access_token, create_refresh_token, verify_jwt_in_request
 from datetime import datetime, timedelta
-import bcrypt
 import pyotp
 import io
 import base64
@@ -13,29 +12,37 @@ import os
 from dotenv import load_dotenv
 import re
 from functools import wraps
-import time
-from collections import defaultdict, deque
+import threading
 import pyotp
 import hashlib
+import queue
+import time
+from itsdangerous import URLSafeTimedSerializer
+from audit_writer import audit_writer
+from password_hashing import password_hasher
+from rate_limiting import rate_limiter, rate_limit, limit_blueprint, client_ip
+from admin_identity import admin_identity_cache, resolve_admin_identity, ADMIN_ROLES
+from token_revocation import revocation_set
+from pymongo import ReturnDocument
+from data_retention import collection_storage_stats, CONFLICT_ARCHIVE_AFTER_DAYS
+from log_retention import LOG_RETENTION_DAYS
 
 # Import notification service
 try:
-    from notification_service import notification_service
+    from notification_service import notification_service, NOTIFICATION_READ_TTL_DAYS
 except ImportError:
     # Fallback if notification service is not available
     notification_service = None
+    NOTIFICATION_READ_TTL_DAYS = None
 
 load_dotenv()
 
 admin_auth_bp = Blueprint('admin_auth', __name__)
+limit_blueprint(admin_auth_bp, 'admin')
 
 # Use the same MongoDB connection as the main app
 # The connection will be set up in App.py and we'll access it through current_app
 
-# Rate limiting storage
-rate_limit_storage = defaultdict(lambda: deque(maxlen=10))
-blocked_accounts = {}
-
 # Security Configuration
 MAX_LOGIN_ATTEMPTS = 5
 BLOCK_DURATION = 30 * 60  # 30 minutes
@@ -45,14 +52,13 @@ PASSWORD_MIN_LENGTH = 12
 class SecurityService:
     @staticmethod
     def hash_password(password: str) -> str:
-        """Hash password with bcrypt"""
-        salt = bcrypt.gensalt()
-        return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+        """Hash password with bcrypt on the bounded hashing pool"""
+        return password_hasher.hash(password)
     
     @staticmethod
     def verify_password(password: str, hashed: str) -> bool:
-        """Verify password against hash"""
-        return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+        """Verify password against hash on the bounded hashing pool"""
+        return password_hasher.verify(password, hashed)
     
     @staticmethod
     def validate_admin_username(username: str) -> bool:
@@ -89,53 +95,51 @@ class SecurityService:
     def generate_device_fingerprint(request) -> str:
         """Generate device fingerprint from request"""
         user_agent = request.headers.get('User-Agent', '')
-        ip_address = request.remote_addr or ''
+        ip_address = client_ip()
         accept_language = request.headers.get('Accept-Language', '')
         
         fingerprint_data = f"{user_agent}|{ip_address}|{accept_language}"
         return hashlib.sha256(fingerprint_data.encode()).hexdigest()[:32]
 
 class RateLimiter:
+    """Failed admin logins, counted per username/IP in the shared rate limiter"""
+
+    @staticmethod
+    def _attempts_key(username: str, ip_address: str) -> str:
+        return f"admin_login:{username}:{ip_address}"
+
     @staticmethod
     def is_rate_limited(username: str, ip_address: str) -> bool:
         """Check if username/IP is rate limited"""
-        current_time = time.time()
-        
         # Check if account is blocked
-        if username in blocked_accounts:
-            if current_time < blocked_accounts[username]:
-                return True
-            else:
-                del blocked_accounts[username]
-        
-        # Check rate limiting
-        key = f"{username}:{ip_address}"
-        attempts = rate_limit_storage[key]
-        
-        # Remove old attempts outside the window
-        while attempts and attempts[0] < current_time - RATE_LIMIT_WINDOW:
-            attempts.popleft()
-        
-        return len(attempts) >= MAX_LOGIN_ATTEMPTS
+        if rate_limiter.is_blocked(f"admin_account:{username}"):
+            return True
+
+        attempts = rate_limiter.count(RateLimiter._attempts_key(username, ip_address), RATE_LIMIT_WINDOW)
+        return attempts >= MAX_LOGIN_ATTEMPTS
     
     @staticmethod
     def record_attempt(username: str, ip_address: str, success: bool):
         """Record login attempt"""
-        current_time = time.time()
-        key = f"{username}:{ip_address}"
+        key = RateLimiter._attempts_key(username, ip_address)
         
         if not success:
-            rate_limit_storage[key].append(current_time)
-            
             # Check if we should block the account
-            if len(rate_limit_storage[key]) >= MAX_LOGIN_ATTEMPTS:
-                blocked_accounts[username] = current_time + BLOCK_DURATION
+            if rate_limiter.hit(key, RATE_LIMIT_WINDOW) >= MAX_LOGIN_ATTEMPTS:
+                rate_limiter.block(f"admin_account:{username}", BLOCK_DURATION)
         else:
-            # Clear attempts on successful login
-            if key in rate_limit_storage:
-                del rate_limit_storage[key]
-            if username in blocked_accounts:
-                del blocked_accounts[username]
+            # Clear attempts and any block on successful login
+            rate_limiter.reset(key, RATE_LIMIT_WINDOW)
+            rate_limiter.reset(f"admin_account:{username}", RATE_LIMIT_WINDOW)
+
+MFA_ISSUER = "Resource Optimizer Admin"
+# A pending MFA setup (secret and rendered QR) is served again for this long
+MFA_SETUP_TTL_MINUTES = int(os.getenv('MFA_SETUP_TTL_MINUTES', '15'))
+MFA_QR_PREWARM = os.getenv('MFA_QR_PREWARM', 'true').lower() == 'true'
+
+_mfa_prewarm_started = False
+_mfa_prewarm_lock = threading.Lock()
+
 
 class MFAService:
     @staticmethod
@@ -145,11 +149,11 @@ class MFAService:
     
     @staticmethod
     def generate_qr_code(username: str, secret: str) -> str:
-        import qrcode
         """Generate QR code for MFA setup"""
-        totp_uri = pyotp.totp.TOTP(secret).provisioning_uri(
+        import qrcode
+        totp_uri = pyotp.TOTP(secret).provisioning_uri(
             name=username,
-            issuer_name="Resource Optimizer Admin"
+            issuer_name=MFA_ISSUER
         )
         
         qr = qrcode.QRCode(version=1, box_size=10, border=5)
@@ -169,14 +173,35 @@ class MFAService:
     @staticmethod
     def verify_totp(secret: str, token: str) -> bool:
         """Verify TOTP token"""
-        totp = pyotp.TOTP(secret)
-        return totp.verify(token, valid_window=1)
+        if not secret or not token:
+            return False
+        return pyotp.TOTP(secret).verify(token, valid_window=1)
     
     @staticmethod
     def generate_backup_codes() -> list:
         """Generate backup codes"""
         return [secrets.token_hex(4).upper() for _ in range(10)]
 
+    @staticmethod
+    def prewarm_qr_renderer():
+        """Import qrcode and Pillow and render one QR, so the first real setup is not slow"""
+        try:
+            MFAService.generate_qr_code('prewarm', pyotp.random_base32())
+        except Exception as e:
+            print(f"⚠️ MFA QR pre-warm failed: {e}")
+
+
+def init_mfa(app):
+    """Pre-warm the MFA QR renderer in a daemon thread (once per process)"""
+    global _mfa_prewarm_started
+    if not MFA_QR_PREWARM:
+        return
+    with _mfa_prewarm_lock:
+        if _mfa_prewarm_started:
+            return
+        _mfa_prewarm_started = True
+    threading.Thread(target=MFAService.prewarm_qr_renderer, name='mfa-qr-prewarm', daemon=True).start()
+
 def get_db_connection():
     """Get database connection from Flask app context"""
     try:
@@ -212,9 +237,9 @@ def admin_required(f):
     @jwt_required()
     def decorated_function(*args, **kwargs):
         current_user_id = get_jwt_identity()
-        user = current_app.config['DB'].admin_users.find_one({'_id': ObjectId(current_user_id)})
+        identity = resolve_admin_identity(current_user_id, get_jwt(), get_admin_collections())
         
-        if not user or user.get('role') not in ['admin', 'super_admin']:
+        if not identity or not identity.get('isActive', True) or identity.get('role') not in ADMIN_ROLES:
             return jsonify({'error': 'Admin access required'}), 403
         
         return f(*args, **kwargs)
@@ -237,15 +262,16 @@ def log_admin_activity(action: str, details: dict, success: bool = True):
             'details': details,
             'success': success,
             'timestamp': datetime.utcnow(),
-            'ip_address': request.remote_addr if request else 'unknown',
+            'ip_address': client_ip() if request else 'unknown',
             'user_agent': request.headers.get('User-Agent') if request else 'unknown'
         }
         collections = get_admin_collections()
-        collections['admin_logs'].insert_one(log_entry)
+        audit_writer.write(collections['admin_logs'], log_entry)
     except Exception:
         pass
 
 @admin_auth_bp.route('/admin/login', methods=['POST'])
+@rate_limit(profile='login')
 def admin_login():
     
     print("🔍 Admin login attempt received")
@@ -263,7 +289,7 @@ def admin_login():
     
     print(f"🔍 Login attempt for username: {username}")
     
-    ip_address = request.remote_addr or 'unknown'
+    ip_address = client_ip()
     user_agent = request.headers.get('User-Agent', '')
     
     # Validate input
@@ -309,7 +335,8 @@ def admin_login():
     
     # Verify password
     print(f"🔍 Verifying password for: {username}")
-    if not SecurityService.verify_password(password, user['password']):
+    password_valid, upgraded_hash = password_hasher.verify_and_upgrade(password, user['password'])
+    if not password_valid:
         print(f"❌ Invalid password for: {username}")
         RateLimiter.record_attempt(username, ip_address, False)
         log_admin_activity('login_failed', {
@@ -348,16 +375,17 @@ def admin_login():
     )
     refresh_token = create_refresh_token(identity=str(user['_id']))
     
-    # Update last login
+    # Update last login, storing a re-hash if the password used an outdated cost
+    login_update = {
+        'last_login': datetime.utcnow(),
+        'last_ip': ip_address,
+        'login_attempts': 0
+    }
+    if upgraded_hash:
+        login_update['password'] = upgraded_hash
     collections['admin_users'].update_one(
         {'_id': user['_id']},
-        {
-            '$set': {
-                'last_login': datetime.utcnow(),
-                'last_ip': ip_address,
-                'login_attempts': 0
-            }
-        }
+        {'$set': login_update}
     )
     
     # Create session record
@@ -420,13 +448,19 @@ def admin_logout():
     token = request.headers.get('Authorization', '').replace('Bearer ', '')
     
     # Deactivate session
-    current_app.config['DB'].admin_sessions.update_one(
+    session = get_admin_collections()['admin_sessions'].find_one_and_update(
         {'admin_id': current_user_id, 'token': token},
-        {'$set': {'is_active': False, 'logged_out_at': datetime.utcnow()}}
+        {'$set': {'is_active': False, 'logged_out_at': datetime.utcnow()}},
+        return_document=ReturnDocument.AFTER
     )
+    claims = get_jwt()
+    revocation_set.revoke(claims.get('jti'), claims.get('exp'))
+    if session:
+        revocation_set.revoke_session(session)
+    admin_identity_cache.invalidate(current_user_id)
     
     log_admin_activity('logout', {
-        'ip_address': request.remote_addr
+        'ip_address': client_ip()
     })
     
     return jsonify({'message': 'Logged out successfully'}), 200
@@ -436,25 +470,11 @@ def admin_logout():
 def validate_token():
     """Validate admin token"""
     current_user_id = get_jwt_identity()
-    user = current_app.config['DB'].admin_users.find_one({'_id': ObjectId(current_user_id)})
+    user_data = resolve_admin_identity(current_user_id, get_jwt(), get_admin_collections(), profile=True)
     
-    if not user or not user.get('is_active', True):
+    if not user_data or not user_data.get('isActive', True):
         return jsonify({'error': 'Invalid token'}), 401
     
-    user_data = {
-        'id': str(user['_id']),
-        'username': user['username'],
-        'email': user.get('email'),
-        'role': user['role'],
-        'permissions': user.get('permissions', []),
-        'lastLogin': user.get('last_login'),
-        'mfaEnabled': user.get('mfa_enabled', False),
-        'department': user.get('department'),
-        'firstName': user.get('first_name'),
-        'lastName': user.get('last_name'),
-        'isActive': user.get('is_active', True)
-    }
-    
     return jsonify(user_data), 200
 
 @admin_auth_bp.route('/admin/mfa/generate', methods=['POST'])
@@ -462,18 +482,37 @@ def validate_token():
 def generate_mfa():
     """Generate MFA setup"""
     current_user_id = get_jwt_identity()
-    user = current_app.config['DB'].admin_users.find_one({'_id': ObjectId(current_user_id)})
+    user = resolve_admin_identity(current_user_id, get_jwt(), get_admin_collections())
     
     if not user:
         return jsonify({'error': 'User not found'}), 404
     
+    admin_users = get_admin_collections()['admin_users']
+    
+    # Serve a recent pending setup from its stored QR instead of rendering again
+    pending = admin_users.find_one(
+        {'_id': ObjectId(current_user_id)},
+        {'mfa_secret_temp': 1, 'mfa_qr_temp': 1, 'mfa_setup_started_at': 1}
+    ) or {}
+    started_at = pending.get('mfa_setup_started_at')
+    if (pending.get('mfa_secret_temp') and pending.get('mfa_qr_temp') and started_at
+            and datetime.utcnow() - started_at < timedelta(minutes=MFA_SETUP_TTL_MINUTES)):
+        return jsonify({
+            'qrCode': pending['mfa_qr_temp'],
+            'secret': pending['mfa_secret_temp']
+        }), 200
+    
     secret = MFAService.generate_secret()
     qr_code = MFAService.generate_qr_code(user['username'], secret)
     
-    # Store secret temporarily (not enabled until verified)
-    current_app.config['DB'].admin_users.update_one(
-        {'_id': user['_id']},
-        {'$set': {'mfa_secret_temp': secret}}
+    # Store secret and its QR temporarily (not enabled until verified)
+    admin_users.update_one(
+        {'_id': ObjectId(current_user_id)},
+        {'$set': {
+            'mfa_secret_temp': secret,
+            'mfa_qr_temp': qr_code,
+            'mfa_setup_started_at': datetime.utcnow()
+        }}
     )
     
     return jsonify({
@@ -490,7 +529,7 @@ def enable_mfa():
     mfa_code = data.get('mfaCode')
     secret = data.get('secret')
     
-    user = current_app.config['DB'].admin_users.find_one({'_id': ObjectId(current_user_id)})
+    user = resolve_admin_identity(current_user_id, get_jwt(), get_admin_collections())
     
     if not user:
         return jsonify({'error': 'User not found'}), 404
@@ -503,8 +542,8 @@ def enable_mfa():
     backup_codes = MFAService.generate_backup_codes()
     
     # Enable MFA
-    current_app.config['DB'].admin_users.update_one(
-        {'_id': user['_id']},
+    get_admin_collections()['admin_users'].update_one(
+        {'_id': ObjectId(current_user_id)},
         {
             '$set': {
                 'mfa_enabled': True,
@@ -512,9 +551,10 @@ def enable_mfa():
                 'backup_codes': backup_codes,
                 'mfa_enabled_at': datetime.utcnow()
             },
-            '$unset': {'mfa_secret_temp': 1}
+            '$unset': {'mfa_secret_temp': 1, 'mfa_qr_temp': 1, 'mfa_setup_started_at': 1}
         }
     )
+    admin_identity_cache.discard(current_user_id)
     
     log_admin_activity('mfa_enabled', {
         'username': user['username']
@@ -535,7 +575,8 @@ def change_password():
     new_password = data.get('newPassword')
     mfa_code = data.get('mfaCode')
     
-    user = current_app.config['DB'].admin_users.find_one({'_id': ObjectId(current_user_id)})
+    collections = get_admin_collections()
+    user = collections['admin_users'].find_one({'_id': ObjectId(current_user_id)})
     
     if not user:
         return jsonify({'error': 'User not found'}), 404
@@ -566,7 +607,7 @@ def change_password():
     new_password_hash = SecurityService.hash_password(new_password)
     
     # Update password
-    current_app.config['DB'].admin_users.update_one(
+    collections['admin_users'].update_one(
         {'_id': user['_id']},
         {
             '$set': {
@@ -577,10 +618,15 @@ def change_password():
     )
     
     # Invalidate all other sessions
-    current_app.config['DB'].admin_sessions.update_many(
-        {'admin_id': current_user_id, 'is_active': True},
+    current_token = request.headers.get('Authorization', '').replace('Bearer ', '')
+    other_sessions = {'admin_id': current_user_id, 'is_active': True, 'token': {'$ne': current_token}}
+    for session in collections['admin_sessions'].find(other_sessions, {'token': 1, 'refresh_token': 1, 'expires_at': 1}):
+        revocation_set.revoke_session(session)
+    collections['admin_sessions'].update_many(
+        other_sessions,
         {'$set': {'is_active': False, 'invalidated_at': datetime.utcnow()}}
     )
+    admin_identity_cache.invalidate(current_user_id)
     
     log_admin_activity('password_changed', {
         'username': user['username']
@@ -637,6 +683,33 @@ def mark_notification_read(notification_id):
         print(f"Error marking notification as read: {e}")
         return jsonify({'error': 'Failed to mark notification as read'}), 500
 
+@admin_auth_bp.route('/admin/notifications/<notification_id>/details', methods=['GET'])
+@jwt_required()
+def get_notification_details(notification_id):
+    """Expand one notification, including the conflicts it references"""
+    if not notification_service:
+        return jsonify({'error': 'Notification service not available'}), 503
+    
+    current_user_id = get_jwt_identity()
+    
+    try:
+        notification = notification_service.get_notification(notification_id, current_user_id)
+    except Exception:
+        notification = None
+    if not notification:
+        return jsonify({'error': 'Notification not found'}), 404
+    
+    try:
+        if notification['type'] == 'schedule_conflict':
+            from conflict_detector import conflict_detector
+            notification['data'] = conflict_detector.expand_notification_data(notification['data'])
+        
+        return jsonify({'notification': notification}), 200
+        
+    except Exception as e:
+        print(f"Error expanding notification: {e}")
+        return jsonify({'error': 'Failed to get notification details'}), 500
+
 @admin_auth_bp.route('/admin/notifications/read-all', methods=['POST'])
 @jwt_required()
 def mark_all_notifications_read():
@@ -706,8 +779,169 @@ def create_notification():
         print(f"Error creating notification: {e}")
         return jsonify({'error': 'Failed to create notification'}), 500
 
+# Each open stream holds one worker thread for as long as the browser keeps it
+# open, so the server must run threaded (App.py's server, or gunicorn with
+# --threads / gevent workers) with more threads than SSE_MAX_STREAMS plus the
+# normal request load. Events published in this process arrive through the
+# in-process broker. Changes made by other worker processes are only picked up
+# by the resync every SSE_RESYNC_SECONDS, or after the stream's queue
+# overflowed, so multi-process deployments see them with that delay.
+SSE_HEARTBEAT_SECONDS = int(os.getenv('SSE_HEARTBEAT_SECONDS', '15'))
+SSE_RESYNC_SECONDS = int(os.getenv('SSE_RESYNC_SECONDS', '120'))
+SSE_MAX_STREAMS = int(os.getenv('SSE_MAX_STREAMS', '100'))
+SSE_TICKET_TTL_SECONDS = int(os.getenv('SSE_TICKET_TTL_SECONDS', '60'))
+SSE_TICKET_SALT = 'notification-stream'
+
+
+def _sse_event(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+
+def _ticket_serializer():
+    return URLSafeTimedSerializer(current_app.config['JWT_SECRET_KEY'], salt=SSE_TICKET_SALT)
+
+
+@admin_auth_bp.route('/admin/notifications/stream-ticket', methods=['POST'])
+@jwt_required()
+def issue_stream_ticket():
+    """Short-lived ticket that only opens the notification stream.
+
+    EventSource cannot send an Authorization header, and an access token in
+    the URL would end up in proxy and server logs, so the stream URL carries
+    this ticket instead.
+    """
+    ticket = _ticket_serializer().dumps({'sub': get_jwt_identity(), 'jti': get_jwt().get('jti')})
+    return jsonify({'ticket': ticket, 'expires_in': SSE_TICKET_TTL_SECONDS}), 200
+
+
+def _stream_identity():
+    """Admin id for the stream, from ?ticket= or an Authorization header"""
+    ticket = request.args.get('ticket')
+    if ticket:
+        claims = _ticket_serializer().loads(ticket, max_age=SSE_TICKET_TTL_SECONDS)
+        if revocation_set.is_revoked(claims.get('jti')):
+            raise PermissionError('Token revoked')
+        return claims['sub']
+    verify_jwt_in_request()
+    return get_jwt_identity()
+
+
+@admin_auth_bp.route('/admin/notifications/stream', methods=['GET'])
+def notification_stream():
+    """Server-Sent Events: new notifications and unread-count changes for the current admin"""
+    if not notification_service:
+        return jsonify({'error': 'Notification service not available'}), 503
+
+    try:
+        current_user_id = _stream_identity()
+    except Exception:
+        return jsonify({'error': 'Authentication required'}), 401
+
+    broker = notification_service.broker
+    if broker.stream_count() >= SSE_MAX_STREAMS:
+        # The client falls back to polling /admin/notifications/changes
+        return jsonify({'error': 'Too many open notification streams'}), 503, {'Retry-After': '30'}
+
+    events = broker.subscribe(current_user_id)
+
+    def generate():
+        try:
+            last_sync = datetime.utcnow()
+            next_resync = time.monotonic() + SSE_RESYNC_SECONDS
+            yield "retry: 5000\n\n"
+            yield _sse_event('unread_count', {'unread_count': notification_service.get_unread_count(current_user_id)})
+            while True:
+                try:
+                    event, payload = events.get(timeout=SSE_HEARTBEAT_SECONDS)
+                    yield _sse_event(event, payload)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+
+                if not broker.take_overflow(events) and time.monotonic() < next_resync:
+                    continue
+
+                # Fallback for events this broker dropped or never saw (other worker processes)
+                sync_time = datetime.utcnow()
+                changes = notification_service.get_changes_since(current_user_id, last_sync)
+                last_sync = sync_time
+                next_resync = time.monotonic() + SSE_RESYNC_SECONDS
+                for notification in changes:
+                    yield _sse_event('notification', notification)
+                if changes:
+                    yield _sse_event('unread_count', {'unread_count': notification_service.get_unread_count(current_user_id)})
+        finally:
+            broker.unsubscribe(current_user_id, events)
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
+@admin_auth_bp.route('/admin/notifications/changes', methods=['GET'])
+@jwt_required()
+def get_notification_changes():
+    """Cheap poll for clients without a stream: only notifications changed since ?since=.
+
+    Expired notifications come back as {"id", "deleted": true} tombstones. With
+    "resync": true the list is complete and replaces the client's copy.
+    """
+    if not notification_service:
+        return jsonify({'error': 'Notification service not available'}), 503
+
+    current_user_id = get_jwt_identity()
+    server_time = datetime.utcnow()
+
+    try:
+        since = request.args.get('since')
+        if since:
+            since = datetime.fromisoformat(since.replace('Z', '+00:00')).replace(tzinfo=None)
+    except ValueError:
+        return jsonify({'error': 'Invalid since timestamp'}), 400
+
+    try:
+        # Without since, or when tombstones the client missed may have expired, send the full list
+        resync = not since or notification_service.needs_resync(since)
+        if resync:
+            notifications = notification_service.get_notifications(current_user_id)
+        else:
+            notifications = notification_service.get_changes_since(current_user_id, since)
+
+        response = {
+            'changed': bool(notifications) or resync,
+            'resync': resync,
+            'notifications': notifications,
+            'server_time': server_time.isoformat()
+        }
+        # The count only needs recomputing when something changed
+        if response['changed']:
+            response['unread_count'] = notification_service.get_unread_count(current_user_id)
+        return jsonify(response), 200
+
+    except Exception as e:
+        print(f"Error getting notification changes: {e}")
+        return jsonify({'error': 'Failed to get notification changes'}), 500
+
+@admin_auth_bp.route('/admin/storage/stats', methods=['GET'])
+@admin_required
+def get_storage_stats():
+    """Collection and index sizes, for watching notification and conflict growth"""
+    try:
+        stats = collection_storage_stats(get_db_connection())
+        stats['retention'] = {
+            'notification_read_ttl_days': NOTIFICATION_READ_TTL_DAYS,
+            'conflict_archive_after_days': CONFLICT_ARCHIVE_AFTER_DAYS,
+            'log_retention_days': LOG_RETENTION_DAYS
+        }
+        return jsonify(stats), 200
+        
+    except Exception as e:
+        print(f"Error getting storage stats: {e}")
+        return jsonify({'error': 'Failed to get storage stats'}), 500
+
 # Add this temporary debug route:
 @admin_auth_bp.route('/admin/debug-login', methods=['POST'])
+@rate_limit(profile='login')
 def debug_login():
     data = request.get_json()
     username = data.get('username')
@@ -725,7 +959,7 @@ def debug_login():
         print(f"🔍 DEBUG LOGIN - Stored hash: {user['password'][:20]}...")
         
         # Test verification
-        result = bcrypt.checkpw(password.encode('utf-8'), user['password'].encode('utf-8'))
+        result = password_hasher.verify(password, user['password'])
         print(f"🔍 DEBUG LOGIN - Verification result: {result}")
         
         return jsonify({
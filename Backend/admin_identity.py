@@ -0,0 +1,137 @@
+"""
+Cached admin identity, role and permissions for admin_required.
+
+Admin access tokens carry 'role' and 'permissions' claims. admin_required
+trusts them unless the admin was invalidated after the token was issued.
+Invalidation happens on logout, password change, or role/permission
+change. Only untrusted tokens and requests that need the full profile
+(/admin/validate) look the admin up. Those lookups are cached for
+ADMIN_IDENTITY_TTL seconds, up to ADMIN_IDENTITY_CACHE_SIZE admins.
+
+Invalidations made in this process take effect immediately. Invalidations
+from other workers and scripts come from token_revocation's admin_sessions
+poller, which passes every session it sees end to apply_ended_session.
+
+Identities built from token claims carry no isActive: deactivating an admin
+has to end their sessions, which stops the claims being trusted.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from bson import ObjectId
+
+from token_revocation import revocation_set
+
+ADMIN_IDENTITY_TTL = int(os.getenv('ADMIN_IDENTITY_TTL', '60'))
+ADMIN_IDENTITY_CACHE_SIZE = int(os.getenv('ADMIN_IDENTITY_CACHE_SIZE', '1024'))
+ADMIN_ROLES = ('admin', 'super_admin')
+
+PROFILE_FIELDS = {
+    'username': 1, 'email': 1, 'role': 1, 'permissions': 1, 'last_login': 1, 'mfa_enabled': 1,
+    'department': 1, 'first_name': 1, 'last_name': 1, 'is_active': 1
+}
+
+
+def _epoch(value: datetime) -> float:
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+class AdminIdentityCache:
+    def __init__(self, ttl=ADMIN_IDENTITY_TTL, max_size=ADMIN_IDENTITY_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()  # admin_id -> (expires, identity)
+        self._invalidated = {}  # admin_id -> epoch seconds; tokens issued before are not trusted
+        self._lock = threading.Lock()
+
+    def get(self, admin_id):
+        with self._lock:
+            entry = self._entries.get(admin_id)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[admin_id]
+                return None
+            self._entries.move_to_end(admin_id)
+            return entry[1]
+
+    def put(self, admin_id, identity):
+        with self._lock:
+            self._entries[admin_id] = (time.monotonic() + self.ttl, identity)
+            self._entries.move_to_end(admin_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, admin_id):
+        """Drop the cached profile only, e.g. after an MFA change"""
+        with self._lock:
+            self._entries.pop(admin_id, None)
+
+    def invalidate(self, admin_id, at: float = None):
+        """Drop the cached profile and stop trusting claims from tokens issued before at"""
+        at = at if at is not None else time.time()
+        with self._lock:
+            self._entries.pop(admin_id, None)
+            if at > self._invalidated.get(admin_id, 0):
+                self._invalidated[admin_id] = at
+
+    def token_trusted(self, admin_id, issued_at) -> bool:
+        invalidated = self._invalidated.get(admin_id)
+        return invalidated is None or (issued_at or 0) > invalidated
+
+    def apply_ended_session(self, session):
+        """Stop trusting claims issued before a logout or session invalidation seen by the poller"""
+        ended = [t for t in (session.get('invalidated_at'), session.get('logged_out_at')) if t is not None]
+        if session.get('admin_id') and ended:
+            self.invalidate(session['admin_id'], _epoch(max(ended)))
+
+    def stats(self):
+        with self._lock:
+            return {'cached': len(self._entries), 'invalidated_admins': len(self._invalidated)}
+
+
+admin_identity_cache = AdminIdentityCache()
+revocation_set.add_session_listener(admin_identity_cache.apply_ended_session)
+
+
+def _profile_from_user(user):
+    return {
+        'id': str(user['_id']),
+        'username': user['username'],
+        'email': user.get('email'),
+        'role': user['role'],
+        'permissions': user.get('permissions', []),
+        'lastLogin': user.get('last_login'),
+        'mfaEnabled': user.get('mfa_enabled', False),
+        'department': user.get('department'),
+        'firstName': user.get('first_name'),
+        'lastName': user.get('last_name'),
+        'isActive': user.get('is_active', True)
+    }
+
+
+def resolve_admin_identity(admin_id, claims, collections, profile=False):
+    """
+    Identity for admin_id, or None if the admin does not exist. Comes from trusted
+    token claims when profile is False, otherwise from the cache or admin_users.
+    """
+    if not profile and claims and claims.get('role') and admin_identity_cache.token_trusted(admin_id, claims.get('iat')):
+        return {
+            'id': admin_id,
+            'username': claims.get('username'),
+            'role': claims['role'],
+            'permissions': claims.get('permissions', [])
+        }
+
+    identity = admin_identity_cache.get(admin_id)
+    if identity is None:
+        user = collections['admin_users'].find_one({'_id': ObjectId(admin_id)}, PROFILE_FIELDS)
+        if not user:
+            return None
+        identity = _profile_from_user(user)
+        admin_identity_cache.put(admin_id, identity)
+    return identity
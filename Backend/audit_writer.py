@@ -0,0 +1,168 @@
+"""
+Background, batched audit log writer.
+
+auth.login/signup and admin_auth.log_admin_activity hand their log entries
+to audit_writer.write() instead of calling insert_one on the request path.
+A daemon thread drains a bounded queue and writes one insert_many per
+target collection, whenever AUDIT_BATCH_SIZE entries are waiting or
+AUDIT_FLUSH_INTERVAL seconds have passed.
+
+When the queue is full, AUDIT_QUEUE_POLICY decides what happens:
+  - drop (default): the new entry is discarded and counted, so a login
+    storm never slows logins down.
+  - block: the caller waits up to AUDIT_BLOCK_TIMEOUT seconds for space
+    (backpressure), then drops.
+
+Pending entries are flushed at interpreter shutdown. AUDIT_ASYNC=false
+writes synchronously, for scripts that exit immediately.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+AUDIT_ASYNC = os.getenv('AUDIT_ASYNC', 'true').lower() == 'true'
+AUDIT_BATCH_SIZE = int(os.getenv('AUDIT_BATCH_SIZE', '100'))
+AUDIT_FLUSH_INTERVAL = float(os.getenv('AUDIT_FLUSH_INTERVAL', '1.0'))
+AUDIT_QUEUE_SIZE = int(os.getenv('AUDIT_QUEUE_SIZE', '10000'))
+AUDIT_QUEUE_POLICY = os.getenv('AUDIT_QUEUE_POLICY', 'drop').lower()
+AUDIT_BLOCK_TIMEOUT = float(os.getenv('AUDIT_BLOCK_TIMEOUT', '0.5'))
+
+_SHUTDOWN = object()
+
+
+class AuditWriter:
+    def __init__(self, batch_size=AUDIT_BATCH_SIZE, flush_interval=AUDIT_FLUSH_INTERVAL,
+                 max_queue=AUDIT_QUEUE_SIZE, policy=AUDIT_QUEUE_POLICY,
+                 block_timeout=AUDIT_BLOCK_TIMEOUT, asynchronous=AUDIT_ASYNC):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.asynchronous = asynchronous
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._closed = False
+        self._stats = {'written': 0, 'dropped': 0, 'failed': 0, 'batches': 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                self._thread.start()
+
+    def write(self, collection, entry) -> bool:
+        """Queue one entry for collection; returns False if it was dropped"""
+        if not self.asynchronous or self._closed:
+            try:
+                collection.insert_one(entry)
+                self._count('written')
+                return True
+            except Exception as e:
+                logger.error(f"Audit write failed: {e}")
+                self._count('failed')
+                return False
+
+        self._ensure_started()
+        try:
+            if self.policy == 'block':
+                self._queue.put((collection, entry), timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait((collection, entry))
+            return True
+        except queue.Full:
+            self._count('dropped')
+            dropped = self._stats['dropped']
+            # Log the first drop and then every 1000th, not one line per entry in a storm
+            if dropped == 1 or dropped % 1000 == 0:
+                logger.warning(f"Audit queue full, {dropped} entries dropped so far")
+            return False
+
+    def _write_batch(self, batch):
+        # Group by target collection, keeping arrival order within each
+        groups = OrderedDict()
+        for collection, entry in batch:
+            groups.setdefault(id(collection), (collection, []))[1].append(entry)
+
+        for collection, entries in groups.values():
+            for attempt in range(2):
+                try:
+                    collection.insert_many(entries, ordered=False)
+                    self._count('written', len(entries))
+                    self._count('batches')
+                    break
+                except Exception as e:
+                    if attempt == 0:
+                        time.sleep(0.5)
+                        continue
+                    logger.error(f"Audit batch of {len(entries)} entries to {getattr(collection, 'name', '?')} failed: {e}")
+                    self._count('failed', len(entries))
+
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            timeout = max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is _SHUTDOWN:
+                while True:
+                    try:
+                        pending = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if pending is not _SHUTDOWN:
+                        batch.append(pending)
+                if batch:
+                    self._write_batch(batch)
+                return
+
+            if item is not None:
+                batch.append(item)
+
+            if len(batch) >= self.batch_size or (batch and time.monotonic() >= deadline):
+                self._write_batch(batch)
+                batch = []
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_interval
+
+    def close(self, timeout=10):
+        """Flush everything queued and stop the writer thread"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is None:
+            return
+        try:
+            self._queue.put(_SHUTDOWN, timeout=timeout)
+        except queue.Full:
+            logger.error("Audit queue still full at shutdown; some entries may not be written")
+        self._thread.join(timeout=timeout)
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['queued'] = self._queue.qsize()
+        stats['policy'] = self.policy
+        return stats
+
+
+audit_writer = AuditWriter()
+atexit.register(audit_writer.close)
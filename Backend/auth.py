@@ -1,6 +1,5 @@
 from flask import Blueprint, request, jsonify
 from datetime import datetime, timedelta
-import bcrypt
 import jwt
 import uuid
 from pymongo import MongoClient
@@ -8,8 +7,16 @@ import os
 from flask_jwt_extended import jwt_required, get_jwt_identity, create_access_token
 from dotenv import load_dotenv
 from bson import ObjectId
+from audit_writer import audit_writer
+from password_hashing import password_hasher
+from rate_limiting import rate_limit, limit_blueprint
+from log_retention import ensure_log_indexes, start_log_archiver
+from serialization import json_response
+import base64
+import json
 load_dotenv()
 auth_bp = Blueprint('auth', __name__)
+limit_blueprint(auth_bp, 'auth')
 
 # MongoDB Atlas Connection
 MONGO_URI = os.getenv("MONGO_URI")
@@ -21,7 +28,11 @@ logs_collection = db.logs
 # JWT Secret Key
 SECRET_KEY = os.getenv("JWT_SECRET", "fallback-secret-key")  # Added fallback key
 
+LOGS_PAGE_SIZE = int(os.getenv('LOGS_PAGE_SIZE', '100'))
+LOGS_MAX_PAGE_SIZE = 1000
+
 @auth_bp.route('/login', methods=['POST'])
+@rate_limit(profile='login')
 def login():
     data = request.get_json()
     
@@ -43,7 +54,7 @@ def login():
 
     if not username or not password:
         log_entry['message'] = 'Missing username or password'
-        logs_collection.insert_one(log_entry)
+        audit_writer.write(logs_collection, log_entry)
         return jsonify({'error': log_entry['message']}), 400
 
     user = users_collection.find_one({'username': username})
@@ -55,8 +66,15 @@ def login():
     if user:
         print(f"Stored password hash: {user['password'][:20]}...")  # Only show first 20 chars
     
-    # Fix: Remove .encode('utf-8') from the stored password hash
-    if user and bcrypt.checkpw(password.encode('utf-8'), user['password'].encode('utf-8') if isinstance(user['password'], str) else user['password']):
+    # Hashing runs on the bounded bcrypt pool; a full pool answers 429
+    valid, upgraded_hash = password_hasher.verify_and_upgrade(password, user['password']) if user else (False, None)
+    if valid:
+        if upgraded_hash:
+            # Stored with an outdated cost; keep the stored type (signup writes bytes)
+            users_collection.update_one(
+                {'_id': user['_id']},
+                {'$set': {'password': upgraded_hash if isinstance(user['password'], str) else upgraded_hash.encode('utf-8')}}
+            )
       
         exp_hours = 168 if remember_me else 24  
         # Use Flask-JWT-Extended to create token
@@ -70,7 +88,7 @@ def login():
         log_entry['message'] = 'Login successful'
         log_entry['user_id'] = str(user['_id'])
         log_entry['email'] = user.get('email', '')  
-        logs_collection.insert_one(log_entry)
+        audit_writer.write(logs_collection, log_entry)
         return jsonify({
             'message': 'Login successful',
             'Id': str(user['_id']),  # Ensure string conversion
@@ -80,7 +98,7 @@ def login():
         }), 200
     else:
         log_entry['message'] = 'Invalid credentials'
-        logs_collection.insert_one(log_entry)
+        audit_writer.write(logs_collection, log_entry)
         return jsonify({'error': log_entry['message']}), 401
 
 
@@ -94,6 +112,7 @@ def generate_token(user_id, username, exp_hours=13):
     return access_token
 
 @auth_bp.route('/signup', methods=['POST'])
+@rate_limit(profile='login')
 def signup():
     data = request.get_json()
     username = data.get('username')
@@ -112,17 +131,17 @@ def signup():
 
     if not username or not email or not password:
         log_entry['message'] = 'Missing required fields'
-        logs_collection.insert_one(log_entry)
+        audit_writer.write(logs_collection, log_entry)
         return jsonify({'error': log_entry['message']}), 400
 
     if users_collection.find_one({'username': username}):
         log_entry['message'] = 'Username already exists'
-        logs_collection.insert_one(log_entry)
+        audit_writer.write(logs_collection, log_entry)
         return jsonify({'error': log_entry['message']}), 409
 
     user_id = str(uuid.uuid4())
     # Fix: Store password hash as bytes, not string
-    hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+    hashed_password = password_hasher.hash(password).encode('utf-8')
     
     user = {
         '_id': user_id,
@@ -157,7 +176,7 @@ def signup():
     log_entry['success'] = True
     log_entry['message'] = 'Signup successful'
     log_entry['user_id'] = user_id
-    logs_collection.insert_one(log_entry)
+    audit_writer.write(logs_collection, log_entry)
 
     return jsonify({
         "user": user_response,
@@ -165,6 +184,52 @@ def signup():
        
     }), 201
 
+def _encode_logs_cursor(doc):
+    raw = json.dumps({'t': doc.get('timestamp'), 'id': str(doc['_id'])})
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_logs_cursor(token):
+    data = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+    return data['t'], ObjectId(data['id'])
+
+
+def _log_time_bound(value, end=False):
+    """ISO string bound for the string timestamps; a bare end date covers that whole day"""
+    parsed = datetime.fromisoformat(value)
+    if end and len(value) == 10:
+        return (parsed + timedelta(days=1)).isoformat(), '$lt'
+    return parsed.isoformat(), '$lte' if end else '$gte'
+
+
+def _build_logs_query(args):
+    """Filters for GET /logs; raises ValueError on a malformed date or cursor"""
+    query = {}
+    timestamp = {}
+    if args.get('start'):
+        bound, op = _log_time_bound(args['start'])
+        timestamp[op] = bound
+    if args.get('end'):
+        bound, op = _log_time_bound(args['end'], end=True)
+        timestamp[op] = bound
+    if timestamp:
+        query['timestamp'] = timestamp
+
+    for field in ('action', 'username'):
+        if args.get(field):
+            query[field] = args[field]
+    if args.get('success') in ('true', 'false'):
+        query['success'] = args['success'] == 'true'
+
+    if args.get('cursor'):
+        last_timestamp, last_id = _decode_logs_cursor(args['cursor'])
+        query = {'$and': [query, {'$or': [
+            {'timestamp': {'$lt': last_timestamp}},
+            {'timestamp': last_timestamp, '_id': {'$lt': last_id}}
+        ]}]}
+    return query
+
+
 @auth_bp.route('/logs', methods=['GET', 'POST'])
 @jwt_required()
 def manage_logs():
@@ -176,19 +241,35 @@ def manage_logs():
             
         if request.method == 'GET':
             try:
-                # Find logs for the current user
-                logs = list(logs_collection.find({}, {'_id': 0}))
-                
-                # Format the response
-                response = []
+                ensure_log_indexes(logs_collection)
+                start_log_archiver(db)
+
+                try:
+                    query = _build_logs_query(request.args)
+                    limit = int(request.args.get('limit', LOGS_PAGE_SIZE))
+                except (ValueError, KeyError, TypeError):
+                    return jsonify({'status': 'error', 'error': 'Invalid filter, limit or cursor'}), 400
+                limit = max(1, min(limit, LOGS_MAX_PAGE_SIZE))
+
+                # Newest first; one extra row tells us whether another page exists
+                logs = list(
+                    logs_collection.find(query)
+                    .sort([('timestamp', -1), ('_id', -1)])
+                    .limit(limit + 1)
+                )
+                has_more = len(logs) > limit
+                logs = logs[:limit]
+                next_cursor = _encode_logs_cursor(logs[-1]) if has_more else None
+
                 for log in logs:
-                    # Convert any ObjectId to string
-                    for key, value in log.items():
-                        if isinstance(value, ObjectId):
-                            log[key] = str(value)
-                    response.append(log)
-                
-                return jsonify(response), 200
+                    log.pop('_id', None)
+
+                # The body stays a plain array for existing clients; paging is in headers
+                response = json_response(logs, 200)
+                response.headers['X-Has-More'] = 'true' if has_more else 'false'
+                if next_cursor:
+                    response.headers['X-Next-Cursor'] = next_cursor
+                return response
             except Exception as e:
                 return jsonify({'status': 'error', 'error': f'Failed to read logs: {str(e)}'}), 500
         elif request.method == 'POST':
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Benchmark baselines and regression gating.
+
+Runs named benchmark scenarios (a benchmarks.py scenario at a fixed size),
+stores their timings as a JSON baseline, and compares later runs against it.
+A scenario regresses when its median slows down by more than the relative
+tolerance AND by more than the run-to-run noise (a multiple of the robust
+spread of both sample sets), so a noisy machine does not fail the gate.
+Baselines recorded on another python version or machine are not compared
+against (exit 2) unless --ignore-environment is given.
+
+Usage:
+    python benchmark_baselines.py --save                 # record baselines
+    python benchmark_baselines.py                        # compare, exit 1 on regression
+    python benchmark_baselines.py --scenario scan_all_conflicts@campus --tolerance 0.15
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+from datetime import datetime
+
+from benchmarks import run_suite
+
+BASELINE_FILE = os.getenv('BENCH_BASELINE_FILE', 'benchmark_baselines.json')
+DEFAULT_TOLERANCE = float(os.getenv('BENCH_TOLERANCE', '0.10'))
+DEFAULT_NOISE_FACTOR = 3.0
+DEFAULT_ITERATIONS = 7
+
+# name -> (benchmarks.py scenario, synthetic schedule count)
+NAMED_SCENARIOS = {
+    'preprocess_data@100k': ('preprocess_data', 100000),
+    'current_utilization@all_rooms': ('current_utilization', 10000),
+    'suggest_rooms@100k': ('suggest_rooms', 100000),
+    'check_overlap_operation@100k': ('check_overlap_operation', 100000),
+    'scan_all_conflicts@campus': ('scan_all_conflicts', 100000),
+}
+
+
+def robust_spread(samples):
+    """Median absolute deviation scaled to estimate a standard deviation"""
+    if len(samples) < 2:
+        return 0.0
+    median = statistics.median(samples)
+    return 1.4826 * statistics.median(abs(s - median) for s in samples)
+
+
+def run_named(names, iterations, mongo_uri=None, seed=42):
+    """Run the named scenarios, generating each dataset size only once"""
+    by_size = {}
+    for name in names:
+        scenario, size = NAMED_SCENARIOS[name]
+        by_size.setdefault(size, []).append((name, scenario))
+
+    results = {}
+    for size, entries in by_size.items():
+        scenarios = [scenario for _, scenario in entries]
+        for result in run_suite([size], iterations, mongo_uri, scenarios, seed):
+            for name, scenario in entries:
+                if result['scenario'] == scenario:
+                    results[name] = result
+    return results
+
+
+def load_baselines(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f).get('scenarios', {})
+
+
+def current_environment():
+    return {'python': platform.python_version(), 'machine': platform.machine()}
+
+
+def environment_mismatch(path):
+    """Describe how the baseline file's python/machine differ from this one, or None"""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        recorded = json.load(f)
+    differences = [
+        f"{key} {recorded.get(key)} -> {value}"
+        for key, value in current_environment().items()
+        if recorded.get(key) is not None and recorded.get(key) != value
+    ]
+    return ', '.join(differences) or None
+
+
+def save_baselines(path, results, existing=None):
+    """Write results as the new baselines, keeping entries for scenarios not re-run"""
+    scenarios = dict(existing or {})
+    for name, result in results.items():
+        if 'error' in result:
+            continue
+        scenarios[name] = {
+            'scenario': result['scenario'],
+            'size': result['size'],
+            'backend': result.get('backend'),
+            'iterations': result['iterations'],
+            'p50_ms': statistics.median(result['samples_ms']),
+            'p95_ms': result['p95_ms'],
+            'peak_mb': result['peak_mb'],
+            'samples_ms': result['samples_ms'],
+            'recorded_at': datetime.utcnow().isoformat()
+        }
+
+    with open(path, 'w') as f:
+        json.dump(dict(current_environment(), scenarios=scenarios), f, indent=2)
+
+
+def compare(name, baseline, result, tolerance=DEFAULT_TOLERANCE, noise_factor=DEFAULT_NOISE_FACTOR):
+    """Classify one scenario as ok, improved, regressed, new or error"""
+    row = {'name': name, 'baseline_ms': None, 'current_ms': None, 'delta_ms': None,
+           'delta_pct': None, 'threshold_ms': None, 'status': 'ok'}
+
+    if 'error' in result:
+        row['status'] = 'error'
+        row['error'] = result['error']
+        return row
+
+    current = statistics.median(result['samples_ms'])
+    row['current_ms'] = current
+    if baseline is None:
+        row['status'] = 'new'
+        return row
+
+    base = statistics.median(baseline['samples_ms'])
+    noise = noise_factor * (robust_spread(baseline['samples_ms']) ** 2 +
+                            robust_spread(result['samples_ms']) ** 2) ** 0.5
+    threshold = max(tolerance * base, noise)
+    delta = current - base
+
+    row.update({
+        'baseline_ms': base,
+        'delta_ms': delta,
+        'delta_pct': (delta / base * 100) if base else 0.0,
+        'threshold_ms': threshold
+    })
+    if delta > threshold:
+        row['status'] = 'regressed'
+    elif delta < -threshold:
+        row['status'] = 'improved'
+    return row
+
+
+def print_comparison(rows):
+    header = f"{'scenario':<34}{'baseline ms':>13}{'current ms':>13}{'delta':>10}{'allowed':>11}  status"
+    print(header)
+    print('-' * len(header))
+    for row in rows:
+        if row['status'] == 'error':
+            print(f"{row['name']:<34}{'':>13}{'':>13}{'':>10}{'':>11}  ERROR: {row['error']}")
+            continue
+        baseline = f"{row['baseline_ms']:.2f}" if row['baseline_ms'] is not None else '-'
+        delta = f"{row['delta_pct']:+.1f}%" if row['delta_pct'] is not None else '-'
+        allowed = f"{row['threshold_ms']:.2f}" if row['threshold_ms'] is not None else '-'
+        print(f"{row['name']:<34}{baseline:>13}{row['current_ms']:>13.2f}{delta:>10}{allowed:>11}  {row['status'].upper()}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare benchmark runs against stored baselines')
+    parser.add_argument('--scenario', action='append', choices=list(NAMED_SCENARIOS),
+                        help='Named scenario to run (repeatable, default: all)')
+    parser.add_argument('--baseline-file', default=BASELINE_FILE, help='Baseline JSON path')
+    parser.add_argument('--save', action='store_true', help='Record this run as the new baseline')
+    parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS, help='Timed runs per scenario')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='Allowed relative slowdown of the median (0.10 = 10%%)')
+    parser.add_argument('--noise-factor', type=float, default=DEFAULT_NOISE_FACTOR,
+                        help='Slowdowns within this many robust standard deviations count as noise')
+    parser.add_argument('--strict', action='store_true', help='Also fail on scenarios with no baseline')
+    parser.add_argument('--mongo-uri', default=None, help='Benchmark against this mongod instead of memory')
+    parser.add_argument('--seed', type=int, default=42, help='Synthetic data seed')
+    parser.add_argument('--ignore-environment', action='store_true',
+                        help='Compare even if the baselines were recorded on another python/machine')
+    args = parser.parse_args(argv)
+
+    # Timings from another interpreter or CPU are not comparable
+    mismatch = environment_mismatch(args.baseline_file)
+    if mismatch and not args.save and not args.ignore_environment:
+        print(f"Baselines in {args.baseline_file} were recorded on a different environment ({mismatch}); "
+              f"re-record them with --save or pass --ignore-environment")
+        return 2
+    if mismatch:
+        print(f"Warning: baseline environment differs ({mismatch})")
+
+    names = args.scenario or list(NAMED_SCENARIOS)
+    # Fewer than five samples make the noise estimate meaningless
+    results = run_named(names, max(5, args.iterations), args.mongo_uri, args.seed)
+    baselines = load_baselines(args.baseline_file)
+
+    if args.save:
+        if mismatch:
+            # Do not mix timings from two environments under one header
+            baselines = {}
+        save_baselines(args.baseline_file, results, baselines)
+        print(f"\nBaselines for {len(results)} scenarios written to {args.baseline_file}")
+        failed = [name for name, result in results.items() if 'error' in result]
+        for name in failed:
+            print(f"  {name}: {results[name]['error']}")
+        return 1 if failed else 0
+
+    rows = [compare(name, baselines.get(name), results[name], args.tolerance, args.noise_factor)
+            for name in names if name in results]
+    print()
+    print_comparison(rows)
+
+    failing = {'regressed', 'error'} | ({'new'} if args.strict else set())
+    failures = [row for row in rows if row['status'] in failing]
+    if failures:
+        print(f"\n{len(failures)} scenario(s) failed the benchmark gate")
+        return 1
+    print("\nNo benchmark regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Login throughput benchmark for /api/login.
+
+CLIENTS threads log in as fast as they can for DURATION seconds through the
+Flask test client, so each thread stands in for one request worker. The users
+and logs collections are replaced with in-memory stand-ins, so no MongoDB
+server is needed and the time measured is bcrypt plus the view itself. The
+login rate limit profiles are raised so every client can keep logging in.
+
+Each mode installs its own PasswordHasher in auth:
+  inline  bcrypt on the request thread (PASSWORD_HASH_WORKERS=0, the old behaviour)
+  pool    bcrypt on --workers threads with --queue waiting slots; overflow gets 429
+
+Reports successful logins per second, 429s and latency percentiles.
+
+Usage:
+    python benchmark_logins.py --clients 32 --duration 10 --workers 4 --queue 16 --rounds 12
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import bcrypt
+from bson import ObjectId
+
+from password_hashing import PasswordHasher, init_password_hashing
+
+MODES = ('inline', 'pool')
+BENCH_USERNAME = 'bench.user'
+BENCH_PASSWORD = 'Bench-password-123'
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class _MemoryUsers:
+    """The few users_collection calls login makes"""
+
+    def __init__(self, user):
+        self._user = user
+        self._lock = threading.Lock()
+
+    def find_one(self, query, *args, **kwargs):
+        return dict(self._user) if query.get('username') == self._user['username'] else None
+
+    def update_one(self, query, update, *args, **kwargs):
+        with self._lock:
+            self._user.update(update.get('$set', {}))
+
+
+class _MemoryLogs:
+    def insert_one(self, doc, *args, **kwargs):
+        pass
+
+    def insert_many(self, docs, *args, **kwargs):
+        pass
+
+
+def _make_app(hasher, rounds):
+    from flask import Flask
+    from flask_jwt_extended import JWTManager
+
+    # Per-client rate limits would turn most benchmark logins into 429s
+    os.environ.setdefault('RATE_LIMIT_LOGIN', '1000000000/60')
+    os.environ.setdefault('RATE_LIMIT_AUTH', '1000000000/60')
+    import auth
+
+    auth.password_hasher = hasher
+    auth.users_collection = _MemoryUsers({
+        '_id': ObjectId(),
+        'username': BENCH_USERNAME,
+        'email': 'bench.user@example.com',
+        'password': bcrypt.hashpw(BENCH_PASSWORD.encode('utf-8'), bcrypt.gensalt(rounds=rounds))
+    })
+    auth.logs_collection = _MemoryLogs()
+
+    app = Flask(__name__)
+    app.config['JWT_SECRET_KEY'] = 'benchmark-secret-key-not-used-for-auth'
+    JWTManager(app)
+    init_password_hashing(app)
+    app.register_blueprint(auth.auth_bp, url_prefix='/api')
+    return app
+
+
+def run_mode(mode, clients, duration, workers, queue_size, rounds):
+    hasher = PasswordHasher(workers=workers if mode == 'pool' else 0, queue_size=queue_size, rounds=rounds)
+    app = _make_app(hasher, rounds)
+    body = {'username': BENCH_USERNAME, 'password': BENCH_PASSWORD}
+
+    latencies, statuses = [], {}
+    lock = threading.Lock()
+    start = threading.Event()
+    deadline = [0.0]
+
+    def _client():
+        client = app.test_client()
+        local_latencies, local_statuses = [], {}
+        start.wait()
+        while time.perf_counter() < deadline[0]:
+            began = time.perf_counter()
+            response = client.post('/api/login', json=body)
+            if response.status_code == 429:
+                # Honour Retry-After briefly so rejected clients do not spin
+                time.sleep(0.05)
+            else:
+                local_latencies.append((time.perf_counter() - began) * 1000)
+            local_statuses[response.status_code] = local_statuses.get(response.status_code, 0) + 1
+        with lock:
+            latencies.extend(local_latencies)
+            for code, count in local_statuses.items():
+                statuses[code] = statuses.get(code, 0) + count
+
+    threads = [threading.Thread(target=_client, daemon=True) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    began = time.perf_counter()
+    deadline[0] = began + duration
+    start.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - began
+
+    succeeded = statuses.get(200, 0)
+    return {
+        'mode': mode,
+        'clients': clients,
+        'workers': hasher.workers,
+        'rounds': rounds,
+        'elapsed_s': elapsed,
+        'logins_per_sec': succeeded / elapsed if elapsed else 0.0,
+        'succeeded': succeeded,
+        'rejected_429': statuses.get(429, 0),
+        'other_errors': sum(count for code, count in statuses.items() if code not in (200, 429)),
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+        'p99_ms': percentile(latencies, 99)
+    }
+
+
+def print_report(results):
+    print(f"{'mode':<8} {'clients':>7} {'workers':>7} {'rounds':>6} {'logins/s':>9} {'ok':>7} {'429':>7} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for r in results:
+        print(f"{r['mode']:<8} {r['clients']:>7} {r['workers']:>7} {r['rounds']:>6} {r['logins_per_sec']:>9.1f} "
+              f"{r['succeeded']:>7} {r['rejected_429']:>7} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark login throughput with and without the bcrypt pool')
+    parser.add_argument('--clients', type=int, default=32, help='Concurrent login threads')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds per mode')
+    parser.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1), help='bcrypt pool threads')
+    parser.add_argument('--queue', type=int, default=16, help='Logins allowed to wait for a pool thread')
+    parser.add_argument('--rounds', type=int, default=12, help='bcrypt cost factor')
+    parser.add_argument('--mode', action='append', choices=MODES, help='Only run this mode (repeatable)')
+    parser.add_argument('--output', default=None, help='Write results as JSON to this path')
+    args = parser.parse_args(argv)
+
+    results = []
+    for mode in args.mode or MODES:
+        print(f"Running {mode} with {args.clients} clients for {args.duration:g}s...")
+        results.append(run_mode(mode, args.clients, args.duration, args.workers, args.queue, args.rounds))
+
+    print()
+    print_report(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Scale benchmarks for the timetable hot paths.
+
+Runs preprocess_data, the suggest_rooms and check_overlap operations of
+/api/manage_resources, all-rooms /api/current_utilization, the
+check_overlap helper and scan_all_conflicts against synthetic timetables of 10k, 100k and 1M schedules, and records
+latency percentiles and peak memory for each.
+
+By default the data lives in an InMemoryTimetableRepository installed with
+set_timetable_repository, so no MongoDB server is needed. Pass --mongo-uri
+to load it into a local mongod instead (the EduResourceBench database is
+used and dropped afterwards). In memory mode routes.py is imported with
+MONGO_LOCAL_FALLBACK=false so its startup probe gives up after one attempt.
+
+check_overlap_large_room runs check_overlap over every pair of a
+LARGE_ROOM_SCHEDULES-schedule room with tracing off.
+check_overlap_large_room_printed repeats it and also writes the four lines
+check_overlap used to print() per comparison, to a line-buffered file the way
+stdout reaches a captured log. check_overlap_large_room_traced repeats it with
+manage_resources tracing on (written to /dev/null). The pairs_per_sec of
+printed against large_room is the throughput removing the prints recovered;
+traced shows what turning tracing back on costs.
+
+Usage:
+    python benchmarks.py --sizes 10000,100000 --iterations 5 --output bench.json
+"""
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+
+import pandas as pd
+
+from repository import InMemoryTimetableRepository, MongoTimetableRepository, set_timetable_repository
+from synthetic_data import generate_timetable
+
+DEFAULT_SIZES = [10000, 100000, 1000000]
+LARGE_ROOM_SCHEDULES = 400
+BENCH_DB = 'EduResourceBench'
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def measure(fn, iterations):
+    """Time fn over several iterations, then run it once more under tracemalloc for peak memory"""
+    timings = []
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(iterations):
+            started = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - started) * 1000)
+
+        tracemalloc.start()
+        try:
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    return {
+        'iterations': iterations,
+        'mean_ms': statistics.fmean(timings),
+        'p50_ms': percentile(timings, 50),
+        'p95_ms': percentile(timings, 95),
+        'p99_ms': percentile(timings, 99),
+        'max_ms': max(timings),
+        'peak_mb': peak / (1024 * 1024),
+        'samples_ms': timings
+    }
+
+
+def _make_app():
+    from flask import Flask
+    from flask_jwt_extended import JWTManager
+    from manage_resources import manage_resources_bp
+    from routes import routes_bp
+
+    app = Flask(__name__)
+    app.config['JWT_SECRET_KEY'] = 'benchmark-secret-key-not-used-for-auth'
+    JWTManager(app)
+    app.register_blueprint(routes_bp, url_prefix='/api')
+    app.register_blueprint(manage_resources_bp, url_prefix='/api')
+    return app
+
+
+def _large_room_pairs(seed, n_schedules=LARGE_ROOM_SCHEDULES):
+    """Every (start, end, start, end) pair in one heavily double-booked room-day"""
+    rng = random.Random(seed)
+    slots = []
+    for _ in range(n_schedules):
+        start_hour = rng.randint(8, 18)
+        slots.append((f"{start_hour:02d}:00", f"{start_hour + rng.randint(0, 1):02d}:55"))
+    return [(a[0], a[1], b[0], b[1]) for i, a in enumerate(slots) for b in slots[i + 1:]]
+
+
+def _legacy_overlap_prints(start1, end1, start2, end2, result, out):
+    """The per-comparison lines check_overlap printed before it switched to tracing"""
+    print(f"OVERLAP CHECK: Comparing {start1}-{end1} vs {start2}-{end2}", file=out)
+    print(f"  Parsed times: {start1}-{end1} vs {start2}-{end2}", file=out)
+    print(f"  Overlap conditions: {start1} < {end2} = {start1 < end2}, {end1} > {start2} = {end1 > start2}", file=out)
+    print(f"  Result: {'OVERLAP DETECTED' if result else 'NO OVERLAP'}", file=out)
+
+
+@contextlib.contextmanager
+def _manage_resources_tracing():
+    """Enable manage_resources tracing with its output discarded"""
+    from tracing import set_module_tracing
+
+    trace_logger = logging.getLogger('trace.manage_resources')
+    handler = logging.FileHandler(os.devnull)
+    saved = (trace_logger.level, trace_logger.propagate)
+    trace_logger.addHandler(handler)
+    trace_logger.setLevel(logging.INFO)
+    trace_logger.propagate = False
+    set_module_tracing('manage_resources', True)
+    try:
+        yield
+    finally:
+        set_module_tracing('manage_resources', False)
+        trace_logger.removeHandler(handler)
+        trace_logger.setLevel(saved[0])
+        trace_logger.propagate = saved[1]
+        handler.close()
+
+
+def _busiest_room_day(rows):
+    counts = defaultdict(int)
+    for row in rows:
+        counts[(row['Room ID'], row['Day'])] += 1
+    return max(counts.items(), key=lambda item: item[1])[0]
+
+
+@contextlib.contextmanager
+def timetable_backend(rows, mongo_uri=None):
+    """Install a repository holding the benchmark data and yield it"""
+    if mongo_uri:
+        from pymongo import MongoClient
+        client = MongoClient(mongo_uri)
+        collection = client[BENCH_DB]['timetables']
+        collection.drop()
+        for start in range(0, len(rows), 10000):
+            collection.insert_many([dict(row) for row in rows[start:start + 10000]], ordered=False)
+        collection.create_index([('Room ID', 1), ('Day', 1)])
+        collection.create_index([('Day', 1)])
+        repository = MongoTimetableRepository(collection)
+    else:
+        client = None
+        repository = InMemoryTimetableRepository(rows)
+
+    set_timetable_repository(repository)
+    try:
+        yield repository
+    finally:
+        set_timetable_repository(None)
+        if client is not None:
+            client.drop_database(BENCH_DB)
+            client.close()
+
+
+def run_suite(sizes, iterations, mongo_uri=None, scenarios=None, seed=42):
+    """Run every scenario at every size; returns a list of result dicts"""
+    if not mongo_uri:
+        os.environ.setdefault('MONGO_LOCAL_FALLBACK', 'false')
+
+    from process import preprocess_data
+    from manage_resources import check_overlap
+
+    app = _make_app()
+    client = app.test_client()
+    results = []
+    large_pairs = _large_room_pairs(seed)
+
+    for size in sizes:
+        print(f"Generating {size:,} schedules...")
+        rows = generate_timetable(size, seed=seed)
+        room_id, day = _busiest_room_day(rows)
+        room_rows = [r for r in rows if r['Room ID'] == room_id and r['Day'] == day]
+        pairs = [(a['Start'], a['End'], b['Start'], b['End'])
+                 for i, a in enumerate(room_rows) for b in room_rows[i + 1:]]
+
+        def bench_preprocess():
+            preprocess_data(pd.DataFrame(rows))
+
+        def bench_suggest_rooms():
+            response = client.post('/api/manage_resources', json={
+                'operation': 'suggest_rooms', 'day': day,
+                'start_time': '10:00', 'end_time': '11:00'
+            })
+            assert response.status_code == 200, response.get_json()
+
+        def bench_check_overlap_operation():
+            response = client.post('/api/manage_resources', json={
+                'operation': 'check_overlap', 'room_id': room_id, 'day': day
+            })
+            assert response.status_code == 200, response.get_json()
+
+        def bench_current_utilization():
+            response = client.post('/api/current_utilization', json={})
+            assert response.status_code == 200, response.get_json()
+
+        def bench_check_overlap():
+            for pair in pairs:
+                check_overlap(*pair)
+
+        def bench_check_overlap_large_room():
+            for pair in large_pairs:
+                check_overlap(*pair)
+
+        def bench_check_overlap_large_room_printed():
+            with tempfile.TemporaryFile('w', buffering=1) as out:
+                for pair in large_pairs:
+                    _legacy_overlap_prints(*pair, check_overlap(*pair), out)
+
+        def bench_check_overlap_large_room_traced():
+            with _manage_resources_tracing():
+                for pair in large_pairs:
+                    check_overlap(*pair)
+
+        def bench_scan_all_conflicts():
+            from conflict_detector import conflict_detector
+            conflict_detector.scan_all_conflicts()
+
+        suite = {
+            'preprocess_data': bench_preprocess,
+            'suggest_rooms': bench_suggest_rooms,
+            'check_overlap_operation': bench_check_overlap_operation,
+            'current_utilization': bench_current_utilization,
+            'check_overlap': bench_check_overlap,
+            'check_overlap_large_room': bench_check_overlap_large_room,
+            'check_overlap_large_room_printed': bench_check_overlap_large_room_printed,
+            'check_overlap_large_room_traced': bench_check_overlap_large_room_traced,
+            'scan_all_conflicts': bench_scan_all_conflicts
+        }
+
+        with timetable_backend(rows, mongo_uri):
+            for name, fn in suite.items():
+                if scenarios and name not in scenarios:
+                    continue
+                print(f"  {name} @ {size:,}...")
+                try:
+                    stats = measure(fn, iterations)
+                except Exception as e:
+                    print(f"    skipped: {e}")
+                    results.append({'scenario': name, 'size': size, 'error': str(e)})
+                    continue
+                scenario_pairs = {'check_overlap': len(pairs)}.get(
+                    name, len(large_pairs) if name.startswith('check_overlap_large_room') else None)
+                stats.update({
+                    'scenario': name,
+                    'size': size,
+                    'backend': 'mongo' if mongo_uri else 'memory',
+                    'room_day': f"{room_id}/{day}" if name in ('check_overlap', 'check_overlap_operation') else None,
+                    'pairs': scenario_pairs,
+                    'pairs_per_sec': scenario_pairs / (stats['p50_ms'] / 1000) if scenario_pairs and stats['p50_ms'] else None
+                })
+                results.append(stats)
+
+    return results
+
+
+def print_report(results):
+    header = f"{'scenario':<34}{'size':>10}{'p50 ms':>12}{'p95 ms':>12}{'p99 ms':>12}{'peak MB':>10}{'pairs/s':>12}"
+    print(header)
+    print('-' * len(header))
+    for r in results:
+        if 'error' in r:
+            print(f"{r['scenario']:<34}{r['size']:>10,}  error: {r['error']}")
+            continue
+        throughput = f"{r['pairs_per_sec']:,.0f}" if r.get('pairs_per_sec') else '-'
+        print(f"{r['scenario']:<34}{r['size']:>10,}{r['p50_ms']:>12.2f}{r['p95_ms']:>12.2f}"
+              f"{r['p99_ms']:>12.2f}{r['peak_mb']:>10.1f}{throughput:>12}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark timetable hot paths at scale')
+    parser.add_argument('--sizes', default=','.join(str(s) for s in DEFAULT_SIZES),
+                        help='Comma-separated schedule counts')
+    parser.add_argument('--iterations', type=int, default=5, help='Timed runs per scenario')
+    parser.add_argument('--scenario', action='append', help='Only run this scenario (repeatable)')
+    parser.add_argument('--mongo-uri', default=None, help='Benchmark against this mongod instead of memory')
+    parser.add_argument('--seed', type=int, default=42, help='Synthetic data seed')
+    parser.add_argument('--output', default=None, help='Write results as JSON to this path')
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    results = run_suite(sizes, max(1, args.iterations), args.mongo_uri, args.scenario, args.seed)
+
+    print()
+    print_report(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
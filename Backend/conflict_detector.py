@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 
+import atexit
 import os
 import time
 import threading
@@ -21,6 +22,8 @@ from manage_resources import (
     format_duration
 )
 from notification_service import notification_service, NotificationType
+from repository import MongoTimetableRepository, get_timetable_repository
+from data_retention import ARCHIVE_COLLECTION, start_conflict_archiver
 
 load_dotenv()
 
@@ -41,26 +44,172 @@ class ConflictSeverity:
     MEDIUM = "Medium"       # 30-60 min overlap  
     LOW = "Low"            # <30 min overlap
 
+# Shown with the expanded notification details rather than stored in every notification
+RECOMMENDED_ACTIONS = {
+    ConflictSeverity.CRITICAL: [
+        "Review conflicting schedules immediately",
+        "Contact department coordinators",
+        "Reschedule one of the conflicting courses",
+        "Verify room assignments are correct"
+    ],
+    ConflictSeverity.HIGH: [
+        "Review and resolve conflicts within 24 hours",
+        "Contact affected departments",
+        "Consider room reassignment or time adjustment",
+        "Update schedules to prevent future conflicts"
+    ],
+    ConflictSeverity.MEDIUM: [
+        "Review conflicts within 48 hours",
+        "Assess impact on students and faculty",
+        "Plan resolution during next scheduling cycle",
+        "Monitor for escalation"
+    ],
+    ConflictSeverity.LOW: [
+        "Monitor conflicts for patterns",
+        "Consider minor schedule adjustments",
+        "Review during regular maintenance",
+        "Document for future planning"
+    ]
+}
+
+CONFLICT_DIGEST_WINDOW = float(os.getenv("CONFLICT_DIGEST_WINDOW", "300"))
+# A claimed digest not marked sent after this long belongs to a worker that died; it is sent again
+DIGEST_CLAIM_TIMEOUT = timedelta(minutes=10)
+
+
+class ConflictDigest:
+    """
+    Coalesces new conflicts into one notification per (admin, severity) per window.
+
+    The pending digest lives in detected_conflicts itself: new conflicts are
+    stored with notify_admin_id and notified False, and are only marked
+    notified once their digest has been sent. A crash or restart therefore
+    delays a digest until the next window in any worker instead of losing it.
+    Each flush first claims the pending conflicts, so two workers never send
+    the same ones; a worker dying between sending and marking can cause one
+    repeated digest. A window of 0 sends on every add.
+    """
+
+    PENDING = {'notified': False, 'notify_admin_id': {'$exists': True}}
+
+    def __init__(self, collection, send, window: float = CONFLICT_DIGEST_WINDOW):
+        self.collection = collection
+        self.send = send  # send(admin_id, severity, conflicts)
+        self.window = window
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def add(self):
+        """Schedule a flush for conflicts just stored as pending"""
+        if self.window <= 0:
+            self.flush()
+            return
+
+        with self._lock:
+            if self._timer is None:
+                self._timer = threading.Timer(self.window, self._flush_from_timer)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """Send every pending digest now; also called when the window closes and at exit"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+        claim = ObjectId()
+        now = datetime.utcnow()
+        self.collection.update_many(
+            dict(self.PENDING, **{'$or': [
+                {'digest_claim': {'$exists': False}},
+                {'digest_claimed_at': {'$lt': now - DIGEST_CLAIM_TIMEOUT}}
+            ]}),
+            {'$set': {'digest_claim': claim, 'digest_claimed_at': now}}
+        )
+
+        groups = defaultdict(list)
+        for conflict in self.collection.find({'digest_claim': claim, 'notified': False}):
+            groups[(conflict['notify_admin_id'], conflict['severity'])].append(conflict)
+        if groups:
+            logger.info(f"📨 Conflict digest: {sum(len(c) for c in groups.values())} conflicts "
+                        f"coalesced into {len(groups)} notifications")
+
+        for (admin_id, severity), conflicts in groups.items():
+            ids = [conflict['_id'] for conflict in conflicts]
+            try:
+                self.send(admin_id, severity, conflicts)
+            except Exception as e:
+                logger.error(f"❌ Failed to send {severity} conflict digest to {admin_id}: {e}")
+                # Release the claim so the next window retries it
+                self.collection.update_many(
+                    {'_id': {'$in': ids}, 'digest_claim': claim},
+                    {'$unset': {'digest_claim': '', 'digest_claimed_at': ''}}
+                )
+                continue
+            self.collection.update_many(
+                {'_id': {'$in': ids}},
+                {'$set': {'notified': True, 'notified_at': datetime.utcnow()},
+                 '$unset': {'digest_claim': '', 'digest_claimed_at': ''}}
+            )
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        except Exception as e:
+            # The conflicts stay pending and go out with the next window
+            logger.error(f"❌ Conflict digest flush failed: {e}")
+
+    def pending_count(self) -> int:
+        return self.collection.count_documents(self.PENDING)
+
+
 class ScheduleConflictDetector:
     def __init__(self):
         self.mongo_uri = os.getenv("MONGO_URI")
         self.client = MongoClient(self.mongo_uri)
         self.db = self.client['EduResourceDB']
-        self.timetables = self.db['timetables']
+        self.timetables = MongoTimetableRepository(self.db['timetables'])
         self.conflicts_collection = self.db['detected_conflicts']
-        
-        # Create indexes for performance
-        self.conflicts_collection.create_index([("room_id", 1), ("day", 1), ("detected_at", -1)])
-        self.conflicts_collection.create_index([("conflict_hash", 1)], unique=True)
+
+        # Indexes are created on first write so importing this module needs no server
+        self._indexes_ready = False
+        # The first scan in a process also schedules a digest for conflicts left pending before it started
+        self._digest_pending_unchecked = True
         
         # Configuration
         self.scan_interval = int(os.getenv("CONFLICT_SCAN_INTERVAL", "3600"))  # 1 hour default
         self.admin_id = "system_admin"  # Default admin for notifications
         self.running = False
         self.scan_thread = None
+        self.digest = ConflictDigest(self.conflicts_collection, self._send_severity_notification)
+        atexit.register(self._flush_digest_at_exit)
         
        
 
+    @property
+    def timetable_repository(self):
+        """Timetable repository in use: an installed override, else this detector's MongoDB one"""
+        return get_timetable_repository(default=self.timetables)
+
+    def _ensure_indexes(self):
+        """Create the detected_conflicts indexes once, on first use"""
+        if self._indexes_ready:
+            return
+        self.conflicts_collection.create_index([("room_id", 1), ("day", 1), ("detected_at", -1)])
+        self.conflicts_collection.create_index([("conflict_hash", 1)], unique=True)
+        self.conflicts_collection.create_index([("resolved_at", 1)], sparse=True)
+        self.conflicts_collection.create_index([("notify_admin_id", 1), ("notified", 1)], sparse=True)
+        self._indexes_ready = True
+
+    def _flush_digest_at_exit(self):
+        # Nothing is lost if this fails: pending conflicts stay in the collection for the next window
+        try:
+            if self._indexes_ready:
+                self.digest.flush()
+        except Exception as e:
+            logger.error(f"❌ Conflict digest flush at exit failed: {e}")
+
     def start_monitoring(self):
         """Start the automated conflict detection monitoring"""
         if self.running:
@@ -88,9 +237,10 @@ class ScheduleConflictDetector:
                 
                 if conflicts_found:
                     logger.info(f"⚠️  Found {len(conflicts_found)} conflicts during scan")
-                    self._process_detected_conflicts(conflicts_found)
                 else:
                     logger.info("✅ No conflicts detected during scan")
+                # Also run on an empty result so stored conflicts get marked resolved
+                self._process_detected_conflicts(conflicts_found)
                     
             except Exception as e:
                 logger.error(f"❌ Error during conflict scan: {str(e)}")
@@ -107,24 +257,13 @@ class ScheduleConflictDetector:
         
         all_conflicts = []
         
-        # Get all unique room-day combinations
-        pipeline = [
-            {"$group": {
-                "_id": {
-                    "room_id": "$Room ID",
-                    "day": "$Day"
-                },
-                "count": {"$sum": 1}
-            }},
-            {"$match": {"count": {"$gt": 1}}}  # Only rooms with multiple schedules
-        ]
-        
-        room_day_combinations = list(self.timetables.aggregate(pipeline))
+        # Get all unique room-day combinations with multiple schedules
+        room_day_combinations = self.timetable_repository.room_day_groups(min_count=2)
         logger.info(f"📊 Found {len(room_day_combinations)} room-day combinations with multiple schedules")
         
         for combo in room_day_combinations:
-            room_id = combo["_id"]["room_id"]
-            day = combo["_id"]["day"]
+            room_id = combo["room_id"]
+            day = combo["day"]
             
             if not room_id or not day:
                 continue
@@ -136,12 +275,25 @@ class ScheduleConflictDetector:
         logger.info(f"🎯 Total conflicts detected: {len(all_conflicts)}")
         return all_conflicts
 
+    def scan_room_days(self, room_days) -> List[Dict]:
+        """
+        Scan only the given (room_id, day) pairs, e.g. the ones an incremental
+        import changed, instead of the whole timetable
+        """
+        all_conflicts = []
+        for room_id, day in room_days:
+            if not room_id or not day:
+                continue
+            all_conflicts.extend(self._analyze_room_day_conflicts(room_id, day))
+
+        logger.info(f"🎯 Targeted scan of {len(room_days)} room-day combinations found {len(all_conflicts)} conflicts")
+        return all_conflicts
+
     def _analyze_room_day_conflicts(self, room_id: str, day: str) -> List[Dict]:
         """Analyze conflicts for a specific room on a specific day"""
         
         # Get all schedules for this room-day
-        query = {'Room ID': room_id, 'Day': day}
-        schedules = list(self.timetables.find(query, {'_id': 0}))
+        schedules = self.timetable_repository.find_by_room_day(room_id, day)
         
         if len(schedules) < 2:
             return []
@@ -244,8 +396,13 @@ class ScheduleConflictDetector:
         hash_string = f"{room_id}_{day}_{courses[0]}_{courses[1]}_{times[0]}_{times[1]}"
         return hash_string.replace(' ', '_').replace(':', '')
 
-    def _process_detected_conflicts(self, conflicts: List[Dict], admin_id: str = None):
-        """Process detected conflicts and send notifications"""
+    def _process_detected_conflicts(self, conflicts: List[Dict], admin_id: str = None, scanned_room_days=None):
+        """
+        Process detected conflicts and send notifications.
+        scanned_room_days limits resolution marking to a targeted scan; None means a full scan.
+        """
+        self._ensure_indexes()
+        start_conflict_archiver(self.db)
         new_conflicts = []
         
         for conflict in conflicts:
@@ -255,7 +412,8 @@ class ScheduleConflictDetector:
             })
             
             if not existing:
-                # New conflict - store and notify
+                # New conflict - store it as pending for the next digest
+                conflict['notify_admin_id'] = admin_id or self.admin_id
                 self.conflicts_collection.insert_one(conflict)
                 new_conflicts.append(conflict)
                 logger.info(f"🆕 New conflict detected: {conflict['conflict_hash']}")
@@ -263,159 +421,63 @@ class ScheduleConflictDetector:
                 # Update detection timestamp
                 self.conflicts_collection.update_one(
                     {'conflict_hash': conflict['conflict_hash']},
-                    {'$set': {'last_detected_at': datetime.utcnow()}}
+                    {'$set': {'last_detected_at': datetime.utcnow()}, '$unset': {'resolved_at': ''}}
                 )
         
-        # Send notifications for new conflicts
-        if new_conflicts:
-            self._send_conflict_notifications(new_conflicts, admin_id)
-
-    def _send_conflict_notifications(self, conflicts: List[Dict], admin_id: str = None):
-        """Send notifications for detected conflicts"""
-
-        # Use provided admin_id or fall back to default
-        target_admin_id = admin_id or self.admin_id
-
-        # Group conflicts by severity for better notification management
-        conflicts_by_severity = defaultdict(list)
-        for conflict in conflicts:
-            conflicts_by_severity[conflict['severity']].append(conflict)
-
-        # Send notifications grouped by severity
-        for severity, severity_conflicts in conflicts_by_severity.items():
-            if severity == ConflictSeverity.CRITICAL:
-                self._send_critical_conflict_notification(severity_conflicts, target_admin_id)
-            else:
-                self._send_general_conflict_notification(severity, severity_conflicts, target_admin_id)
+        self._mark_resolved(conflicts, scanned_room_days)
+        
+        # New conflicts, and any a crashed worker left pending, go out with the next digest
+        if new_conflicts or self._digest_pending_unchecked:
+            self._digest_pending_unchecked = False
+            self._send_conflict_notifications()
+
+    def _mark_resolved(self, conflicts: List[Dict], scanned_room_days=None) -> int:
+        """Flag stored conflicts that the scan covered but no longer found"""
+        query = {
+            'resolved_at': {'$exists': False},
+            'conflict_hash': {'$nin': [c['conflict_hash'] for c in conflicts]}
+        }
+        if scanned_room_days is not None:
+            if not scanned_room_days:
+                return 0
+            query['$or'] = [{'room_id': room_id, 'day': day} for room_id, day in scanned_room_days]
+
+        result = self.conflicts_collection.update_many(query, {'$set': {'resolved_at': datetime.utcnow()}})
+        if result.modified_count:
+            logger.info(f"✅ {result.modified_count} previously detected conflicts are resolved")
+        return result.modified_count
+
+    def _send_conflict_notifications(self):
+        """Schedule the digest that writes one notification per admin and severity per window"""
+        self.digest.add()
+
+    def _send_severity_notification(self, admin_id: str, severity: str, conflicts: List[Dict]):
+        """Send one notification for a group of conflicts of the same severity"""
+        if severity == ConflictSeverity.CRITICAL:
+            self._send_critical_conflict_notification(conflicts, admin_id)
+        else:
+            self._send_general_conflict_notification(severity, conflicts, admin_id)
 
     def _send_critical_conflict_notification(self, conflicts: List[Dict], admin_id: str = None):
-        """Send high-priority notification for critical conflicts with detailed information"""
+        """Send high-priority notification for critical conflicts"""
         conflict_count = len(conflicts)
         target_admin_id = admin_id or self.admin_id
 
         title = f"🚨 CRITICAL: {conflict_count} Duplicate Schedule{'s' if conflict_count > 1 else ''} Detected"
-
-        # Create detailed message with all requested information
-        message_parts = [
-            f"🔍 AUTOMATED SCAN RESULTS:",
-            f"Found {conflict_count} critical schedule conflict{'s' if conflict_count > 1 else ''} requiring immediate attention.",
-            "",
-            "📋 CONFLICT DETAILS:"
-        ]
-
-        for i, conflict in enumerate(conflicts[:5], 1):  # Limit to first 5 for readability
-            message_parts.extend([
-                f"",
-                f"🚨 CONFLICT #{i}:",
-                f"   📍 Room ID: {conflict['room_id']}",
-                f"   📅 Day: {conflict['day']}",
-                f"   ⏰ Conflicting Time: {conflict['overlap_start']}-{conflict['overlap_end']}",
-                f"   ⚡ Severity: {conflict['severity']} ({conflict['conflict_type']})",
-                f"   📚 Course 1: {conflict['schedule1']['course']} ({conflict['schedule1']['department']})",
-                f"   👨‍🏫 Lecturer 1: {conflict['schedule1']['lecturer']}",
-                f"   📚 Course 2: {conflict['schedule2']['course']} ({conflict['schedule2']['department']})",
-                f"   👨‍🏫 Lecturer 2: {conflict['schedule2']['lecturer']}",
-                f"   ⏱️ Overlap Duration: {conflict['overlap_duration_formatted']}",
-                f"   🎯 Action Required: Immediate resolution needed"
-            ])
-
-        if conflict_count > 5:
-            message_parts.extend([
-                "",
-                f"⚠️ ... and {conflict_count - 5} more critical conflicts detected.",
-                f"📊 Total conflicts requiring attention: {conflict_count}"
-            ])
-
-        message_parts.extend([
-            "",
-            "🔧 RECOMMENDED ACTIONS:",
-            "1. Review conflicting schedules immediately",
-            "2. Contact department coordinators",
-            "3. Reschedule one of the conflicting courses",
-            "4. Verify room assignments are correct",
-            "",
-            f"🕐 Detected at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-        ])
-
-        message = "\n".join(message_parts)
-
-        # Enhanced data payload with comprehensive conflict information
-        detailed_conflicts = []
-        for conflict in conflicts:
-            detailed_conflicts.append({
-                'room_id': conflict['room_id'],
-                'day': conflict['day'],
-                'severity': conflict['severity'],
-                'conflict_type': conflict['conflict_type'],
-                'overlap_period': f"{conflict['overlap_start']}-{conflict['overlap_end']}",
-                'overlap_duration_minutes': conflict['overlap_duration_minutes'],
-                'overlap_duration_formatted': conflict['overlap_duration_formatted'],
-                'schedule1': {
-                    'course': conflict['schedule1']['course'],
-                    'department': conflict['schedule1']['department'],
-                    'lecturer': conflict['schedule1']['lecturer'],
-                    'time_slot': conflict['schedule1']['time']
-                },
-                'schedule2': {
-                    'course': conflict['schedule2']['course'],
-                    'department': conflict['schedule2']['department'],
-                    'lecturer': conflict['schedule2']['lecturer'],
-                    'time_slot': conflict['schedule2']['time']
-                },
-                'detected_at': conflict['detected_at'].isoformat(),
-                'conflict_hash': conflict['conflict_hash'],
-                'actionable_data': {
-                    'departments_affected': [conflict['schedule1']['department'], conflict['schedule2']['department']],
-                    'lecturers_affected': [conflict['schedule1']['lecturer'], conflict['schedule2']['lecturer']],
-                    'courses_affected': [conflict['schedule1']['course'], conflict['schedule2']['course']],
-                    'resolution_priority': 'IMMEDIATE' if conflict['severity'] == ConflictSeverity.CRITICAL else 'HIGH'
-                }
-            })
-
-        # Create notification with enhanced data structure
-        notification_data = {
-            'notification_type': 'critical_conflicts',
-            'severity': ConflictSeverity.CRITICAL,
-            'conflict_count': conflict_count,
-            'conflicts': detailed_conflicts,
-            'action_required': True,
-            'scan_timestamp': datetime.now().isoformat(),
-            'summary': {
-                'total_conflicts': conflict_count,
-                'rooms_affected': list(set([c['room_id'] for c in conflicts])),
-                'days_affected': list(set([c['day'] for c in conflicts])),
-                'departments_affected': list(set([c['schedule1']['department'] for c in conflicts] + [c['schedule2']['department'] for c in conflicts])),
-                'severity_breakdown': {
-                    'critical': len([c for c in conflicts if c['severity'] == ConflictSeverity.CRITICAL]),
-                    'high': len([c for c in conflicts if c['severity'] == ConflictSeverity.HIGH]),
-                    'medium': len([c for c in conflicts if c['severity'] == ConflictSeverity.MEDIUM]),
-                    'low': len([c for c in conflicts if c['severity'] == ConflictSeverity.LOW])
-                }
-            },
-            # Enhanced display data for frontend
-            'display_data': {
-                'room_ids': [c['room_id'] for c in conflicts],
-                'days_of_week': [c['day'] for c in conflicts],
-                'conflicting_time_slots': [f"{c['overlap_start']}-{c['overlap_end']}" for c in conflicts],
-                'course_names': [f"{c['schedule1']['course']} vs {c['schedule2']['course']}" for c in conflicts],
-                'lecturer_info': [f"{c['schedule1']['lecturer']} / {c['schedule2']['lecturer']}" for c in conflicts],
-                'department_info': [f"{c['schedule1']['department']} / {c['schedule2']['department']}" for c in conflicts],
-                'severity_levels': [c['severity'] for c in conflicts],
-                'overlap_durations': [c['overlap_duration_formatted'] for c in conflicts],
-                'overlap_minutes': [c['overlap_duration_minutes'] for c in conflicts],
-                'actionable_data': [c.get('actionable_data', {}) for c in conflicts]
-            }
-        }
+        message = (
+            f"Found {conflict_count} critical schedule conflict{'s' if conflict_count > 1 else ''} "
+            f"{self._describe_scope(conflicts)} requiring immediate attention."
+        )
 
         notification_service.create_notification(
             admin_id=target_admin_id,
             type='schedule_conflict',  # Use specific type for proper styling
             title=title,
             message=message,
-            data=notification_data
+            data=self._build_notification_data(conflicts, ConflictSeverity.CRITICAL, 'critical_conflicts', True)
         )
 
-        logger.info(f"📧 Sent detailed critical conflict notification for {conflict_count} conflicts")
+        logger.info(f"📧 Sent critical conflict notification for {conflict_count} conflicts")
 
     def _create_manual_scan_notifications(self, conflicts: List[Dict], admin_id: str):
         """
@@ -482,214 +544,70 @@ class ScheduleConflictDetector:
         )
 
     def _send_enhanced_conflict_notification(self, conflicts: List[Dict], admin_id: str, severity: str, title_prefix: str, message_template: str):
-        """Generic method to send enhanced conflict notifications with full display data"""
+        """Generic method to send conflict notifications for a manual scan"""
         conflict_count = len(conflicts)
 
         # Create title and message
         title = f"{title_prefix}: {conflict_count} Schedule Conflict{'s' if conflict_count != 1 else ''} Detected"
-        message = f"{message_template}. {conflict_count} conflict{'s' if conflict_count != 1 else ''} require{'s' if conflict_count == 1 else ''} attention."
-
-        # Create detailed conflicts with enhanced data
-        detailed_conflicts = []
-        for conflict in conflicts:
-            detailed_conflicts.append({
-                'room_id': conflict['room_id'],
-                'day': conflict['day'],
-                'severity': conflict['severity'],
-                'conflict_type': conflict['conflict_type'],
-                'overlap_period': f"{conflict['overlap_start']}-{conflict['overlap_end']}",
-                'overlap_duration_minutes': conflict['overlap_duration_minutes'],
-                'overlap_duration_formatted': conflict['overlap_duration_formatted'],
-                'schedule1': {
-                    'course': conflict['schedule1']['course'],
-                    'department': conflict['schedule1']['department'],
-                    'lecturer': conflict['schedule1']['lecturer'],
-                    'time_slot': conflict['schedule1']['time']
-                },
-                'schedule2': {
-                    'course': conflict['schedule2']['course'],
-                    'department': conflict['schedule2']['department'],
-                    'lecturer': conflict['schedule2']['lecturer'],
-                    'time_slot': conflict['schedule2']['time']
-                },
-                'detected_at': conflict['detected_at'].isoformat() if hasattr(conflict['detected_at'], 'isoformat') else str(conflict['detected_at']),
-                'conflict_hash': conflict['conflict_hash'],
-                'actionable_data': {
-                    'departments_affected': [conflict['schedule1']['department'], conflict['schedule2']['department']],
-                    'lecturers_affected': [conflict['schedule1']['lecturer'], conflict['schedule2']['lecturer']],
-                    'courses_affected': [conflict['schedule1']['course'], conflict['schedule2']['course']],
-                    'resolution_priority': 'IMMEDIATE' if conflict['severity'] == ConflictSeverity.CRITICAL else 'HIGH' if conflict['severity'] == ConflictSeverity.HIGH else 'MEDIUM'
-                }
-            })
-
-        # Create notification with enhanced data structure
-        notification_data = {
-            'notification_type': f'{severity.lower()}_conflicts',
-            'severity': severity,
-            'conflict_count': conflict_count,
-            'conflicts': detailed_conflicts,
-            'action_required': True,
-            'scan_timestamp': datetime.now().isoformat(),
-            'summary': {
-                'total_conflicts': conflict_count,
-                'rooms_affected': list(set([c['room_id'] for c in conflicts])),
-                'days_affected': list(set([c['day'] for c in conflicts])),
-                'departments_affected': list(set([c['schedule1']['department'] for c in conflicts] + [c['schedule2']['department'] for c in conflicts])),
-                'severity_breakdown': {
-                    'critical': len([c for c in conflicts if c['severity'] == ConflictSeverity.CRITICAL]),
-                    'high': len([c for c in conflicts if c['severity'] == ConflictSeverity.HIGH]),
-                    'medium': len([c for c in conflicts if c['severity'] == ConflictSeverity.MEDIUM]),
-                    'low': len([c for c in conflicts if c['severity'] == ConflictSeverity.LOW])
-                }
-            },
-            # Enhanced display data for frontend
-            'display_data': {
-                'room_ids': [c['room_id'] for c in conflicts],
-                'days_of_week': [c['day'] for c in conflicts],
-                'conflicting_time_slots': [f"{c['overlap_start']}-{c['overlap_end']}" for c in conflicts],
-                'course_names': [f"{c['schedule1']['course']} vs {c['schedule2']['course']}" for c in conflicts],
-                'lecturer_info': [f"{c['schedule1']['lecturer']} / {c['schedule2']['lecturer']}" for c in conflicts],
-                'department_info': [f"{c['schedule1']['department']} / {c['schedule2']['department']}" for c in conflicts],
-                'severity_levels': [c['severity'] for c in conflicts],
-                'overlap_durations': [c['overlap_duration_formatted'] for c in conflicts],
-                'overlap_minutes': [c['overlap_duration_minutes'] for c in conflicts],
-                'actionable_data': [c.get('actionable_data', {}) for c in conflicts]
-            }
-        }
+        message = f"{message_template} {self._describe_scope(conflicts)}. {conflict_count} conflict{'s' if conflict_count != 1 else ''} require{'s' if conflict_count == 1 else ''} attention."
 
         notification_service.create_notification(
             admin_id=admin_id,
             type='schedule_conflict',
             title=title,
             message=message,
-            data=notification_data
+            data=self._build_notification_data(conflicts, severity, f'{severity.lower()}_conflicts', True)
         )
 
-        logger.info(f"📧 Sent enhanced {severity.lower()} conflict notification for {conflict_count} conflicts to admin {admin_id}")
+        logger.info(f"📧 Sent {severity.lower()} conflict notification for {conflict_count} conflicts to admin {admin_id}")
 
     def _send_general_conflict_notification(self, severity: str, conflicts: List[Dict], admin_id: str = None):
-        """Send detailed notification for general conflicts"""
+        """Send notification for non-critical conflicts"""
         conflict_count = len(conflicts)
         target_admin_id = admin_id or self.admin_id
 
         title = f"⚠️ {severity} Priority: {conflict_count} Schedule Conflict{'s' if conflict_count > 1 else ''}"
+        message = (
+            f"Detected {conflict_count} {severity.lower()} priority schedule conflict{'s' if conflict_count > 1 else ''} "
+            f"{self._describe_scope(conflicts)}."
+        )
 
-        # Create detailed message with all requested information
-        message_parts = [
-            f"🔍 AUTOMATED SCAN RESULTS:",
-            f"Detected {conflict_count} {severity.lower()} priority schedule conflict{'s' if conflict_count > 1 else ''}.",
-            "",
-            "📋 CONFLICT DETAILS:"
-        ]
-
-        for i, conflict in enumerate(conflicts[:3], 1):  # Limit to first 3 for readability
-            message_parts.extend([
-                f"",
-                f"⚠️ CONFLICT #{i} ({severity} Priority):",
-                f"   📍 Room ID: {conflict['room_id']}",
-                f"   📅 Day: {conflict['day']}",
-                f"   ⏰ Overlapping Time: {conflict['overlap_start']}-{conflict['overlap_end']}",
-                f"   ⚡ Severity: {conflict['severity']} ({conflict['conflict_type']})",
-                f"   📚 Course 1: {conflict['schedule1']['course']} ({conflict['schedule1']['department']})",
-                f"   👨‍🏫 Lecturer 1: {conflict['schedule1']['lecturer']}",
-                f"   🕐 Time Slot 1: {conflict['schedule1']['time']}",
-                f"   📚 Course 2: {conflict['schedule2']['course']} ({conflict['schedule2']['department']})",
-                f"   👨‍🏫 Lecturer 2: {conflict['schedule2']['lecturer']}",
-                f"   🕐 Time Slot 2: {conflict['schedule2']['time']}",
-                f"   ⏱️ Overlap Duration: {conflict['overlap_duration_formatted']}",
-                f"   🎯 Action Required: {'Yes' if severity in [ConflictSeverity.CRITICAL, ConflictSeverity.HIGH] else 'Monitor'}"
-            ])
-
-        if conflict_count > 3:
-            message_parts.extend([
-                "",
-                f"⚠️ ... and {conflict_count - 3} more {severity.lower()} priority conflicts detected.",
-                f"📊 Total conflicts in this category: {conflict_count}"
-            ])
-
-        # Add severity-specific recommendations
-        if severity == ConflictSeverity.HIGH:
-            message_parts.extend([
-                "",
-                "🔧 RECOMMENDED ACTIONS:",
-                "1. Review and resolve conflicts within 24 hours",
-                "2. Contact affected departments",
-                "3. Consider room reassignment or time adjustment",
-                "4. Update schedules to prevent future conflicts"
-            ])
-        elif severity == ConflictSeverity.MEDIUM:
-            message_parts.extend([
-                "",
-                "🔧 RECOMMENDED ACTIONS:",
-                "1. Review conflicts within 48 hours",
-                "2. Assess impact on students and faculty",
-                "3. Plan resolution during next scheduling cycle",
-                "4. Monitor for escalation"
-            ])
-        else:  # LOW severity
-            message_parts.extend([
-                "",
-                "🔧 RECOMMENDED ACTIONS:",
-                "1. Monitor conflicts for patterns",
-                "2. Consider minor schedule adjustments",
-                "3. Review during regular maintenance",
-                "4. Document for future planning"
-            ])
-
-        message_parts.extend([
-            "",
-            f"🕐 Detected at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-        ])
-
-        message = "\n".join(message_parts)
-
-        # Enhanced data payload with comprehensive conflict information
-        detailed_conflicts = []
-        for conflict in conflicts:
-            detailed_conflicts.append({
-                'room_id': conflict['room_id'],
-                'day': conflict['day'],
-                'severity': conflict['severity'],
-                'conflict_type': conflict['conflict_type'],
-                'overlap_period': f"{conflict['overlap_start']}-{conflict['overlap_end']}",
-                'overlap_duration_minutes': conflict['overlap_duration_minutes'],
-                'overlap_duration_formatted': conflict['overlap_duration_formatted'],
-                'schedule1': {
-                    'course': conflict['schedule1']['course'],
-                    'department': conflict['schedule1']['department'],
-                    'lecturer': conflict['schedule1']['lecturer'],
-                    'time_slot': conflict['schedule1']['time']
-                },
-                'schedule2': {
-                    'course': conflict['schedule2']['course'],
-                    'department': conflict['schedule2']['department'],
-                    'lecturer': conflict['schedule2']['lecturer'],
-                    'time_slot': conflict['schedule2']['time']
-                },
-                'detected_at': conflict['detected_at'].isoformat(),
-                'conflict_hash': conflict['conflict_hash'],
-                'actionable_data': {
-                    'departments_affected': [conflict['schedule1']['department'], conflict['schedule2']['department']],
-                    'lecturers_affected': [conflict['schedule1']['lecturer'], conflict['schedule2']['lecturer']],
-                    'courses_affected': [conflict['schedule1']['course'], conflict['schedule2']['course']],
-                    'resolution_priority': severity.upper(),
-                    'estimated_impact': self._assess_conflict_impact(conflict)
-                }
-            })
+        notification_service.create_notification(
+            admin_id=target_admin_id,
+            type='schedule_conflict',  # Use specific type for proper styling
+            title=title,
+            message=message,
+            data=self._build_notification_data(
+                conflicts, severity, f'{severity.lower()}_priority_conflicts',
+                severity in [ConflictSeverity.CRITICAL, ConflictSeverity.HIGH]
+            )
+        )
 
-        # Create notification with enhanced data structure
-        notification_data = {
-            'notification_type': f'{severity.lower()}_priority_conflicts',
+        logger.info(f"📧 Sent {severity} conflict notification for {conflict_count} conflicts")
+
+    def _describe_scope(self, conflicts: List[Dict]) -> str:
+        rooms = {c['room_id'] for c in conflicts}
+        days = sorted({c['day'] for c in conflicts})
+        return f"in {len(rooms)} room{'s' if len(rooms) != 1 else ''} on {', '.join(days[:3])}{'...' if len(days) > 3 else ''}"
+
+    def _build_notification_data(self, conflicts: List[Dict], severity: str, notification_type: str, action_required: bool) -> Dict:
+        """
+        Compact notification payload: a summary plus references to detected_conflicts.
+        The full conflict list is expanded on demand by get_conflict_details.
+        """
+        return {
+            'notification_type': notification_type,
             'severity': severity,
-            'conflict_count': conflict_count,
-            'conflicts': detailed_conflicts,
-            'action_required': severity in [ConflictSeverity.CRITICAL, ConflictSeverity.HIGH],
+            'conflict_count': len(conflicts),
+            'conflict_hashes': [c['conflict_hash'] for c in conflicts],
+            'action_required': action_required,
             'scan_timestamp': datetime.now().isoformat(),
             'summary': {
-                'total_conflicts': conflict_count,
+                'total_conflicts': len(conflicts),
                 'rooms_affected': list(set([c['room_id'] for c in conflicts])),
                 'days_affected': list(set([c['day'] for c in conflicts])),
                 'departments_affected': list(set([c['schedule1']['department'] for c in conflicts] + [c['schedule2']['department'] for c in conflicts])),
+                'time_slots': [f"{c['overlap_start']}-{c['overlap_end']}" for c in conflicts[:3]],
                 'average_overlap_minutes': sum([c['overlap_duration_minutes'] for c in conflicts]) / len(conflicts),
                 'severity_breakdown': {
                     'critical': len([c for c in conflicts if c['severity'] == ConflictSeverity.CRITICAL]),
@@ -697,31 +615,61 @@ class ScheduleConflictDetector:
                     'medium': len([c for c in conflicts if c['severity'] == ConflictSeverity.MEDIUM]),
                     'low': len([c for c in conflicts if c['severity'] == ConflictSeverity.LOW])
                 }
-            },
-            # Enhanced display data for frontend
-            'display_data': {
-                'room_ids': [c['room_id'] for c in conflicts],
-                'days_of_week': [c['day'] for c in conflicts],
-                'conflicting_time_slots': [f"{c['overlap_start']}-{c['overlap_end']}" for c in conflicts],
-                'course_names': [f"{c['schedule1']['course']} vs {c['schedule2']['course']}" for c in conflicts],
-                'lecturer_info': [f"{c['schedule1']['lecturer']} / {c['schedule2']['lecturer']}" for c in conflicts],
-                'department_info': [f"{c['schedule1']['department']} / {c['schedule2']['department']}" for c in conflicts],
-                'severity_levels': [c['severity'] for c in conflicts],
-                'overlap_durations': [c['overlap_duration_formatted'] for c in conflicts],
-                'overlap_minutes': [c['overlap_duration_minutes'] for c in conflicts],
-                'actionable_data': [c.get('actionable_data', {}) for c in conflicts]
             }
         }
 
-        notification_service.create_notification(
-            admin_id=target_admin_id,
-            type='schedule_conflict',  # Use specific type for proper styling
-            title=title,
-            message=message,
-            data=notification_data
-        )
-
-        logger.info(f"📧 Sent detailed {severity} conflict notification for {conflict_count} conflicts")
+    def get_conflict_details(self, conflict_hashes: List[str]) -> List[Dict]:
+        """Full conflict records for a notification's conflict_hashes, in the notification's order"""
+        records = {
+            doc['conflict_hash']: doc
+            for doc in self.conflicts_collection.find({'conflict_hash': {'$in': conflict_hashes}}, {'_id': 0})
+        }
+        missing = [h for h in conflict_hashes if h not in records]
+        if missing:
+            # Resolved conflicts may have moved to the cold archive
+            for doc in self.db[ARCHIVE_COLLECTION].find({'conflict_hash': {'$in': missing}}, {'_id': 0}):
+                records[doc['conflict_hash']] = doc
+        return [self._format_conflict_detail(records[h]) for h in conflict_hashes if h in records]
+
+    def expand_notification_data(self, data: Dict) -> Dict:
+        """Notification data with its referenced conflicts and the recommended actions filled in"""
+        expanded = dict(data)
+        if 'conflict_hashes' in data:
+            expanded['conflicts'] = self.get_conflict_details(data['conflict_hashes'])
+        expanded['recommended_actions'] = RECOMMENDED_ACTIONS.get(data.get('severity'), [])
+        return expanded
+
+    def _format_conflict_detail(self, conflict: Dict) -> Dict:
+        return {
+            'room_id': conflict['room_id'],
+            'day': conflict['day'],
+            'severity': conflict['severity'],
+            'conflict_type': conflict['conflict_type'],
+            'overlap_period': f"{conflict['overlap_start']}-{conflict['overlap_end']}",
+            'overlap_duration_minutes': conflict['overlap_duration_minutes'],
+            'overlap_duration_formatted': conflict['overlap_duration_formatted'],
+            'schedule1': {
+                'course': conflict['schedule1']['course'],
+                'department': conflict['schedule1']['department'],
+                'lecturer': conflict['schedule1']['lecturer'],
+                'time_slot': conflict['schedule1']['time']
+            },
+            'schedule2': {
+                'course': conflict['schedule2']['course'],
+                'department': conflict['schedule2']['department'],
+                'lecturer': conflict['schedule2']['lecturer'],
+                'time_slot': conflict['schedule2']['time']
+            },
+            'detected_at': conflict['detected_at'].isoformat() if hasattr(conflict['detected_at'], 'isoformat') else str(conflict['detected_at']),
+            'conflict_hash': conflict['conflict_hash'],
+            'actionable_data': {
+                'departments_affected': [conflict['schedule1']['department'], conflict['schedule2']['department']],
+                'lecturers_affected': [conflict['schedule1']['lecturer'], conflict['schedule2']['lecturer']],
+                'courses_affected': [conflict['schedule1']['course'], conflict['schedule2']['course']],
+                'resolution_priority': 'IMMEDIATE' if conflict['severity'] == ConflictSeverity.CRITICAL else conflict['severity'].upper(),
+                'estimated_impact': self._assess_conflict_impact(conflict)
+            }
+        }
 
     def _assess_conflict_impact(self, conflict: Dict) -> str:
         """Assess the potential impact of a conflict"""
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Retention for detected conflicts, plus storage reporting.
+
+A stored conflict is marked resolved_at once a scan covering its room and
+day no longer finds it. Conflicts resolved more than
+CONFLICT_ARCHIVE_AFTER_DAYS ago are moved into detected_conflicts_archive.
+That collection is created with CONFLICT_ARCHIVE_COMPRESSOR (zstd by
+default) block compression, so cold conflicts stay available for
+notification details but out of the hot collection. The web app runs the
+job every CONFLICT_ARCHIVE_INTERVAL_HOURS in a background thread. It can
+also be run by hand:
+
+    python data_retention.py --after-days 30
+
+Read notifications expire NOTIFICATION_READ_TTL_DAYS after they were read.
+NotificationService turns them into tombstones that a TTL index removes
+NOTIFICATION_TOMBSTONE_HOURS later, so polling clients learn they are gone.
+"""
+
+import argparse
+import logging
+import os
+import sys
+import threading
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+from pymongo.errors import BulkWriteError, CollectionInvalid, OperationFailure
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+CONFLICT_ARCHIVE_AFTER_DAYS = int(os.getenv('CONFLICT_ARCHIVE_AFTER_DAYS', '30'))
+CONFLICT_ARCHIVE_INTERVAL_HOURS = float(os.getenv('CONFLICT_ARCHIVE_INTERVAL_HOURS', '24'))
+CONFLICT_ARCHIVE_COMPRESSOR = os.getenv('CONFLICT_ARCHIVE_COMPRESSOR', 'zstd')
+ARCHIVE_COLLECTION = 'detected_conflicts_archive'
+ARCHIVE_BATCH_SIZE = 1000
+
+_archive_ready = False
+_archiver_started = False
+_setup_lock = threading.Lock()
+
+
+def ensure_conflict_archive(db):
+    """Create the compressed archive collection and its lookup index once"""
+    global _archive_ready
+    if _archive_ready:
+        return
+    with _setup_lock:
+        if _archive_ready:
+            return
+        try:
+            db.create_collection(ARCHIVE_COLLECTION, storageEngine={
+                'wiredTiger': {'configString': f'block_compressor={CONFLICT_ARCHIVE_COMPRESSOR}'}
+            })
+        except CollectionInvalid:
+            pass  # already exists
+        except OperationFailure as e:
+            # Servers that reject the storage options still get a plain archive
+            logger.warning(f"Compressed archive collection unavailable, using defaults: {e}")
+        db[ARCHIVE_COLLECTION].create_index([('conflict_hash', 1)])
+        _archive_ready = True
+
+
+def archive_resolved_conflicts(db, after_days=CONFLICT_ARCHIVE_AFTER_DAYS):
+    """Move conflicts resolved more than after_days ago to the archive; returns the number moved"""
+    ensure_conflict_archive(db)
+    cutoff = datetime.utcnow() - timedelta(days=after_days)
+    conflicts = db.detected_conflicts
+    archive = db[ARCHIVE_COLLECTION]
+    moved = 0
+
+    while True:
+        batch = list(conflicts.find({'resolved_at': {'$lt': cutoff}}).limit(ARCHIVE_BATCH_SIZE))
+        if not batch:
+            break
+        ids = [doc['_id'] for doc in batch]
+        try:
+            archive.insert_many(batch, ordered=False)
+        except BulkWriteError as e:
+            # Duplicate keys mean another worker already archived these conflicts
+            if any(error.get('code') != 11000 for error in e.details.get('writeErrors', [])):
+                raise
+        # Only remove what the archive is confirmed to hold, so an interrupted batch loses nothing
+        archived = [doc['_id'] for doc in archive.find({'_id': {'$in': ids}}, {'_id': 1})]
+        if len(archived) < len(ids):
+            logger.error(f"Archive is missing {len(ids) - len(archived)} conflicts of a batch; "
+                         f"leaving them in detected_conflicts")
+        if archived:
+            conflicts.delete_many({'_id': {'$in': archived}})
+        moved += len(archived)
+        if len(archived) < len(ids):
+            break
+
+    if moved:
+        logger.info(f"Archived {moved} conflicts resolved more than {after_days} days ago")
+    return moved
+
+
+def start_conflict_archiver(db, interval_hours=CONFLICT_ARCHIVE_INTERVAL_HOURS):
+    """Run archive_resolved_conflicts periodically in a daemon thread (once per process)"""
+    global _archiver_started
+    if interval_hours <= 0:
+        return
+    with _setup_lock:
+        if _archiver_started:
+            return
+        _archiver_started = True
+
+    stop = threading.Event()
+
+    def _loop():
+        while not stop.wait(interval_hours * 3600):
+            try:
+                archive_resolved_conflicts(db)
+            except Exception as e:
+                logger.error(f"Conflict archival failed: {e}")
+
+    threading.Thread(target=_loop, name='conflict-archiver', daemon=True).start()
+
+
+def collection_storage_stats(db):
+    """Document count, data, storage and index sizes for every collection in db"""
+    collections = []
+    for name in sorted(db.list_collection_names()):
+        if name.startswith('system.'):
+            continue
+        stats = db.command('collStats', name)
+        collections.append({
+            'name': name,
+            'count': stats.get('count', 0),
+            'size_bytes': stats.get('size', 0),
+            'storage_bytes': stats.get('storageSize', 0),
+            'avg_document_bytes': stats.get('avgObjSize', 0),
+            'index_bytes': stats.get('totalIndexSize', 0),
+            'indexes': stats.get('indexSizes', {})
+        })
+
+    return {
+        'collections': collections,
+        'totals': {
+            'count': sum(c['count'] for c in collections),
+            'size_bytes': sum(c['size_bytes'] for c in collections),
+            'storage_bytes': sum(c['storage_bytes'] for c in collections),
+            'index_bytes': sum(c['index_bytes'] for c in collections)
+        }
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Archive resolved schedule conflicts')
+    parser.add_argument('--after-days', type=int, default=CONFLICT_ARCHIVE_AFTER_DAYS,
+                        help='Archive conflicts resolved more than this many days ago')
+    parser.add_argument('--db', default='EduResourceDB', help='Database name')
+    parser.add_argument('--stats', action='store_true', help='Print collection and index sizes afterwards')
+    args = parser.parse_args(argv)
+
+    mongo_uri = os.getenv('MONGO_URI')
+    if not mongo_uri:
+        print("Error: MONGO_URI environment variable not set")
+        return 1
+
+    from pymongo import MongoClient
+    client = MongoClient(mongo_uri)
+    try:
+        db = client[args.db]
+        moved = archive_resolved_conflicts(db, args.after_days)
+        print(f"Archived {moved} conflicts to {ARCHIVE_COLLECTION}")
+        if args.stats:
+            for c in collection_storage_stats(db)['collections']:
+                print(f"{c['name']:<32} {c['count']:>10} docs {c['storage_bytes']:>12} B data {c['index_bytes']:>12} B indexes")
+    except Exception as e:
+        print(f"Error archiving conflicts: {str(e)}")
+        return 1
+    finally:
+        client.close()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,38 +1,13 @@
+"""
+Legacy entry point kept for existing scripts and docs.
 
-import pandas as pd
-from pymongo import MongoClient 
-import os
-from dotenv import load_dotenv
-load_dotenv()
-# MongoDB Atlas Connection
-MONGO_URI = os.getenv("MONGO_URI")
-client = MongoClient(MONGO_URI)
-db = client.EduResourceDB
-timetables_collection = db.timetables
+The old implementation emptied the timetables collection before loading the
+whole CSV in one insert_many. It now delegates to import_timetables, which
+streams the file into a staging collection and swaps it in atomically.
+"""
+import sys
 
+from import_timetables import main
 
-# Clear the collection before inserting new data
-timetables_collection.delete_many({})  
-
-csv_file = "room_data_large.csv"  
-try:
-    df = pd.read_csv(csv_file)
-except FileNotFoundError:
-    print(f"Error: File {csv_file} not found. Please check the path.")
-    exit(1)
-
-# Strip whitespace from column names
-df.columns = df.columns.str.strip()
-
-# Convert DataFrame to list of dictionaries
-records = df.to_dict('records')
-
-# Insert into MongoDB
-try:
-    result = timetables_collection.insert_many(records, ordered=False)
-    print(f"Inserted {len(result.inserted_ids)} documents into timetables collection")
-except Exception as e:
-    print(f"Error importing data: {str(e)}")
-
-# Close connection
-client.close()
\ No newline at end of file
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:] or ["room_data_large.csv"]))
@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""
+Chunked timetable importer.
+
+Streams a timetable CSV in chunks, validates and normalizes the time columns,
+bulk-writes the rows into a staging collection and then swaps the staging
+collection in place of the target with a single rename, so readers never see
+an empty or half-loaded timetable. A file with no valid rows, or with more
+than IMPORT_MAX_REJECTED_FRACTION of its rows rejected, is refused rather than
+swapped in, unless --allow-empty is given.
+
+With --mode incremental the CSV is instead diffed against the existing
+collection on a natural key (Room ID, Day, Start, End, Course), and only the
+inserts, updates and deletes are applied, so unchanged documents keep their _id.
+The file is first read once to validate it, so a refused file writes nothing.
+The existing collection is read once for its key fields only; each chunk's
+rows are then matched with an $in lookup on the hashed _natural_key index and
+written with one bulk_write per chunk. Keys left in the collection but absent
+from the file are deleted in batches through the same index.
+
+Usage:
+    python import_timetables.py room_data_large.csv --chunk-size 5000 --workers 4
+    python import_timetables.py room_data_large.csv --mode incremental
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import pandas as pd
+from dotenv import load_dotenv
+from pymongo import MongoClient, InsertOne, ReplaceOne, UpdateOne
+
+from time_utils import normalize_time_format, validate_time_format
+
+load_dotenv()
+
+DEFAULT_CHUNK_SIZE = int(os.getenv('IMPORT_CHUNK_SIZE', '5000'))
+DEFAULT_WORKERS = int(os.getenv('IMPORT_WORKERS', '4'))
+# Above this share of rejected rows the file is assumed broken and nothing is replaced
+MAX_REJECTED_FRACTION = float(os.getenv('IMPORT_MAX_REJECTED_FRACTION', '0.5'))
+
+REQUIRED_COLUMNS = ['Room ID', 'Day', 'Start', 'End', 'Course']
+NATURAL_KEY_FIELDS = ['Room ID', 'Day', 'Start', 'End', 'Course']
+KEY_FIELD = '_natural_key'
+FINGERPRINT_FIELD = '_fingerprint'
+KEY_PASS_PROJECTION = {field: 1 for field in NATURAL_KEY_FIELDS + [KEY_FIELD]}
+WRITE_BATCH_SIZE = 1000
+
+
+def natural_key(row) -> str:
+    """Stable hash of the fields that identify a schedule"""
+    parts = []
+    for field in NATURAL_KEY_FIELDS:
+        value = row.get(field)
+        if field in ('Start', 'End'):
+            value = normalize_time_format(str(value)) if value is not None else None
+        parts.append('' if value is None else str(value).strip())
+    return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()
+
+
+def fingerprint(row) -> str:
+    """Hash of every stored field, used to tell whether a matched row changed"""
+    content = {k: v for k, v in row.items() if k not in ('_id', KEY_FIELD, FINGERPRINT_FIELD)}
+    encoded = json.dumps(content, sort_keys=True, default=str)
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+
+
+def normalize_chunk(chunk):
+    """Clean one CSV chunk; returns (records, rejected_count)"""
+    chunk.columns = chunk.columns.str.strip()
+
+    missing = [col for col in REQUIRED_COLUMNS if col not in chunk.columns]
+    if missing:
+        raise ValueError(f"CSV is missing required columns: {', '.join(missing)}")
+
+    for col in chunk.select_dtypes(include='object').columns:
+        chunk[col] = chunk[col].map(lambda v: v.strip() if isinstance(v, str) else v)
+
+    chunk['Start'] = chunk['Start'].astype(str).map(normalize_time_format)
+    chunk['End'] = chunk['End'].astype(str).map(normalize_time_format)
+
+    valid = (
+        chunk['Start'].map(validate_time_format) &
+        chunk['End'].map(validate_time_format) &
+        chunk['Room ID'].notna() &
+        chunk['Day'].notna()
+    )
+    rejected = int((~valid).sum())
+
+    chunk = chunk[valid]
+    chunk = chunk.astype(object).where(chunk.notna(), None)
+
+    records = chunk.to_dict('records')
+    for record in records:
+        record[KEY_FIELD] = natural_key(record)
+        record[FINGERPRINT_FIELD] = fingerprint(record)
+    return records, rejected
+
+
+def write_chunk(collection, records):
+    """Bulk insert one chunk into the staging collection"""
+    if not records:
+        return 0
+    result = collection.insert_many(records, ordered=False)
+    return len(result.inserted_ids)
+
+
+def check_import_size(valid_rows, rows_read, rows_rejected, allow_empty=False):
+    """Refuse to replace the timetable with an empty or mostly rejected file"""
+    if allow_empty:
+        return
+    if valid_rows == 0:
+        raise ValueError(
+            f"No valid rows in the CSV ({rows_read} read, {rows_rejected} rejected); "
+            f"refusing to replace the timetable. Pass --allow-empty to import it anyway"
+        )
+    if rows_read and rows_rejected / rows_read > MAX_REJECTED_FRACTION:
+        raise ValueError(
+            f"{rows_rejected} of {rows_read} rows were rejected (limit {MAX_REJECTED_FRACTION:.0%}); "
+            f"refusing to replace the timetable. Pass --allow-empty to import it anyway"
+        )
+
+
+def swap_collections(db, staging_name, target_name):
+    """Copy the target's indexes onto staging and rename staging over the target"""
+    staging = db[staging_name]
+
+    if target_name in db.list_collection_names():
+        for name, info in db[target_name].index_information().items():
+            if name == '_id_':
+                continue
+            options = {k: v for k, v in info.items() if k not in ('key', 'v', 'ns')}
+            staging.create_index(info['key'], name=name, **options)
+
+    staging.create_index([(KEY_FIELD, 'hashed')])
+    staging.rename(target_name, dropTarget=True)
+
+
+def run_import(csv_file, mongo_uri, db_name='EduResourceDB', target='timetables',
+               chunk_size=DEFAULT_CHUNK_SIZE, workers=DEFAULT_WORKERS, dry_run=False, allow_empty=False):
+    """Import csv_file into the target collection; returns a stats dict"""
+    client = MongoClient(mongo_uri)
+    db = client[db_name]
+    staging_name = f"{target}_staging_{int(time.time())}"
+    staging = db[staging_name]
+
+    stats = {'rows_read': 0, 'rows_written': 0, 'rows_rejected': 0, 'chunks': 0}
+    started = time.perf_counter()
+
+    try:
+        reader = pd.read_csv(csv_file, chunksize=chunk_size, dtype={'Date': str})
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = set()
+            for chunk in reader:
+                stats['rows_read'] += len(chunk)
+                stats['chunks'] += 1
+
+                records, rejected = normalize_chunk(chunk)
+                stats['rows_rejected'] += rejected
+
+                if not dry_run:
+                    # Bound in-flight chunks so memory stays flat regardless of file size
+                    if len(pending) >= workers * 2:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        stats['rows_written'] += sum(f.result() for f in done)
+                    pending.add(executor.submit(write_chunk, staging, records))
+
+                elapsed = time.perf_counter() - started
+                print(f"Chunk {stats['chunks']}: {stats['rows_read']} rows read "
+                      f"({stats['rows_read'] / elapsed:,.0f} rows/s)")
+
+            stats['rows_written'] += sum(f.result() for f in pending)
+
+        valid_rows = stats['rows_read'] - stats['rows_rejected'] if dry_run else stats['rows_written']
+        check_import_size(valid_rows, stats['rows_read'], stats['rows_rejected'], allow_empty)
+
+        if dry_run:
+            staging.drop()
+        else:
+            swap_collections(db, staging_name, target)
+
+    except Exception:
+        staging.drop()
+        raise
+    finally:
+        client.close()
+
+    stats['seconds'] = time.perf_counter() - started
+    stats['rows_per_second'] = stats['rows_read'] / stats['seconds'] if stats['seconds'] > 0 else 0
+    return stats
+
+
+def load_existing_keys(collection, dry_run=False):
+    """Set of natural keys in the collection, from a pass over the key fields only.
+
+    Keys are recomputed from the document fields rather than trusted from the
+    stored copy, because in-app edits (reallocate/inject) do not maintain them.
+    Missing or stale stored keys are rewritten so the per-chunk lookups on the
+    hashed index find their documents. Any further documents sharing a key are
+    returned as duplicates. Returns (keys, duplicates, stale), where stale maps
+    each rewritten key to its document's _id; in a dry run nothing is rewritten
+    and the lookups use stale instead.
+    """
+    keys = set()
+    duplicates = []
+    stale = {}
+    repairs = []
+    for doc in collection.find({}, KEY_PASS_PROJECTION, batch_size=5000):
+        key = natural_key(doc)
+        if key in keys:
+            duplicates.append(doc['_id'])
+            continue
+        keys.add(key)
+        if doc.get(KEY_FIELD) != key:
+            stale[key] = doc['_id']
+            repairs.append(UpdateOne({'_id': doc['_id']}, {'$set': {KEY_FIELD: key}}))
+            if len(repairs) >= WRITE_BATCH_SIZE:
+                if not dry_run:
+                    collection.bulk_write(repairs, ordered=False)
+                repairs = []
+    if repairs and not dry_run:
+        collection.bulk_write(repairs, ordered=False)
+    return keys, duplicates, stale
+
+
+def key_filter(keys, stale=None):
+    """Filter for the documents holding keys: on the hashed key index, or by _id for unrepaired stale keys"""
+    stale_ids = [stale[key] for key in keys if key in stale] if stale else []
+    if not stale_ids:
+        return {KEY_FIELD: {'$in': list(keys)}}
+    return {'$or': [{KEY_FIELD: {'$in': list(keys)}}, {'_id': {'$in': stale_ids}}]}
+
+
+def find_by_keys(collection, keys, skip_ids=(), stale=None):
+    """Natural key -> existing document for keys, looked up on the hashed key index"""
+    wanted = set(keys)
+    matches = {}
+    for doc in collection.find(key_filter(wanted, stale)):
+        key = natural_key(doc)
+        if key in wanted and doc['_id'] not in skip_ids:
+            matches.setdefault(key, doc)
+    return matches
+
+
+def validate_file(csv_file, chunk_size):
+    """Read the whole CSV once without writing; returns (rows_read, rows_rejected, unique_rows)"""
+    rows_read = rows_rejected = 0
+    seen_keys = set()
+    for chunk in pd.read_csv(csv_file, chunksize=chunk_size, dtype={'Date': str}):
+        rows_read += len(chunk)
+        records, rejected = normalize_chunk(chunk)
+        rows_rejected += rejected
+        seen_keys.update(record[KEY_FIELD] for record in records)
+    return rows_read, rows_rejected, len(seen_keys)
+
+
+def run_incremental_import(csv_file, mongo_uri, db_name='EduResourceDB', target='timetables',
+                           chunk_size=DEFAULT_CHUNK_SIZE, dry_run=False, allow_empty=False):
+    """Diff csv_file against the target collection and apply only the changes.
+
+    The file is validated in full before anything is written, so a file that
+    fails check_import_size leaves the collection untouched rather than half
+    applied.
+    """
+    stats = {
+        'rows_read': 0, 'rows_rejected': 0, 'chunks': 0, 'duplicates_in_file': 0,
+        'inserted': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0, 'keys_repaired': 0
+    }
+    affected_room_days = set()
+    started = time.perf_counter()
+
+    stats['rows_read'], stats['rows_rejected'], unique_rows = validate_file(csv_file, chunk_size)
+    # Deleting everything not in the file is the destructive step, so check the file first
+    check_import_size(unique_rows, stats['rows_read'], stats['rows_rejected'], allow_empty)
+
+    client = MongoClient(mongo_uri)
+    collection = client[db_name][target]
+
+    try:
+        collection.create_index([(KEY_FIELD, 'hashed')])
+        existing_keys, duplicate_ids, stale = load_existing_keys(collection, dry_run)
+        stats['keys_repaired'] = len(stale)
+        # Once repaired the stored keys match, so only a dry run still needs the _id fallback
+        stale = stale if dry_run else None
+
+        if duplicate_ids and not dry_run:
+            collection.delete_many({'_id': {'$in': duplicate_ids}})
+        stats['deleted'] += len(duplicate_ids)
+        duplicate_ids = set(duplicate_ids)
+        seen_keys = set()
+
+        for chunk in pd.read_csv(csv_file, chunksize=chunk_size, dtype={'Date': str}):
+            stats['chunks'] += 1
+
+            records, _ = normalize_chunk(chunk)
+
+            unique = []
+            for record in records:
+                if record[KEY_FIELD] in seen_keys:
+                    stats['duplicates_in_file'] += 1
+                    continue
+                seen_keys.add(record[KEY_FIELD])
+                unique.append(record)
+
+            matches = find_by_keys(
+                collection, [r[KEY_FIELD] for r in unique if r[KEY_FIELD] in existing_keys], duplicate_ids, stale
+            )
+            operations = []
+            for record in unique:
+                match = matches.get(record[KEY_FIELD])
+                if match is None:
+                    operations.append(InsertOne(record))
+                    stats['inserted'] += 1
+                    affected_room_days.add((record.get('Room ID'), record.get('Day')))
+                elif fingerprint(match) != record[FINGERPRINT_FIELD]:
+                    operations.append(ReplaceOne({'_id': match['_id']}, record))
+                    stats['updated'] += 1
+                    affected_room_days.add((record.get('Room ID'), record.get('Day')))
+                else:
+                    stats['unchanged'] += 1
+
+            if operations and not dry_run:
+                collection.bulk_write(operations, ordered=False)
+
+        missing = list(existing_keys - seen_keys)
+        for i in range(0, len(missing), WRITE_BATCH_SIZE):
+            batch_filter = key_filter(missing[i:i + WRITE_BATCH_SIZE], stale)
+            for doc in collection.find(batch_filter, {'Room ID': 1, 'Day': 1}):
+                affected_room_days.add((doc.get('Room ID'), doc.get('Day')))
+                stats['deleted'] += 1
+            if not dry_run:
+                collection.delete_many(batch_filter)
+
+    finally:
+        client.close()
+
+    stats['seconds'] = time.perf_counter() - started
+    stats['rows_per_second'] = stats['rows_read'] / stats['seconds'] if stats['seconds'] > 0 else 0
+    stats['affected_room_days'] = sorted(
+        (room_id, day) for room_id, day in affected_room_days if room_id and day
+    )
+    return stats
+
+
+def rescan_conflicts(room_days):
+    """Re-run conflict detection for the room/day pairs an import touched"""
+    from conflict_detector import conflict_detector
+
+    conflicts = conflict_detector.scan_room_days(room_days)
+    conflict_detector._process_detected_conflicts(conflicts, scanned_room_days=room_days)
+    return conflicts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Import a timetable CSV into MongoDB')
+    parser.add_argument('csv_file', nargs='?', default='room_data_large.csv', help='CSV file to import')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Rows per chunk')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Parallel bulk writers')
+    parser.add_argument('--collection', default='timetables', help='Target collection')
+    parser.add_argument('--db', default='EduResourceDB', help='Database name')
+    parser.add_argument('--mode', choices=['full', 'incremental'], default='full',
+                        help='full: rebuild and swap; incremental: apply only the diff')
+    parser.add_argument('--no-conflict-scan', action='store_true',
+                        help='Skip re-scanning conflicts for rooms changed by an incremental import')
+    parser.add_argument('--dry-run', action='store_true', help='Validate without writing')
+    parser.add_argument('--allow-empty', action='store_true',
+                        help='Replace the timetable even if the CSV has no valid rows or mostly rejected ones')
+    args = parser.parse_args(argv)
+
+    mongo_uri = os.getenv('MONGO_URI')
+    if not mongo_uri:
+        print("Error: MONGO_URI environment variable not set")
+        return 1
+    if not os.path.exists(args.csv_file):
+        print(f"Error: File {args.csv_file} not found. Please check the path.")
+        return 1
+
+    try:
+        if args.mode == 'incremental':
+            stats = run_incremental_import(
+                args.csv_file,
+                mongo_uri,
+                db_name=args.db,
+                target=args.collection,
+                chunk_size=max(1, args.chunk_size),
+                dry_run=args.dry_run,
+                allow_empty=args.allow_empty
+            )
+        else:
+            stats = run_import(
+                args.csv_file,
+                mongo_uri,
+                db_name=args.db,
+                target=args.collection,
+                chunk_size=max(1, args.chunk_size),
+                workers=max(1, args.workers),
+                dry_run=args.dry_run,
+                allow_empty=args.allow_empty
+            )
+    except Exception as e:
+        print(f"Error importing data: {str(e)}")
+        return 1
+
+    if args.mode == 'incremental':
+        print(f"{'Diffed' if args.dry_run else 'Applied'} {stats['rows_read']} rows in {stats['seconds']:.2f}s "
+              f"({stats['rows_per_second']:,.0f} rows/s): {stats['inserted']} inserted, "
+              f"{stats['updated']} updated, {stats['deleted']} deleted, {stats['unchanged']} unchanged, "
+              f"{stats['rows_rejected']} rejected, {stats['duplicates_in_file']} duplicate rows in file, "
+              f"{stats['keys_repaired']} stale keys {'found' if args.dry_run else 'repaired'}")
+        print(f"Room/day pairs affected: {len(stats['affected_room_days'])}")
+        for room_id, day in stats['affected_room_days']:
+            print(f"  {room_id} {day}")
+
+        if stats['affected_room_days'] and not args.dry_run and not args.no_conflict_scan:
+            conflicts = rescan_conflicts(stats['affected_room_days'])
+            print(f"Conflict re-scan found {len(conflicts)} conflicts in affected rooms")
+        return 0
+
+    print(f"{'Validated' if args.dry_run else 'Imported'} {stats['rows_read']} rows "
+          f"({stats['rows_written']} written, {stats['rows_rejected']} rejected) "
+          f"in {stats['seconds']:.2f}s - {stats['rows_per_second']:,.0f} rows/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
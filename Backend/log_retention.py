@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Indexes and retention for the user activity log (EduResourceDB.logs).
+
+Log timestamps are ISO-8601 strings, which a TTL index cannot expire, so
+retention is an archival job instead. Entries older than LOG_RETENTION_DAYS
+are copied into logs_archive (keeping their _id, so overlapping runs from
+several workers are harmless) and then deleted from the hot collection.
+The web app runs the job every LOG_ARCHIVE_INTERVAL_HOURS in a background
+thread. It can also be run by hand:
+
+    python log_retention.py --retention-days 90
+"""
+
+import argparse
+import logging
+import os
+import sys
+import threading
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+from pymongo.errors import BulkWriteError
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+LOG_RETENTION_DAYS = int(os.getenv('LOG_RETENTION_DAYS', '90'))
+LOG_ARCHIVE_INTERVAL_HOURS = float(os.getenv('LOG_ARCHIVE_INTERVAL_HOURS', '24'))
+ARCHIVE_COLLECTION = 'logs_archive'
+ARCHIVE_BATCH_SIZE = 1000
+
+_indexes_ready = False
+_archiver_started = False
+_setup_lock = threading.Lock()
+
+
+def ensure_log_indexes(logs_collection):
+    """Indexes behind the /api/logs filters and newest-first pagination"""
+    global _indexes_ready
+    if _indexes_ready:
+        return
+    with _setup_lock:
+        if _indexes_ready:
+            return
+        logs_collection.create_index([('timestamp', 1), ('action', 1)])
+        logs_collection.create_index([('timestamp', -1), ('_id', -1)])
+        logs_collection.create_index([('username', 1), ('timestamp', -1)])
+        _indexes_ready = True
+
+
+def archive_logs(db, retention_days=LOG_RETENTION_DAYS):
+    """Move entries older than retention_days to logs_archive; returns the number moved"""
+    cutoff = (datetime.utcnow() - timedelta(days=retention_days)).isoformat()
+    logs = db.logs
+    archive = db[ARCHIVE_COLLECTION]
+    moved = 0
+
+    while True:
+        batch = list(logs.find({'timestamp': {'$lt': cutoff}}).sort('timestamp', 1).limit(ARCHIVE_BATCH_SIZE))
+        if not batch:
+            break
+        try:
+            archive.insert_many(batch, ordered=False)
+        except BulkWriteError as e:
+            # Duplicate keys mean another worker already archived these entries
+            if any(error.get('code') != 11000 for error in e.details.get('writeErrors', [])):
+                raise
+        logs.delete_many({'_id': {'$in': [doc['_id'] for doc in batch]}})
+        moved += len(batch)
+
+    if moved:
+        logger.info(f"Archived {moved} log entries older than {retention_days} days")
+    return moved
+
+
+def start_log_archiver(db, interval_hours=LOG_ARCHIVE_INTERVAL_HOURS):
+    """Run archive_logs periodically in a daemon thread (once per process)"""
+    global _archiver_started
+    if interval_hours <= 0:
+        return
+    with _setup_lock:
+        if _archiver_started:
+            return
+        _archiver_started = True
+
+    stop = threading.Event()
+
+    def _loop():
+        while not stop.wait(interval_hours * 3600):
+            try:
+                archive_logs(db)
+            except Exception as e:
+                logger.error(f"Log archival failed: {e}")
+
+    threading.Thread(target=_loop, name='log-archiver', daemon=True).start()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Archive old activity log entries')
+    parser.add_argument('--retention-days', type=int, default=LOG_RETENTION_DAYS,
+                        help='Keep this many days of logs in the hot collection')
+    parser.add_argument('--db', default='EduResourceDB', help='Database name')
+    args = parser.parse_args(argv)
+
+    mongo_uri = os.getenv('MONGO_URI')
+    if not mongo_uri:
+        print("Error: MONGO_URI environment variable not set")
+        return 1
+
+    from pymongo import MongoClient
+    client = MongoClient(mongo_uri)
+    try:
+        db = client[args.db]
+        ensure_log_indexes(db.logs)
+        moved = archive_logs(db, args.retention_days)
+    except Exception as e:
+        print(f"Error archiving logs: {str(e)}")
+        return 1
+    finally:
+        client.close()
+
+    print(f"Archived {moved} log entries to {ARCHIVE_COLLECTION}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
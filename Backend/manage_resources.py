@@ -7,11 +7,16 @@ from pymongo.errors import PyMongoError
 from dotenv import load_dotenv
 import os
 from process import preprocess_data
+from repository import MongoTimetableRepository, get_timetable_repository
+from tracing import get_tracer
+from time_utils import normalize_time_format, validate_time_format
+from resource_operations import MANAGE_OPERATIONS
 from flask_jwt_extended import jwt_required, get_jwt_identity
 load_dotenv()
 
 
 manage_resources_bp = Blueprint('manage_resources', __name__)
+_trace = get_tracer(__name__)
 MONGO_URI = os.getenv("MONGO_URI")
 try:
     client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=8000)
@@ -19,104 +24,17 @@ try:
     print("MongoDB connection successful in manage_resources")
     db = client['EduResourceDB']
     timetables = db['timetables']
+    timetable_repository = MongoTimetableRepository(timetables)
 except Exception as e:
     print(f"MongoDB connection error in manage_resources: {e}")
-   
- 
-def validate_time_format(time_str):
-   
-    if not isinstance(time_str, str):
-        return False
-    
-    # Check if time_str contains ':'
-    if ':' not in time_str:
-        return False
-    
-    parts = time_str.split(':')
-    if len(parts) != 2:
-        return False
-    
-    hours_str, minutes_str = parts
-    
-    
-    if not (hours_str.isdigit() and minutes_str.isdigit()):
-        return False
-    
-    try:
-        hours, minutes = int(hours_str), int(minutes_str)
-        # Validate range
-        if not (0 <= hours <= 23 and 0 <= minutes <= 59):
-            return False
-        return True
-    except ValueError:
-        return False
+    timetable_repository = None
 
-def normalize_time_format(time_str):
-   
-    if not time_str or not isinstance(time_str, str):
-        return None
-    
-    # Remove extra whitespace
-    time_str = str(time_str).strip()
-    
-    # If it's already empty or None-like, return None
-    if not time_str or time_str.lower() in ['none', 'null', 'nan', '']:
-        return None
-    
-    try:
-        # Handle combined time format (e.g., "08:00–10:00")
-        if '–' in time_str or '-' in time_str:
-            # Extract just the start time
-            parts = time_str.replace('–', '-').split('-')
-            if len(parts) >= 2:
-                # Take the first part as the start time
-                time_str = parts[0].strip()
-        
-        # Remove common time suffixes
-        time_str = time_str.replace('hrs', '').replace('hr', '').replace('h', '').strip()
-        
-        # Handle formats without colons
-        if ':' not in time_str:
-            if time_str.isdigit():
-                if len(time_str) == 1:  # "8" -> "08:00"
-                    time_str = f"0{time_str}:00"
-                elif len(time_str) == 2:  # "14" -> "14:00"
-                    time_str = f"{time_str}:00"
-                elif len(time_str) == 3:  # "830" -> "08:30"
-                    time_str = f"0{time_str[0]}:{time_str[1:]}"
-                elif len(time_str) == 4:  # "1430" -> "14:30"
-                    time_str = f"{time_str[:2]}:{time_str[2:]}"
-        
-        # Handle formats with dots
-        if '.' in time_str:
-            time_str = time_str.replace('.', ':')
-        
-        # Handle formats with spaces (e.g., "8 30" -> "08:30")
-        if ' ' in time_str:
-            parts = time_str.split()
-            if len(parts) == 2 and parts[0].isdigit() and parts[1].isdigit():
-                time_str = f"{parts[0]}:{parts[1]}"
-        
-        # Ensure HH:MM format with leading zeros
-        if ':' in time_str:
-            parts = time_str.split(':')
-            if len(parts) >= 2:
-                hour = parts[0].zfill(2)  # Add leading zero if needed
-                minute = parts[1].zfill(2)  # Add leading zero if needed
-                
-                # Validate hour and minute ranges
-                if 0 <= int(hour) <= 23 and 0 <= int(minute) <= 59:
-                    normalized = f"{hour}:{minute}"
-                    print(f"Normalized '{time_str}' to '{normalized}'")
-                    return normalized
-        
-        print(f"Could not normalize time format: '{time_str}'")
-        return None
-        
-    except (ValueError, IndexError, AttributeError) as e:
-        print(f"Error normalizing time '{time_str}': {e}")
-        return None
 
+def get_timetables():
+    """Timetable repository in use: an installed override, else this module's MongoDB one"""
+    return get_timetable_repository(default=timetable_repository)
+   
+ 
 def has_time_overlap(start1, end1, start2, end2):
     
     try:
@@ -138,7 +56,8 @@ def has_time_overlap(start1, end1, start2, end2):
         return s1 < e2 and e1 > s2
         
     except (ValueError, TypeError) as e:
-        print(f"Error in has_time_overlap: {e}")
+        if _trace.enabled:
+            _trace.event('has_time_overlap_error', slot1=f"{start1}-{end1}", slot2=f"{start2}-{end2}", error=str(e))
         
         return True
 
@@ -171,7 +90,8 @@ def check_overlap(start1, end1, start2, end2):
         time_strings = [start1, end1, start2, end2]
         for time_str in time_strings:
             if not validate_time_format(time_str):
-                print(f"Invalid time format detected: {time_str}")
+                if _trace.enabled:
+                    _trace.event('overlap_invalid_time', value=time_str)
                 return True
         
         # Convert to datetime.time objects for proper comparison
@@ -180,17 +100,16 @@ def check_overlap(start1, end1, start2, end2):
         s2 = datetime.strptime(start2, '%H:%M').time()
         e2 = datetime.strptime(end2, '%H:%M').time()
         
-        print(f"OVERLAP CHECK: Comparing {start1}-{end1} vs {start2}-{end2}")
-        print(f"  Parsed times: {s1}-{e1} vs {s2}-{e2}")
-        
         # Special case: if any period has zero duration
         if s1 == e1 or s2 == e2:
-            print(f"  Zero duration detected, no overlap")
+            if _trace.enabled:
+                _trace.event('overlap_check', slot1=f"{start1}-{end1}", slot2=f"{start2}-{end2}", result='zero_duration')
             return False
         
         # CRITICAL FIX: Check for identical time slots (exact duplicates)
         if s1 == s2 and e1 == e2:
-            print(f"  *** EXACT DUPLICATE DETECTED: {start1}-{end1} is identical to {start2}-{end2} ***")
+            if _trace.enabled:
+                _trace.event('overlap_check', slot1=f"{start1}-{end1}", slot2=f"{start2}-{end2}", result='exact_duplicate')
             return True
         
        
@@ -199,13 +118,16 @@ def check_overlap(start1, end1, start2, end2):
         condition2 = e1 > s2
         overlap_detected = condition1 and condition2
         
-        print(f"  Overlap conditions: {s1} < {e2} = {condition1}, {e1} > {s2} = {condition2}")
-        print(f"  Result: {'OVERLAP DETECTED' if overlap_detected else 'NO OVERLAP'}")
+        if _trace.enabled:
+            _trace.event('overlap_check', slot1=f"{start1}-{end1}", slot2=f"{start2}-{end2}",
+                         start1_before_end2=condition1, end1_after_start2=condition2,
+                         result='overlap' if overlap_detected else 'no_overlap')
         
         return overlap_detected
 
     except (ValueError, TypeError) as e:
-        print(f"Error in check_overlap: {e}")
+        if _trace.enabled:
+            _trace.event('overlap_check_error', slot1=f"{start1}-{end1}", slot2=f"{start2}-{end2}", error=str(e))
         return True
 
 
@@ -285,7 +207,8 @@ def manage_resources():
    
     try:
         
-        if db is None or timetables is None:
+        timetables = get_timetables()
+        if timetables is None:
             return jsonify({
                 'status': 'error', 
                 'error': 'Database connection is not available. Please check your MongoDB connection.'
@@ -296,6 +219,8 @@ def manage_resources():
             return jsonify({'error': 'Missing operation in request'}), 400
 
         operation = data.get('operation')
+        if not isinstance(operation, str) or operation not in MANAGE_OPERATIONS:
+            return jsonify({'status': 'error', 'error': f'Invalid operation: {operation}'}), 400
         room_id = data.get('room_id')
         date = data.get('date', datetime.now().strftime('%Y-%m-%d'))
         start_time = data.get('start_time')
@@ -385,7 +310,7 @@ def manage_resources():
                 }), 404
 
             # Check if multiple schedules match (ambiguous identification)
-                matching_schedules = list(timetables.find(query))
+                matching_schedules = timetables.find(query, include_id=True)
                 if len(matching_schedules) > 1:
                     return jsonify({
                         'status': 'error', 
@@ -430,7 +355,7 @@ def manage_resources():
             conflicts = []
             if room_changed or time_changed:
                 new_room_query = {'Room ID': new_room_id, 'Day': new_day}
-                existing_schedules = list(timetables.find(new_room_query, {'_id': 0}))
+                existing_schedules = timetables.find(new_room_query)
 
                 for schedule in existing_schedules:
                     # Skip the original schedule being reallocated
@@ -445,7 +370,8 @@ def manage_resources():
                 
                     # Skip schedules with invalid time format
                 if not validate_time_format(schedule_start) or not validate_time_format(schedule_end):
-                    print(f"Skipping schedule with invalid time format: Start={schedule_start}, End={schedule_end}")
+                    if _trace.enabled:
+                        _trace.event('reallocate_invalid_time', start=schedule_start, end=schedule_end)
                           
                         
                 
@@ -510,9 +436,8 @@ def manage_resources():
                 }
             }
             # Use the original schedule's _id for the update to ensure we update the correct document
-            update_query = {'_id': original_schedule['_id']}
-            result = timetables.update_one(update_query, update)
-            if result.matched_count == 0:
+            matched = timetables.update(original_schedule['_id'], update['$set'])
+            if matched == 0:
                 return jsonify({'status': 'error', 'error': 'Schedule not found during update'}), 404
 
             return jsonify({
@@ -549,12 +474,14 @@ def manage_resources():
                 if not validate_time_format(start_time) or not validate_time_format(end_time):
                     return jsonify({'status': 'error', 'error': 'Invalid time format for start_time or end_time. Use HH:MM format.'}), 400
 
-                print(f"Checking for conflicts on {day} for room {room_id} from {start_time} to {end_time}")
+                if _trace.enabled:
+                    _trace.event('inject_conflict_check_start', room_id=room_id, day=day, start=start_time, end=end_time)
 
                 # Query by day of week - using the provided day
                 query = {'Room ID': room_id, 'Day': day}
-                existing_schedules = list(timetables.find(query, {'_id': 0}))
-                print(f"Found {len(existing_schedules)} schedules for room {room_id} on {day}")
+                existing_schedules = timetables.find(query)
+                if _trace.enabled:
+                    _trace.event('inject_schedules_loaded', room_id=room_id, day=day, count=len(existing_schedules))
 
                 conflicts = []
                 for schedule in existing_schedules:
@@ -575,14 +502,15 @@ def manage_resources():
                     schedule_start = normalize_time_format(schedule_start)
                     schedule_end = normalize_time_format(schedule_end)
 
-                    print(f"Checking potential conflict: Course={schedule_course}, Time={schedule_start}-{schedule_end}")
-
                     if not validate_time_format(schedule_start) or not validate_time_format(schedule_end):
-                        print(f"  → Skipping due to invalid time format")
+                        if _trace.enabled:
+                            _trace.event('inject_invalid_time', course=schedule_course, start=schedule_start, end=schedule_end)
                         continue
 
                     has_overlap = check_overlap(start_time, end_time, schedule_start, schedule_end)
-                    print(f"  → Overlap check result: {has_overlap}")
+                    if _trace.enabled:
+                        _trace.event('inject_overlap_check', course=schedule_course,
+                                     slot=f"{schedule_start}-{schedule_end}", result=has_overlap)
 
                     if has_overlap:
                         conflict = {
@@ -591,7 +519,8 @@ def manage_resources():
                             'time': f"{schedule_start}-{schedule_end}"
                         }
                         conflicts.append(conflict)
-                        print(f"  → CONFLICT DETECTED: {conflict}")
+                        if _trace.enabled:
+                            _trace.event('inject_conflict', conflict=conflict)
 
                 if conflicts:
                     return jsonify({
@@ -614,12 +543,12 @@ def manage_resources():
                     'Status': data.get('status', 'Booked')
                 }
 
-                result = timetables.insert_one(new_schedule_doc)
+                timetables.insert(new_schedule_doc)
 
                 response_doc = serialize_mongo_doc(new_schedule_doc)
 
                 try:
-                    all_room_schedules = list(timetables.find({'Room ID': room_id}, {'_id': 0}))
+                    all_room_schedules = timetables.find({'Room ID': room_id})
 
                     if all_room_schedules:
                         # Convert to DataFrame
@@ -678,11 +607,11 @@ def manage_resources():
                     query['Day'] = day
                 
                 # Get total count for pagination info
-                total_count = timetables.count_documents(query)
+                total_count = timetables.count(query)
                 
                
                 # Include _id for reallocate operation - don't exclude it
-                schedules = list(timetables.find(query).skip(skip).limit(per_page))
+                schedules = timetables.find(query, include_id=True, skip=skip, limit=per_page)
                 
                 # Format times consistently for display and convert ObjectId to string
                 for schedule in schedules:
@@ -763,10 +692,10 @@ def manage_resources():
                     all_rooms = [room_id]
                 else:
                     room_filter = {'Day': day}
-                    all_rooms = list(timetables.distinct('Room ID'))
+                    all_rooms = timetables.distinct_rooms()
                 
                 # Get all schedules for the day in one query
-                all_schedules = list(timetables.find(room_filter, {'_id': 0}))
+                all_schedules = timetables.find(room_filter)
                 
                 # Group schedules by room
                 schedules_by_room = {}
@@ -812,7 +741,8 @@ def manage_resources():
                                     'department': schedule.get('Department', 'Unknown')
                         })
                     else:
-                                print(f"Warning: Invalid schedule duration for {room}: {schedule_start}-{schedule_end}")
+                                if _trace.enabled:
+                                    _trace.event('suggest_invalid_duration', room_id=room, start=schedule_start, end=schedule_end)
                        
                     
                     # Calculate free time slots using improved logic
@@ -952,6 +882,8 @@ def manage_resources():
                         'message': 'Conflict monitoring status retrieved',
                         'monitoring_active': conflict_detector.running,
                         'scan_interval': conflict_detector.scan_interval,
+                        'digest_window': conflict_detector.digest.window,
+                        'pending_digest_conflicts': conflict_detector.digest.pending_count(),
                         'last_scan': 'Not implemented yet'  # TODO: Add last scan tracking
                     }), 200
 
@@ -959,14 +891,14 @@ def manage_resources():
                     # Use the authenticated admin_id for notifications
                     conflicts = conflict_detector.scan_all_conflicts()
 
+                    # Store conflicts first: notifications only reference them by hash
+                    conflict_detector._process_detected_conflicts(conflicts, current_admin_id)
+
                     # For manual scans, always create notifications for the requesting admin
                     # regardless of whether conflicts are new or existing
                     if conflicts and current_admin_id:
                         conflict_detector._create_manual_scan_notifications(conflicts, current_admin_id)
 
-                    # Still process conflicts normally for database storage
-                    conflict_detector._process_detected_conflicts(conflicts, current_admin_id)
-
                     return jsonify({
                         'status': 'success',
                         'message': f'Manual conflict scan completed',
@@ -995,14 +927,14 @@ def manage_resources():
         elif operation == 'get_room_count':
             try:
                 
-                distinct_rooms = timetables.distinct('Room ID')
+                distinct_rooms = timetables.distinct_rooms()
                 total_rooms = len(distinct_rooms)
 
                 # Get additional statistics
-                total_schedules = timetables.count_documents({})
+                total_schedules = timetables.count()
 
                 # Get rooms with schedules vs empty rooms
-                rooms_with_schedules = len(list(timetables.distinct('Room ID', {'Room ID': {'$exists': True, '$ne': None}})))
+                rooms_with_schedules = len(timetables.distinct_rooms({'Room ID': {'$exists': True, '$ne': None}}))
                 empty_rooms = total_rooms - rooms_with_schedules if total_rooms > rooms_with_schedules else 0
 
                 return jsonify({
@@ -1034,28 +966,31 @@ def manage_resources():
                 if end_time and not validate_time_format(end_time):
                     return jsonify({'status': 'error', 'error': 'Invalid time format for end_time. Use HH:MM format.'}), 400
 
-                print(f"Enhanced overlap check for Room: {room_id}, Day: {day}")
+                if _trace.enabled:
+                    _trace.event('overlap_operation_start', room_id=room_id, day=day)
 
                 
                 
                 # Strategy 1: Exact day match
                 query_exact = {'Room ID': room_id, 'Day': day}
-                schedules_exact = list(timetables.find(query_exact, {'_id': 0}))
-                print(f"Strategy 1 - Exact day match: Found {len(schedules_exact)} schedules")
+                schedules_exact = timetables.find(query_exact)
+                if _trace.enabled:
+                    _trace.event('overlap_strategy', strategy='exact_day', found=len(schedules_exact))
                 
                 # Strategy 2: Case-insensitive day match
                 query_case_insensitive = {'Room ID': room_id, 'Day': {'$regex': f'^{day}$', '$options': 'i'}}
-                schedules_case_insensitive = list(timetables.find(query_case_insensitive, {'_id': 0}))
+                schedules_case_insensitive = timetables.find(query_case_insensitive)
                 
                 
                 # Strategy 3: Room only (ignore day field - useful if day data is inconsistent)
                 query_room_only = {'Room ID': room_id}
-                schedules_room_only = list(timetables.find(query_room_only, {'_id': 0}))
+                schedules_room_only = timetables.find(query_room_only)
                 
                 # Strategy 4: Find schedules with missing/null day field
                 query_missing_day = {'Room ID': room_id, '$or': [{'Day': {'$exists': False}}, {'Day': None}, {'Day': ''}]}
-                schedules_missing_day = list(timetables.find(query_missing_day, {'_id': 0}))
-                print(f"Strategy 4 - Missing day field: Found {len(schedules_missing_day)} schedules")
+                schedules_missing_day = timetables.find(query_missing_day)
+                if _trace.enabled:
+                    _trace.event('overlap_strategy', strategy='missing_day', found=len(schedules_missing_day))
                 
                 # Combine all unique schedules (avoid duplicates)
                 all_schedules = []
@@ -1094,7 +1029,8 @@ def manage_resources():
                         }
                     }), 200
 
-                print(f"Found {len(room_schedules)} total schedules for Room {room_id} on {day}")
+                if _trace.enabled:
+                    _trace.event('overlap_schedules_loaded', room_id=room_id, day=day, count=len(room_schedules))
 
                
                 normalized_schedules = []
@@ -1165,15 +1101,16 @@ def manage_resources():
                             'course': schedule.get('Course', 'Unknown')
                         })
 
-                print(f"Normalized {len(normalized_schedules)} valid schedules, found {len(invalid_schedules)} invalid schedules")
+                if _trace.enabled:
+                    _trace.event('overlap_schedules_normalized', valid=len(normalized_schedules), invalid=len(invalid_schedules))
 
                 # DUPLICATE DETECTION ANALYSIS
                 from collections import Counter
                 time_signatures = [candidate['time_signature'] for candidate in duplicate_candidates]
                 duplicate_time_slots = {time_sig: count for time_sig, count in Counter(time_signatures).items() if count > 1}
                 
-                if duplicate_time_slots:
-                    print(f"DUPLICATE TIME SLOTS DETECTED: {duplicate_time_slots}")
+                if duplicate_time_slots and _trace.enabled:
+                    _trace.event('overlap_duplicate_slots', slots=duplicate_time_slots)
 
                 # Sort schedules by start time for analysis
                 normalized_schedules.sort(key=lambda x: datetime.strptime(x['start'], '%H:%M').time())
@@ -1193,8 +1130,6 @@ def manage_resources():
                         overlap_result = check_overlap(schedule1['start'], schedule1['end'], schedule2['start'], schedule2['end'])
                         
                         if overlap_result:
-                            print(f"✅ OVERLAP CONFIRMED!")
-                            
                             # Calculate overlap period
                             overlap_start = max(schedule1['start'], schedule2['start'], key=lambda t: datetime.strptime(t, '%H:%M').time())
                             overlap_end = min(schedule1['end'], schedule2['end'], key=lambda t: datetime.strptime(t, '%H:%M').time())
@@ -1233,44 +1168,14 @@ def manage_resources():
                             conflict_description = f"{schedule1['course']} vs {schedule2['course']} ({conflict_type})"
                             all_overlaps.append(conflict_description)
                             
-                            print(f"🚨 CONFLICT DETECTED: {conflict_description}")
-                            print(f"   Overlap period: {overlap_start}-{overlap_end} ({format_duration(overlap_duration)})")
-                            print(f"   Severity: {overlap_info['conflict_severity']}")
-                        else:
-                            print(f"❌ No overlap detected")
-                            
-                            # Additional debugging for suspected overlaps
-                            if (schedule1['start'] == '08:00' and schedule1['end'] == '09:55') or \
-                               (schedule2['start'] == '08:00' and schedule2['end'] == '09:55'):
-                                print(f"🔍 TARGET TIME SLOT DEBUG - WHY NO OVERLAP?")
-                                print(f"  This should have been flagged as an overlap!")
-                                print(f"  Re-checking overlap logic manually...")
-                                
-                                # Manual overlap check for debugging
-                                s1 = datetime.strptime(schedule1['start'], '%H:%M').time()
-                                e1 = datetime.strptime(schedule1['end'], '%H:%M').time()
-                                s2 = datetime.strptime(schedule2['start'], '%H:%M').time()
-                                e2 = datetime.strptime(schedule2['end'], '%H:%M').time()
-                                
-                                print(f"  Manual check: s1={s1}, e1={e1}, s2={s2}, e2={e2}")
-                                print(f"  s1 < e2: {s1 < e2}")
-                                print(f"  e1 > s2: {e1 > s2}")
-                                print(f"  s1 == s2 and e1 == e2: {s1 == s2 and e1 == e2}")
-
-                print(f"\n=== OVERLAP DETECTION COMPLETE ===")
-                print(f"FINAL RESULT: Found {len(overlapping_pairs)} conflicts total")
-                
-                if len(overlapping_pairs) == 0:
-                    print(f"⚠️  NO CONFLICTS DETECTED - This might indicate a logic error!")
-                    print(f"   Schedules analyzed: {len(normalized_schedules)}")
-                    print(f"   If you expected conflicts, check the debug output above.")
-                else:
-                    print(f"✅ CONFLICTS FOUND:")
-                    for i, conflict in enumerate(overlapping_pairs):
-                        print(f"   {i+1}. {conflict['schedule1']['course']} vs {conflict['schedule2']['course']} " +
-                              f"({conflict['conflict_type']}) - {conflict['overlap_period']}")
+                            if _trace.enabled:
+                                _trace.event('overlap_conflict', conflict=conflict_description,
+                                             period=overlap_info['overlap_period'],
+                                             severity=overlap_info['conflict_severity'])
 
-                print(f"=== END OVERLAP ANALYSIS ===\n")
+                if _trace.enabled:
+                    _trace.event('overlap_operation_done', room_id=room_id, day=day,
+                                 schedules=len(normalized_schedules), conflicts=len(overlapping_pairs))
 
                 # SCHEDULE GAP ANALYSIS (free time between schedules)
                 business_start, business_end = get_business_hours(day)
@@ -1394,7 +1299,8 @@ def time_diff_minutes(start_time, end_time):
     try:
         # Validate input formats first
         if not validate_time_format(start_time) or not validate_time_format(end_time):
-            print(f"Invalid time format: start={start_time}, end={end_time}")
+            if _trace.enabled:
+                _trace.event('time_diff_invalid', start=start_time, end=end_time)
             return 0
         
         # Parse times
@@ -1408,20 +1314,24 @@ def time_diff_minutes(start_time, end_time):
         if diff < 0:
             # Add 24 hours (1440 minutes) for overnight periods
             diff += 24 * 60
-            print(f"Detected overnight period: {start_time} to {end_time} = {diff} minutes")
+            if _trace.enabled:
+                _trace.event('time_diff_overnight', start=start_time, end=end_time, minutes=diff)
         
         # Validate reasonable duration (max 24 hours)
         if diff > 24 * 60:
-            print(f"Warning: Duration exceeds 24 hours: {start_time} to {end_time}")
+            if _trace.enabled:
+                _trace.event('time_diff_too_long', start=start_time, end=end_time)
             return 0
         
         return int(diff)
         
     except ValueError as e:
-        print(f"Error parsing times: {start_time}, {end_time} - {e}")
+        if _trace.enabled:
+            _trace.event('time_diff_error', start=start_time, end=end_time, error=str(e))
         return 0
     except Exception as e:
-        print(f"Unexpected error in time_diff_minutes: {e}")
+        if _trace.enabled:
+            _trace.event('time_diff_error', start=start_time, end=end_time, error=str(e))
         return 0
 
 # Helper function to format duration - IMPROVED VERSION
@@ -1466,7 +1376,8 @@ def compare_times(time1, time2):
         else:
             return 0
     except Exception as e:
-        print(f"Error comparing times {time1} and {time2}: {e}")
+        if _trace.enabled:
+            _trace.event('compare_times_error', time1=time1, time2=time2, error=str(e))
         return 0
 
 def is_time_before(time1, time2):
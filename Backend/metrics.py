@@ -0,0 +1,248 @@
+"""
+In-process request and MongoDB metrics, exposed in Prometheus text format.
+
+init_metrics(app) records a latency histogram per endpoint (and per
+manage_resources operation) and serves everything on /metrics.
+register_mongo_listener() installs a pymongo command listener that counts
+Mongo round trips and time per command, and attributes them to the request
+that issued them. It must run before any MongoClient is created, because
+clients only pick up listeners registered at construction time.
+"""
+
+import contextvars
+import os
+import threading
+import time
+from collections import defaultdict
+
+from flask import Response, g, request
+from pymongo import monitoring
+
+from resource_operations import MANAGE_OPERATIONS
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROUND_TRIP_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250)
+
+# Per-request Mongo usage; the listener runs on the thread that issued the command
+_request_db_stats = contextvars.ContextVar('request_db_stats', default=None)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] += amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [bucket counts..., sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {key: list(series) for key, series in self._series.items()}
+        for label_values, series in sorted(snapshot.items()):
+            for bound, bucket_count in zip(self.buckets, series):
+                labels = _format_labels(self.labels, label_values, f'le="{bound:g}"')
+                lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+            labels = _format_labels(self.labels, label_values, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {series[-1]}")
+            labels = _format_labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, help_text, labels=()):
+        metric = Counter(name, help_text, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, help_text, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+http_requests_total = registry.counter(
+    'http_requests_total', 'HTTP requests by endpoint and status', ('method', 'endpoint', 'status'))
+http_request_duration = registry.histogram(
+    'http_request_duration_seconds', 'HTTP request latency', ('method', 'endpoint'))
+operation_duration = registry.histogram(
+    'manage_resources_operation_duration_seconds', 'Latency of /api/manage_resources by operation', ('operation',))
+request_mongo_commands = registry.histogram(
+    'http_request_mongo_commands', 'MongoDB round trips per request', ('endpoint',), ROUND_TRIP_BUCKETS)
+request_mongo_duration = registry.histogram(
+    'http_request_mongo_seconds', 'Time spent in MongoDB per request', ('endpoint',))
+mongo_commands_total = registry.counter(
+    'mongodb_commands_total', 'MongoDB commands by name and outcome', ('command', 'outcome'))
+mongo_command_duration = registry.histogram(
+    'mongodb_command_duration_seconds', 'MongoDB command latency', ('command',))
+
+
+class MongoMetricsListener(monitoring.CommandListener):
+    """Counts every Mongo command and charges it to the current request, if any"""
+
+    def started(self, event):
+        pass
+
+    def _record(self, event, outcome):
+        seconds = event.duration_micros / 1e6
+        mongo_commands_total.inc(event.command_name, outcome)
+        mongo_command_duration.observe(seconds, event.command_name)
+
+        stats = _request_db_stats.get()
+        if stats is not None:
+            stats['commands'] += 1
+            stats['seconds'] += seconds
+
+    def succeeded(self, event):
+        self._record(event, 'success')
+
+    def failed(self, event):
+        self._record(event, 'failure')
+
+
+_listener_registered = False
+
+
+def register_mongo_listener():
+    """Install the command listener globally; call before creating MongoClients"""
+    global _listener_registered
+    if _listener_registered or not METRICS_ENABLED:
+        return
+    monitoring.register(MongoMetricsListener())
+    _listener_registered = True
+
+
+def current_request_db_stats():
+    """Mongo round trips and seconds charged to the current request so far"""
+    return _request_db_stats.get()
+
+
+def _endpoint_label():
+    if request.url_rule is not None:
+        return request.url_rule.rule
+    return 'unmatched'
+
+
+def _operation_label():
+    data = request.get_json(silent=True) or {}
+    operation = data.get('operation') if isinstance(data, dict) else None
+    operation = operation or request.args.get('operation')
+    if not operation:
+        return 'unknown'
+    # Anything else the client sends is labelled 'other' so request bodies
+    # cannot create unbounded histogram series
+    if not isinstance(operation, str) or operation not in MANAGE_OPERATIONS:
+        return 'other'
+    return operation
+
+
+def init_metrics(app):
+    """Register request timing hooks and the /metrics endpoint"""
+    if not METRICS_ENABLED:
+        return
+
+    @app.before_request
+    def _start_request_timer():
+        g._metrics_started = time.perf_counter()
+        g._metrics_token = _request_db_stats.set({'commands': 0, 'seconds': 0.0})
+
+    @app.after_request
+    def _capture_status(response):
+        g._metrics_status = response.status_code
+        return response
+
+    # Recorded at teardown so streamed exports are timed until the last chunk
+    @app.teardown_request
+    def _record_request(error=None):
+        started = g.pop('_metrics_started', None)
+        token = g.pop('_metrics_token', None)
+        if started is None:
+            return
+
+        elapsed = time.perf_counter() - started
+        endpoint = _endpoint_label()
+        stats = _request_db_stats.get()
+        try:
+            _request_db_stats.reset(token)
+        except ValueError:
+            # Teardown for a streamed response can run in a different context
+            _request_db_stats.set(None)
+
+        if endpoint == '/metrics':
+            return
+        status = g.pop('_metrics_status', 500 if error else 200)
+
+        http_requests_total.inc(request.method, endpoint, str(status))
+        http_request_duration.observe(elapsed, request.method, endpoint)
+        if request.endpoint == 'manage_resources.manage_resources':
+            operation_duration.observe(elapsed, _operation_label())
+
+        if stats is not None:
+            request_mongo_commands.observe(stats['commands'], endpoint)
+            request_mongo_duration.observe(stats['seconds'], endpoint)
+
+    @app.route('/metrics')
+    def metrics():
+        if METRICS_TOKEN and request.headers.get('Authorization') != f'Bearer {METRICS_TOKEN}':
+            return Response('Unauthorized\n', status=401, mimetype='text/plain')
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
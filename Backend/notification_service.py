@@ -3,9 +3,13 @@
 Real-time Notification Service for Admin Dashboard
 """
 
+import logging
 import os
+import queue
+import threading
 from datetime import datetime, timedelta
 from pymongo import MongoClient
+from pymongo.errors import DuplicateKeyError, OperationFailure
 from bson import ObjectId
 from dotenv import load_dotenv
 from typing import Dict, List, Optional
@@ -13,6 +17,8 @@ from enum import Enum
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 class NotificationType(Enum):
     BOOKING_CREATED = "booking_created"
     BOOKING_UPDATED = "booking_updated"
@@ -21,19 +27,204 @@ class NotificationType(Enum):
     SCHEDULE_CONFLICT = "schedule_conflict"
     SYSTEM_ALERT = "system_alert"
 
+SSE_QUEUE_SIZE = int(os.getenv('SSE_QUEUE_SIZE', '100'))
+# Lists leave out the conflict references; GET /admin/notifications/<id>/details expands them
+LIST_PROJECTION = {"data.conflict_hashes": 0}
+# Read notifications expire this many days after read_at; 0 keeps them
+NOTIFICATION_READ_TTL_DAYS = int(os.getenv('NOTIFICATION_READ_TTL_DAYS', '30'))
+# An expired notification stays behind as a tombstone (is_active False) for this long, so
+# clients syncing with ?since= learn it is gone; a client further behind resyncs in full
+NOTIFICATION_TOMBSTONE_HOURS = float(os.getenv('NOTIFICATION_TOMBSTONE_HOURS', '48'))
+NOTIFICATION_EXPIRY_INTERVAL_MINUTES = float(os.getenv('NOTIFICATION_EXPIRY_INTERVAL_MINUTES', '60'))
+UNREAD_RECONCILE_INTERVAL_MINUTES = float(os.getenv('UNREAD_RECONCILE_INTERVAL_MINUTES', '60'))
+# A counter change still in flight after this long came from a crashed request; reconciliation clears it
+UNREAD_PENDING_TIMEOUT = timedelta(minutes=5)
+
+
+class NotificationBroker:
+    """In-process fan-out of notification events to open SSE streams, keyed by admin id"""
+
+    def __init__(self, queue_size=SSE_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers = {}
+        # Queues that dropped an event and need a resync from the database
+        self._overflowed = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, admin_id: str) -> queue.Queue:
+        events = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(admin_id, set()).add(events)
+        return events
+
+    def unsubscribe(self, admin_id: str, events: queue.Queue):
+        with self._lock:
+            subscribers = self._subscribers.get(admin_id)
+            if subscribers is not None:
+                subscribers.discard(events)
+                if not subscribers:
+                    del self._subscribers[admin_id]
+            self._overflowed.discard(events)
+
+    def has_subscribers(self, admin_id: str) -> bool:
+        return admin_id in self._subscribers
+
+    def stream_count(self) -> int:
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def publish(self, admin_id: str, event: str, payload: Dict):
+        with self._lock:
+            subscribers = list(self._subscribers.get(admin_id, ()))
+        for events in subscribers:
+            try:
+                events.put_nowait((event, payload))
+            except queue.Full:
+                # A stalled client resyncs from the database once it drains its queue
+                with self._lock:
+                    self._overflowed.add(events)
+
+    def take_overflow(self, events: queue.Queue) -> bool:
+        """True, once, if events dropped something since the last call"""
+        with self._lock:
+            if events in self._overflowed:
+                self._overflowed.discard(events)
+                return True
+            return False
+
+
 class NotificationService:
     def __init__(self):
         self.mongo_uri = os.getenv("MONGO_URI")
         self.client = MongoClient(self.mongo_uri)
         self.db = self.client.EduResourceDB
         self.notifications_collection = self.db.admin_notifications
+        # One {_id: admin_id, unread: n} document per admin, kept in step with every write
+        self.counters_collection = self.db.admin_notification_counters
         
-        # Create indexes
+        # Indexes are created on first use so importing this module needs no server
+        self._indexes_ready = False
+        self.broker = NotificationBroker()
+        self._reconciler_started = False
+        self._expiry_started = False
+        self._reconciler_lock = threading.Lock()
+
+    def _ensure_indexes(self):
+        """Create the notification indexes once, on first use"""
+        if self._indexes_ready:
+            return
         self.notifications_collection.create_index([("admin_id", 1), ("created_at", -1)])
         self.notifications_collection.create_index([("read", 1)])
+        self.notifications_collection.create_index([("admin_id", 1), ("updated_at", 1)])
+        self.notifications_collection.create_index([("admin_id", 1), ("read", 1), ("is_active", 1)])
+        if NOTIFICATION_READ_TTL_DAYS > 0:
+            self._ensure_tombstone_ttl(int(NOTIFICATION_TOMBSTONE_HOURS * 3600))
+        self._indexes_ready = True
+
+    def _ensure_tombstone_ttl(self, seconds: int):
+        """TTL on expired_at: only tombstones left by expire_read_notifications have it"""
+        try:
+            # Read notifications used to be deleted outright, which clients never heard about
+            self.notifications_collection.drop_index("read_at_ttl")
+        except OperationFailure:
+            pass
+        try:
+            self.notifications_collection.create_index([("expired_at", 1)], expireAfterSeconds=seconds, name="expired_at_ttl")
+        except OperationFailure:
+            # The index exists with another period; change it in place
+            self.db.command("collMod", self.notifications_collection.name,
+                            index={"name": "expired_at_ttl", "expireAfterSeconds": seconds})
+
+    def expire_read_notifications(self, ttl_days: int = NOTIFICATION_READ_TTL_DAYS) -> int:
+        """Turn notifications read more than ttl_days ago into tombstones; returns how many"""
+        if ttl_days <= 0:
+            return 0
+        self._ensure_indexes()
+        now = datetime.utcnow()
+        result = self.notifications_collection.update_many(
+            {"read": True, "is_active": True, "read_at": {"$lt": now - timedelta(days=ttl_days)}},
+            {"$set": {"is_active": False, "expired_at": now, "updated_at": now}}
+        )
+        if result.modified_count:
+            logger.info(f"Expired {result.modified_count} notifications read more than {ttl_days} days ago")
+        return result.modified_count
+
+    def needs_resync(self, since: datetime) -> bool:
+        """True if tombstones newer than since may already be gone, so a ?since= diff is incomplete"""
+        return (NOTIFICATION_READ_TTL_DAYS > 0 and
+                since < datetime.utcnow() - timedelta(hours=NOTIFICATION_TOMBSTONE_HOURS))
+
+    def _begin_unread_change(self, admin_id: str) -> bool:
+        """Mark a counter change as in flight before the notifications are written.
+
+        Bumping version here makes any reconciliation that already read the
+        counter fail its compare-and-set, and pending keeps later ones away
+        until _adjust_unread lands. Returns whether a counter existed.
+        """
+        result = self.counters_collection.update_one(
+            {"_id": admin_id},
+            {"$inc": {"pending": 1, "version": 1}, "$set": {"pending_at": datetime.utcnow()}}
+        )
+        return result.matched_count > 0
+
+    def _adjust_unread(self, admin_id: str, delta: int, begun: bool):
+        """Atomically move an admin's unread counter and end the change begun for it"""
+        if begun:
+            self.counters_collection.update_one(
+                {"_id": admin_id},
+                {"$inc": {"unread": delta, "pending": -1}, "$set": {"updated_at": datetime.utcnow()}}
+            )
+            return
+        if delta == 0:
+            return
+        result = self.counters_collection.update_one(
+            {"_id": admin_id},
+            {"$inc": {"unread": delta}, "$set": {"updated_at": datetime.utcnow()}}
+        )
+        if result.matched_count == 0:
+            # The notification change is already written, so a real count includes it
+            self._seed_unread(admin_id)
+
+    def _seed_unread(self, admin_id: str) -> int:
+        """Create a missing counter from a real count and return the unread count"""
+        count = self._count_unread(admin_id)
+        try:
+            result = self.counters_collection.update_one(
+                {"_id": admin_id},
+                {"$setOnInsert": {"unread": count, "pending": 0, "version": 0, "updated_at": datetime.utcnow()}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            result = None
+        if result is None or result.upserted_id is None:
+            # Another request seeded it first
+            counter = self.counters_collection.find_one({"_id": admin_id}, {"unread": 1})
+            return max(0, counter.get("unread", 0)) if counter else count
+
+        # A change between the count and the seed found no counter to $inc; recount to include it
+        recount = self._count_unread(admin_id)
+        if recount != count:
+            self.counters_collection.update_one(
+                {"_id": admin_id, "unread": count},
+                {"$set": {"unread": recount, "updated_at": datetime.utcnow()}}
+            )
+        return recount
+
+    def _count_unread(self, admin_id: str) -> int:
+        return self.notifications_collection.count_documents({
+            "admin_id": admin_id,
+            "read": False,
+            "is_active": True
+        })
+
+    def _publish_unread_count(self, admin_id: str):
+        if self.broker.has_subscribers(admin_id):
+            self.broker.publish(admin_id, "unread_count", {"unread_count": self.get_unread_count(admin_id)})
     
     def create_notification(self, admin_id: str, type: str, title: str, message: str, data: Dict = None) -> str:
         """Create a new notification"""
+        self._ensure_indexes()
+        now = datetime.utcnow()
         notification = {
             "_id": ObjectId(),
             "admin_id": admin_id,
@@ -42,60 +233,199 @@ class NotificationService:
             "message": message,
             "data": data or {},
             "read": False,
-            "created_at": datetime.utcnow(),
+            "created_at": now,
+            "updated_at": now,
             "is_active": True
         }
         
-        result = self.notifications_collection.insert_one(notification)
+        begun = self._begin_unread_change(admin_id)
+        delta = 0
+        try:
+            result = self.notifications_collection.insert_one(notification)
+            delta = 1
+        finally:
+            self._adjust_unread(admin_id, delta, begun)
+        if self.broker.has_subscribers(admin_id):
+            listed = dict(notification, data={k: v for k, v in notification["data"].items() if k != "conflict_hashes"})
+            self.broker.publish(admin_id, "notification", self._format_notification(listed))
+            self._publish_unread_count(admin_id)
         return str(result.inserted_id)
     
     def get_notifications(self, admin_id: str, limit: int = 50, unread_only: bool = False) -> List[Dict]:
         
+        self._ensure_indexes()
         query = {"admin_id": admin_id, "is_active": True}
         
         if unread_only:
             query["read"] = False
         
-        cursor = self.notifications_collection.find(query).sort("created_at", -1).limit(limit)
-        notifications = []
-        
-        for doc in cursor:
-            notifications.append({
-                "id": str(doc["_id"]),
-                "type": doc["type"],
-                "title": doc["title"],
-                "message": doc["message"],
-                "data": doc.get("data", {}),
-                "read": doc["read"],
-                "created_at": doc["created_at"].isoformat(),
-                "time_ago": self._get_time_ago(doc["created_at"])
-            })
-        
-        return notifications
+        cursor = self.notifications_collection.find(query, LIST_PROJECTION).sort("created_at", -1).limit(limit)
+        return [self._format_notification(doc) for doc in cursor]
+
+    def get_notification(self, notification_id: str, admin_id: str) -> Optional[Dict]:
+        """One notification with its full data, or None"""
+        doc = self.notifications_collection.find_one({"_id": ObjectId(notification_id), "admin_id": admin_id})
+        return self._format_notification(doc) if doc else None
+
+    def get_changes_since(self, admin_id: str, since: datetime, limit: int = 100) -> List[Dict]:
+        """Notifications created, marked read or expired after since, oldest change first.
+
+        Expired ones come back as {"id": ..., "deleted": True} tombstones.
+        """
+        self._ensure_indexes()
+        cursor = self.notifications_collection.find({
+            "admin_id": admin_id,
+            "updated_at": {"$gt": since}
+        }, LIST_PROJECTION).sort("updated_at", 1).limit(limit)
+        return [
+            self._format_notification(doc) if doc.get("is_active", True) else {"id": str(doc["_id"]), "deleted": True}
+            for doc in cursor
+        ]
+
+    def _format_notification(self, doc: Dict) -> Dict:
+        return {
+            "id": str(doc["_id"]),
+            "type": doc["type"],
+            "title": doc["title"],
+            "message": doc["message"],
+            "data": doc.get("data", {}),
+            "read": doc["read"],
+            "created_at": doc["created_at"].isoformat(),
+            "time_ago": self._get_time_ago(doc["created_at"])
+        }
     
     def mark_as_read(self, notification_id: str, admin_id: str) -> bool:
         """Mark a notification as read"""
-        result = self.notifications_collection.update_one(
-            {"_id": ObjectId(notification_id), "admin_id": admin_id},
-            {"$set": {"read": True, "read_at": datetime.utcnow()}}
-        )
+        now = datetime.utcnow()
+        begun = self._begin_unread_change(admin_id)
+        delta = 0
+        try:
+            result = self.notifications_collection.update_one(
+                {"_id": ObjectId(notification_id), "admin_id": admin_id, "read": False, "is_active": True},
+                {"$set": {"read": True, "read_at": now, "updated_at": now}}
+            )
+            delta = -result.modified_count
+        finally:
+            self._adjust_unread(admin_id, delta, begun)
+        if result.modified_count > 0 and self.broker.has_subscribers(admin_id):
+            self.broker.publish(admin_id, "read", {"ids": [notification_id]})
+            self._publish_unread_count(admin_id)
         return result.modified_count > 0
     
     def mark_all_as_read(self, admin_id: str) -> int:
         """Mark all notifications as read"""
-        result = self.notifications_collection.update_many(
-            {"admin_id": admin_id, "read": False},
-            {"$set": {"read": True, "read_at": datetime.utcnow()}}
-        )
+        now = datetime.utcnow()
+        begun = self._begin_unread_change(admin_id)
+        delta = 0
+        try:
+            result = self.notifications_collection.update_many(
+                {"admin_id": admin_id, "read": False, "is_active": True},
+                {"$set": {"read": True, "read_at": now, "updated_at": now}}
+            )
+            delta = -result.modified_count
+        finally:
+            self._adjust_unread(admin_id, delta, begun)
+        if result.modified_count > 0 and self.broker.has_subscribers(admin_id):
+            self.broker.publish(admin_id, "read_all", {"count": result.modified_count})
+            self._publish_unread_count(admin_id)
         return result.modified_count
     
     def get_unread_count(self, admin_id: str) -> int:
-        """Get count of unread notifications"""
-        return self.notifications_collection.count_documents({
-            "admin_id": admin_id,
-            "read": False,
-            "is_active": True
-        })
+        """Get count of unread notifications from the admin's counter document"""
+        self._start_reconciler()
+        self._start_expiry()
+        counter = self.counters_collection.find_one({"_id": admin_id}, {"unread": 1})
+        if counter is not None:
+            return max(0, counter.get("unread", 0))
+
+        # First read for this admin: seed the counter from a real count
+        self._ensure_indexes()
+        return self._seed_unread(admin_id)
+
+    def reconcile_unread_counts(self) -> int:
+        """Rewrite every counter from the notifications themselves; returns how many were corrected"""
+        self._ensure_indexes()
+        # Counters are read before counting. A correction only applies if no write
+        # began since (version unchanged) and none was in flight when the counter
+        # was read (pending 0), so every change is either in both the count and the
+        # counter, or lands on the corrected counter afterwards
+        now = datetime.utcnow()
+        seen = {
+            counter["_id"]: counter
+            for counter in self.counters_collection.find({}, {"unread": 1, "version": 1, "pending": 1, "pending_at": 1})
+        }
+        actual = {
+            row["_id"]: row["unread"]
+            for row in self.notifications_collection.aggregate([
+                {"$match": {"read": False, "is_active": True}},
+                {"$group": {"_id": "$admin_id", "unread": {"$sum": 1}}}
+            ])
+        }
+        corrected = 0
+        for admin_id, counter in seen.items():
+            expected = actual.pop(admin_id, 0)
+            pending = counter.get("pending")
+            if pending and counter.get("pending_at", now) > now - UNREAD_PENDING_TIMEOUT:
+                continue
+            if counter.get("unread") != expected or pending:
+                result = self.counters_collection.update_one(
+                    {"_id": admin_id, "version": counter.get("version"), "pending": pending},
+                    {"$set": {"unread": expected, "pending": 0, "updated_at": now}, "$inc": {"version": 1}}
+                )
+                corrected += result.modified_count
+        # Admins with unread notifications but no counter yet
+        for admin_id, unread in actual.items():
+            try:
+                self.counters_collection.update_one(
+                    {"_id": admin_id},
+                    {"$setOnInsert": {"unread": unread, "pending": 0, "version": 0, "updated_at": datetime.utcnow()}},
+                    upsert=True
+                )
+            except DuplicateKeyError:
+                pass
+        if corrected:
+            logger.warning(f"Corrected {corrected} drifted unread notification counters")
+        return corrected
+
+    def _start_reconciler(self, interval_minutes: float = UNREAD_RECONCILE_INTERVAL_MINUTES):
+        """Run reconcile_unread_counts periodically in a daemon thread (once per process)"""
+        if self._reconciler_started or interval_minutes <= 0:
+            return
+        with self._reconciler_lock:
+            if self._reconciler_started:
+                return
+            self._reconciler_started = True
+
+        stop = threading.Event()
+
+        def _loop():
+            while not stop.wait(interval_minutes * 60):
+                try:
+                    self.reconcile_unread_counts()
+                except Exception as e:
+                    logger.error(f"Unread counter reconciliation failed: {e}")
+
+        threading.Thread(target=_loop, name='unread-reconciler', daemon=True).start()
+
+    def _start_expiry(self, interval_minutes: float = NOTIFICATION_EXPIRY_INTERVAL_MINUTES):
+        """Run expire_read_notifications periodically in a daemon thread (once per process)"""
+        if self._expiry_started or interval_minutes <= 0 or NOTIFICATION_READ_TTL_DAYS <= 0:
+            return
+        with self._reconciler_lock:
+            if self._expiry_started:
+                return
+            self._expiry_started = True
+
+        stop = threading.Event()
+
+        def _loop():
+            while not stop.wait(interval_minutes * 60):
+                try:
+                    self.expire_read_notifications()
+                except Exception as e:
+                    logger.error(f"Notification expiry failed: {e}")
+
+        threading.Thread(target=_loop, name='notification-expiry', daemon=True).start()
     
     def _get_time_ago(self, created_at: datetime) -> str:
         """Get human-readable time ago string"""
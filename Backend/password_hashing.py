@@ -0,0 +1,133 @@
+"""
+Bounded worker pool for bcrypt hashing and verification.
+
+bcrypt is deliberately slow: about 250 ms at 12 rounds. Run on the request
+thread, a login burst at the start of term ties up every worker. Hashing
+and verification run on PASSWORD_HASH_WORKERS dedicated threads instead.
+bcrypt releases the GIL, so they really run in parallel. At most
+PASSWORD_HASH_QUEUE further requests may wait for a worker. Beyond that,
+PasswordHasherBusy is raised and init_password_hashing turns it into a 429
+with Retry-After, so the burst is shed instead of queueing without bound. A
+job still waiting after PASSWORD_HASH_TIMEOUT seconds is answered the same way.
+
+New hashes use BCRYPT_ROUNDS. needs_rehash reports stored hashes made with
+another cost, and verify_and_upgrade returns a fresh hash for them so login
+can store it. PASSWORD_HASH_WORKERS=0 hashes on the calling thread.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import bcrypt
+from flask import jsonify
+
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', '12'))
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_QUEUE = int(os.getenv('PASSWORD_HASH_QUEUE', '16'))
+PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', '10'))
+RETRY_AFTER_SECONDS = 2
+
+
+class PasswordHasherBusy(Exception):
+    """Every worker is busy and the wait queue is full"""
+
+
+def _as_bytes(value):
+    return value.encode('utf-8') if isinstance(value, str) else value
+
+
+def hash_rounds(hashed) -> int:
+    """Cost factor of a stored bcrypt hash ($2b$12$...), or 0 if it cannot be read"""
+    try:
+        return int(_as_bytes(hashed).split(b'$')[2])
+    except (IndexError, ValueError, AttributeError):
+        return 0
+
+
+class PasswordHasher:
+    def __init__(self, workers=PASSWORD_HASH_WORKERS, queue_size=PASSWORD_HASH_QUEUE,
+                 rounds=BCRYPT_ROUNDS, timeout=PASSWORD_HASH_TIMEOUT):
+        self.workers = workers
+        self.rounds = rounds
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt') if workers > 0 else None
+        # Running plus waiting jobs; a failed acquire means the queue is full
+        self._slots = threading.BoundedSemaphore(workers + queue_size) if workers > 0 else None
+        self._stats = {'completed': 0, 'rejected': 0, 'timed_out': 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key):
+        with self._stats_lock:
+            self._stats[key] += 1
+
+    def _run(self, fn, *args):
+        if self._executor is None:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            self._count('rejected')
+            raise PasswordHasherBusy()
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            result = future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            # A job still waiting for a thread is dropped and frees its slot; one already
+            # running keeps it until bcrypt finishes. The caller is shed like a full queue
+            future.cancel()
+            self._count('timed_out')
+            raise PasswordHasherBusy()
+        self._count('completed')
+        return result
+
+    def hash(self, password: str) -> str:
+        """bcrypt hash of password at the configured cost"""
+        return self._run(
+            lambda: bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=self.rounds)).decode('utf-8')
+        )
+
+    def verify(self, password: str, hashed) -> bool:
+        """Check password against a stored hash (str or bytes)"""
+        if not password or not hashed:
+            return False
+        return self._run(bcrypt.checkpw, password.encode('utf-8'), _as_bytes(hashed))
+
+    def needs_rehash(self, hashed) -> bool:
+        return hash_rounds(hashed) != self.rounds
+
+    def verify_and_upgrade(self, password: str, hashed):
+        """(valid, new_hash): new_hash is set when the stored hash used another cost"""
+        if not self.verify(password, hashed):
+            return False, None
+        if not self.needs_rehash(hashed):
+            return True, None
+        try:
+            return True, self.hash(password)
+        except PasswordHasherBusy:
+            return True, None  # upgrade on a quieter login
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats.update({'workers': self.workers, 'rounds': self.rounds})
+        return stats
+
+
+password_hasher = PasswordHasher()
+
+
+def init_password_hashing(app):
+    """Answer PasswordHasherBusy with 429 Too Many Requests"""
+
+    @app.errorhandler(PasswordHasherBusy)
+    def _password_hasher_busy(error):
+        response = jsonify({
+            'status': 'error',
+            'error': 'Too many login attempts in progress, please retry shortly'
+        })
+        response.headers['Retry-After'] = str(RETRY_AFTER_SECONDS)
+        return response, 429
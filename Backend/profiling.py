@@ -0,0 +1,273 @@
+"""
+On-demand request profiling.
+
+A request is profiled when any of these is true:
+  - it carries a valid X-Profile-Token header. An admin gets one from
+    POST /api/admin/profiles/token with {"route": "/api/..."}. It signs the
+    expiry time, the admin's id and that route pattern with PROFILE_SECRET
+    (or SECRET_KEY), and only profiles requests to that route that carry the
+    same admin's access token, so it can be replayed from curl against
+    production data without letting anyone else use it.
+  - it has ?_profile=1 and an admin access token.
+  - it falls into the PROFILE_SAMPLE_RATE fraction of traffic.
+
+PROFILE_MODE=cprofile (default) writes a .pstats file. PROFILE_MODE=sampler
+takes stack samples every PROFILE_SAMPLE_INTERVAL_MS instead and writes
+collapsed stacks (one "frame;frame;frame count" per line, flamegraph input).
+Results go to logs/profiles, which keeps the newest PROFILE_MAX_FILES files.
+They are listed and downloaded through /api/admin/profiles. Only one
+request is profiled at a time, and the others run unprofiled.
+"""
+
+import base64
+import cProfile
+import hashlib
+import hmac
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from flask import g, jsonify, request, send_from_directory
+from flask_jwt_extended import get_jwt, get_jwt_identity, jwt_required, verify_jwt_in_request
+
+PROFILE_DIR = os.path.join('logs', 'profiles')
+PROFILE_MODE = os.getenv('PROFILE_MODE', 'cprofile').lower()
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv('PROFILE_SAMPLE_INTERVAL_MS', '5'))
+PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', '50'))
+PROFILE_TOKEN_TTL = int(os.getenv('PROFILE_TOKEN_TTL', '900'))
+PROFILE_HEADER = 'X-Profile-Token'
+ADMIN_ROLES = ('admin', 'super_admin')
+
+# cProfile cannot profile two threads' requests at once (and 3.12 refuses outright)
+_profile_lock = threading.Lock()
+
+
+def _secret():
+    return (os.getenv('PROFILE_SECRET') or os.getenv('SECRET_KEY') or '').encode()
+
+
+def _sign(payload):
+    return hmac.new(_secret(), payload.encode(), hashlib.sha256).hexdigest()
+
+
+def issue_profile_token(admin_id, route, ttl=PROFILE_TOKEN_TTL):
+    """A header value that enables profiling of route for admin_id until it expires"""
+    expires = int(time.time()) + ttl
+    claims = json.dumps({'exp': expires, 'sub': str(admin_id), 'route': route}, separators=(',', ':'))
+    payload = base64.urlsafe_b64encode(claims.encode()).decode().rstrip('=')
+    return f"{payload}.{_sign(payload)}", expires
+
+
+def verify_profile_token(token, admin_id, route):
+    """True if token is unexpired, correctly signed and issued to admin_id for route"""
+    if not token or '.' not in token or not _secret() or admin_id is None:
+        return False
+    payload, signature = token.rsplit('.', 1)
+    if not hmac.compare_digest(_sign(payload), signature):
+        return False
+    try:
+        claims = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+    except (ValueError, TypeError):
+        return False
+    return (
+        isinstance(claims, dict)
+        and isinstance(claims.get('exp'), int) and claims['exp'] >= time.time()
+        and claims.get('sub') == str(admin_id)
+        and claims.get('route') == route
+    )
+
+
+def _request_identity():
+    try:
+        verify_jwt_in_request(optional=True)
+        return get_jwt_identity()
+    except Exception:
+        return None
+
+
+def _is_admin_request():
+    try:
+        verify_jwt_in_request(optional=True)
+        return get_jwt().get('role') in ADMIN_ROLES
+    except Exception:
+        return False
+
+
+def _profile_reason():
+    token = request.headers.get(PROFILE_HEADER)
+    if token:
+        rule = request.url_rule.rule if request.url_rule is not None else None
+        if verify_profile_token(token, _request_identity(), rule):
+            return 'token'
+    if request.args.get('_profile') == '1' and _is_admin_request():
+        return 'admin'
+    if PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+        return 'sampled'
+    return None
+
+
+class StackSampler:
+    """Statistical profiler: samples one thread's stack from a background thread"""
+
+    def __init__(self, thread_id, interval=PROFILE_SAMPLE_INTERVAL_MS / 1000):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=1)
+
+    def dump(self, path):
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def _prune(directory, keep):
+    files = sorted(
+        (os.path.join(directory, name) for name in os.listdir(directory)),
+        key=os.path.getmtime
+    )
+    for path in files[:max(0, len(files) - keep)]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _profile_filename(elapsed_ms, reason, extension):
+    rule = request.url_rule.rule if request.url_rule is not None else request.path
+    slug = re.sub(r'[^A-Za-z0-9]+', '_', rule).strip('_') or 'root'
+    stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')
+    return f"{stamp}_{slug}_{reason}_{int(elapsed_ms)}ms{extension}"
+
+
+def list_profiles():
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for name in os.listdir(PROFILE_DIR):
+        path = os.path.join(PROFILE_DIR, name)
+        stat = os.stat(path)
+        profiles.append({
+            'name': name,
+            'format': 'pstats' if name.endswith('.pstats') else 'collapsed',
+            'size_bytes': stat.st_size,
+            'created_at': datetime.utcfromtimestamp(stat.st_mtime).isoformat()
+        })
+    return sorted(profiles, key=lambda p: p['created_at'], reverse=True)
+
+
+def init_profiling(app):
+    """Register the profiling request hooks and the admin profile endpoints"""
+
+    @app.before_request
+    def _start_profiler():
+        reason = _profile_reason()
+        if reason is None or not _profile_lock.acquire(blocking=False):
+            return
+
+        if PROFILE_MODE == 'sampler':
+            profiler = StackSampler(threading.get_ident())
+            profiler.start()
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        g._profiler = (profiler, reason, time.perf_counter())
+
+    @app.teardown_request
+    def _stop_profiler(error=None):
+        state = g.pop('_profiler', None)
+        if state is None:
+            return
+        profiler, reason, started = state
+        try:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            if isinstance(profiler, StackSampler):
+                profiler.stop()
+                path = os.path.join(PROFILE_DIR, _profile_filename(elapsed_ms, reason, '.collapsed'))
+                profiler.dump(path)
+            else:
+                profiler.disable()
+                path = os.path.join(PROFILE_DIR, _profile_filename(elapsed_ms, reason, '.pstats'))
+                profiler.dump_stats(path)
+            _prune(PROFILE_DIR, PROFILE_MAX_FILES)
+            app.logger.info(f"Profiled {request.method} {request.path} ({reason}, {elapsed_ms:.0f}ms) -> {path}")
+        except Exception as e:
+            app.logger.error(f"Failed to write request profile: {e}")
+        finally:
+            _profile_lock.release()
+
+    def _admin_only():
+        if get_jwt().get('role') not in ADMIN_ROLES:
+            return jsonify({'error': 'Admin access required'}), 403
+        return None
+
+    @app.route('/api/admin/profiles', methods=['GET'])
+    @jwt_required()
+    def list_request_profiles():
+        denied = _admin_only()
+        if denied:
+            return denied
+        return jsonify({
+            'profiles': list_profiles(),
+            'mode': PROFILE_MODE,
+            'sample_rate': PROFILE_SAMPLE_RATE
+        }), 200
+
+    @app.route('/api/admin/profiles/<path:name>', methods=['GET'])
+    @jwt_required()
+    def download_request_profile(name):
+        denied = _admin_only()
+        if denied:
+            return denied
+        if not os.path.isfile(os.path.join(PROFILE_DIR, os.path.basename(name))):
+            return jsonify({'error': 'Profile not found'}), 404
+        return send_from_directory(os.path.abspath(PROFILE_DIR), os.path.basename(name), as_attachment=True)
+
+    @app.route('/api/admin/profiles/token', methods=['POST'])
+    @jwt_required()
+    def issue_request_profile_token():
+        denied = _admin_only()
+        if denied:
+            return denied
+        if not _secret():
+            return jsonify({'error': 'PROFILE_SECRET or SECRET_KEY must be set to sign profile tokens'}), 503
+        data = request.get_json(silent=True) or {}
+        route = data.get('route') if isinstance(data, dict) else None
+        if not isinstance(route, str) or not any(rule.rule == route for rule in app.url_map.iter_rules()):
+            return jsonify({'error': 'route must be one of the app\'s URL rules, e.g. /api/current_utilization'}), 400
+        admin_id = get_jwt_identity()
+        token, expires = issue_profile_token(admin_id, route)
+        app.logger.info(f"Profile token for {route} issued to admin {admin_id}")
+        return jsonify({
+            'header': PROFILE_HEADER,
+            'token': token,
+            'route': route,
+            'expires_at': datetime.utcfromtimestamp(expires).isoformat()
+        }), 200
@@ -1,59 +1,379 @@
+"""
+Sliding-window-counter rate limiting shared by the API and admin login.
 
-from flask import request, jsonify
+Each key keeps two counters: requests in the current fixed window and in the
+previous one. The rate is estimated as current + previous weighted by how much
+of the previous window still overlaps the sliding window. That costs O(1)
+memory per key however many requests it makes, unlike a timestamp per request.
+
+Counters live in a backend:
+  local  an LRU-bounded dict in this process (RATE_LIMIT_MAX_KEYS keys); the default
+  mongo  a rate_limits collection with a TTL index, so limits hold across
+         gunicorn workers and hosts (RATE_LIMIT_BACKEND=mongo, set up by
+         init_rate_limiting)
+
+If the backend fails the request is let through and the error logged, so a
+database outage does not lock everyone out.
+
+Clients are keyed by client_ip(). Behind TRUSTED_PROXY_HOPS proxies it takes
+the X-Forwarded-For entry the outermost trusted proxy appended and ignores
+whatever the client put further left, so one client is one key however the
+chain looks. TRUSTED_PROXY_HOPS defaults to 1 with FLASK_ENV=production and
+0 otherwise. A warning is logged the first time X-Forwarded-For arrives while
+it is 0, since every client would then share the proxy's key.
+
+Limits come from named profiles in RATE_LIMIT_PROFILES, overridable with
+RATE_LIMIT_<PROFILE>=limit/window_seconds. @rate_limit(profile=...) applies
+one to a route; limit_blueprint(bp, profile) applies one to every route of a
+blueprint that does not declare its own.
+"""
+
+from flask import request, jsonify, current_app
 from functools import wraps
+import os
+import threading
 import time
-from collections import defaultdict, deque
+from collections import OrderedDict
+from datetime import datetime
 import logging
 
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
 logger = logging.getLogger(__name__)
 
+RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'local').lower()
+RATE_LIMIT_MAX_KEYS = int(os.getenv('RATE_LIMIT_MAX_KEYS', '100000'))
+RATE_LIMIT_COLLECTION = 'rate_limits'
+# Production runs behind Render's load balancer, which appends one X-Forwarded-For hop
+TRUSTED_PROXY_HOPS = int(os.getenv(
+    'TRUSTED_PROXY_HOPS', '1' if os.getenv('FLASK_ENV') == 'production' else '0'
+))
+BLOCK_DURATION = 300
+# Expired blocks are swept once the block map reaches this size (then twice its live size)
+BLOCKS_PRUNE_SIZE = 1024
+
+# profile -> (requests, window seconds)
+RATE_LIMIT_PROFILES = {
+    'default': (100, 3600),
+    'login': (20, 300),
+    'auth': (300, 3600),
+    'admin': (3000, 3600),
+}
+
+
+def _profile_from_env(name, default):
+    value = os.getenv(f"RATE_LIMIT_{name.upper()}")
+    if not value:
+        return default
+    try:
+        limit, window = value.split('/')
+        return int(limit), int(window)
+    except ValueError:
+        logger.warning(f"Ignoring malformed RATE_LIMIT_{name.upper()}={value!r}; expected limit/window_seconds")
+        return default
+
+
+RATE_LIMIT_PROFILES = {name: _profile_from_env(name, limits) for name, limits in RATE_LIMIT_PROFILES.items()}
+
+
+_warned_unconfigured_proxy = False
+
+
+def client_ip(hops=None) -> str:
+    """
+    Address of the client making the current request. Each of the hops trusted
+    proxies appends the address it received from to X-Forwarded-For, so the
+    client is the hops-th entry from the right.
+    """
+    global _warned_unconfigured_proxy
+    hops = TRUSTED_PROXY_HOPS if hops is None else hops
+    remote_addr = request.remote_addr or 'unknown'
+    forwarded_header = request.headers.get('X-Forwarded-For', '')
+    if hops <= 0:
+        if forwarded_header and not _warned_unconfigured_proxy:
+            _warned_unconfigured_proxy = True
+            logger.warning(
+                f"X-Forwarded-For received but TRUSTED_PROXY_HOPS is 0, so clients are keyed on the "
+                f"proxy address {remote_addr}; set TRUSTED_PROXY_HOPS to the number of proxies in front of the app"
+            )
+        return remote_addr
+    forwarded = [part.strip() for part in forwarded_header.split(',') if part.strip()]
+    if not forwarded:
+        return remote_addr
+    # A shorter chain means the request skipped a proxy; its leftmost entry is the best guess
+    return forwarded[-hops] if len(forwarded) >= hops else forwarded[0]
+
+
+class LocalRateLimitBackend:
+    """
+    Per-process counters, least recently used keys evicted beyond max_keys.
+    Blocks live in their own map, so churn on other keys cannot evict them;
+    they are dropped once they expire.
+    """
+
+    def __init__(self, max_keys=RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._entries = OrderedDict()  # (key, window) -> [window index, current, previous]
+        self._blocks = {}  # key -> blocked until
+        self._blocks_prune_at = BLOCKS_PRUNE_SIZE
+        self._lock = threading.Lock()
+
+    def _touch(self, entry_key, value):
+        self._entries[entry_key] = value
+        self._entries.move_to_end(entry_key)
+        while len(self._entries) > self.max_keys:
+            self._entries.popitem(last=False)
+
+    @staticmethod
+    def _roll(entry, index):
+        if entry is None or entry[0] < index - 1:
+            return [index, 0, 0]
+        if entry[0] == index - 1:
+            return [index, 0, entry[1]]
+        return entry
+
+    def incr(self, key, window, now):
+        index = int(now // window)
+        with self._lock:
+            entry = self._roll(self._entries.get((key, window)), index)
+            entry[1] += 1
+            self._touch((key, window), entry)
+            return entry[1], entry[2]
+
+    def counts(self, key, window, now):
+        with self._lock:
+            entry = self._roll(self._entries.get((key, window)), int(now // window))
+            return entry[1], entry[2]
+
+    def block(self, key, until):
+        with self._lock:
+            self._blocks[key] = until
+            if len(self._blocks) >= self._blocks_prune_at:
+                now = time.time()
+                self._blocks = {k: v for k, v in self._blocks.items() if v > now}
+                self._blocks_prune_at = max(BLOCKS_PRUNE_SIZE, 2 * len(self._blocks))
+
+    def blocked_until(self, key):
+        with self._lock:
+            until = self._blocks.get(key, 0)
+            if until and until <= time.time():
+                del self._blocks[key]
+                return 0
+            return until
+
+    def reset(self, key, window, now):
+        with self._lock:
+            self._entries.pop((key, window), None)
+            self._blocks.pop(key, None)
+
+    def stats(self):
+        return {'backend': 'local', 'keys': len(self._entries), 'max_keys': self.max_keys, 'blocked': len(self._blocks)}
+
+
+class MongoRateLimitBackend:
+    """
+    One document per key and window, shared by every worker. Documents carry
+    expires_at and are removed by a TTL index once the next window has passed.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def ensure_indexes(self):
+        self.collection.create_index([('expires_at', 1)], expireAfterSeconds=0)
+
+    @staticmethod
+    def _id(key, window, index):
+        return f"{key}|{window}|{index}"
+
+    def incr(self, key, window, now):
+        index = int(now // window)
+        update = {
+            '$inc': {'count': 1},
+            '$setOnInsert': {'expires_at': datetime.utcfromtimestamp((index + 2) * window)}
+        }
+        try:
+            doc = self.collection.find_one_and_update(
+                {'_id': self._id(key, window, index)}, update, upsert=True, return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # Another worker inserted the window first; the retry increments it
+            doc = self.collection.find_one_and_update(
+                {'_id': self._id(key, window, index)}, update, upsert=True, return_document=ReturnDocument.AFTER
+            )
+        previous = self.collection.find_one({'_id': self._id(key, window, index - 1)}, {'count': 1})
+        return doc['count'], previous['count'] if previous else 0
+
+    def counts(self, key, window, now):
+        index = int(now // window)
+        docs = {
+            doc['_id']: doc['count'] for doc in self.collection.find(
+                {'_id': {'$in': [self._id(key, window, index), self._id(key, window, index - 1)]}}, {'count': 1}
+            )
+        }
+        return docs.get(self._id(key, window, index), 0), docs.get(self._id(key, window, index - 1), 0)
+
+    def block(self, key, until):
+        self.collection.update_one(
+            {'_id': f"block|{key}"},
+            {'$set': {'until': until, 'expires_at': datetime.utcfromtimestamp(until)}},
+            upsert=True
+        )
+
+    def blocked_until(self, key):
+        doc = self.collection.find_one({'_id': f"block|{key}"}, {'until': 1})
+        return doc['until'] if doc else 0
+
+    def reset(self, key, window, now):
+        index = int(now // window)
+        self.collection.delete_many({'_id': {'$in': [
+            self._id(key, window, index), self._id(key, window, index - 1), f"block|{key}"
+        ]}})
+
+    def stats(self):
+        return {'backend': 'mongo', 'keys': self.collection.estimated_document_count()}
+
+
 class RateLimiter:
-    def __init__(self):
-        self.requests = defaultdict(deque)
-        self.blocked_ips = defaultdict(float)
-    
-    def is_rate_limited(self, ip, limit=100, window=3600, block_duration=300):
+    def __init__(self, backend=None):
+        self.backend = backend or LocalRateLimitBackend()
+
+    @staticmethod
+    def _estimate(current, previous, window, now):
+        """Requests in the sliding window ending now"""
+        return current + previous * (1 - (now % window) / window)
+
+    def hit(self, key, window) -> float:
+        """Count a request for key and return the sliding-window estimate including it"""
+        now = time.time()
+        try:
+            current, previous = self.backend.incr(key, window, now)
+        except Exception as e:
+            logger.error(f"Rate limit backend unavailable, allowing request: {e}")
+            return 0
+        return self._estimate(current, previous, window, now)
+
+    def count(self, key, window) -> float:
+        """Sliding-window estimate for key without counting a request"""
+        now = time.time()
+        try:
+            current, previous = self.backend.counts(key, window, now)
+        except Exception as e:
+            logger.error(f"Rate limit backend unavailable, allowing request: {e}")
+            return 0
+        return self._estimate(current, previous, window, now)
+
+    def block(self, key, duration):
+        try:
+            self.backend.block(key, time.time() + duration)
+        except Exception as e:
+            logger.error(f"Failed to block {key}: {e}")
+
+    def is_blocked(self, key) -> bool:
+        try:
+            return time.time() < self.backend.blocked_until(key)
+        except Exception as e:
+            logger.error(f"Rate limit backend unavailable, allowing request: {e}")
+            return False
+
+    def reset(self, key, window):
+        """Forget key's counters and any block on it"""
+        try:
+            self.backend.reset(key, window, time.time())
+        except Exception as e:
+            logger.error(f"Failed to reset rate limit for {key}: {e}")
+
+    def is_rate_limited(self, ip, limit=100, window=3600, block_duration=BLOCK_DURATION):
         """Check if IP is rate limited"""
-        current_time = time.time()
-        
-        # Check if IP is currently blocked
-        if ip in self.blocked_ips:
-            if current_time < self.blocked_ips[ip]:
-                return True
-            else:
-                del self.blocked_ips[ip]
-        
-        # Clean old requests
-        while self.requests[ip] and self.requests[ip][0] < current_time - window:
-            self.requests[ip].popleft()
-        
-        # Check rate limit
-        if len(self.requests[ip]) >= limit:
+        if self.is_blocked(ip):
+            return True
+
+        if self.hit(ip, window) > limit:
             # Block IP
-            self.blocked_ips[ip] = current_time + block_duration
+            self.block(ip, block_duration)
             logger.warning(f"Rate limit exceeded for IP {ip}. Blocked for {block_duration} seconds.")
             return True
-        
-        # Add current request
-        self.requests[ip].append(current_time)
+
         return False
 
+    def stats(self):
+        try:
+            return self.backend.stats()
+        except Exception as e:
+            return {'error': str(e)}
+
+
 rate_limiter = RateLimiter()
 
-def rate_limit(limit=100, window=3600):
-    """Rate limiting decorator"""
+
+def init_rate_limiting(app, db):
+    """Move the shared limiter to the rate_limits collection when RATE_LIMIT_BACKEND=mongo"""
+    if RATE_LIMIT_BACKEND != 'mongo':
+        return
+    if db is None:
+        app.logger.warning("RATE_LIMIT_BACKEND=mongo but no database; rate limits stay per process")
+        return
+    backend = MongoRateLimitBackend(db[RATE_LIMIT_COLLECTION])
+    try:
+        backend.ensure_indexes()
+    except Exception as e:
+        app.logger.error(f"Failed to create rate limit indexes: {e}")
+    rate_limiter.backend = backend
+    app.logger.info("Rate limits shared through the rate_limits collection")
+
+
+def _rate_limit_exceeded():
+    return jsonify({
+        "status": "error",
+        "error": "Rate limit exceeded",
+        "message": "Too many requests. Please try again later."
+    }), 429
+
+
+def _check_rate_limit(name, limit, window):
+    """429 response if the current client is over limit for name, otherwise None"""
+    if rate_limiter.is_rate_limited(f"{name}:{client_ip()}", limit, window):
+        return _rate_limit_exceeded()
+    return None
+
+
+def rate_limit(limit=None, window=None, profile=None):
+    """Rate limiting decorator; profile names an entry of RATE_LIMIT_PROFILES"""
+    if profile is not None:
+        limit, window = RATE_LIMIT_PROFILES[profile]
+        name = profile
+    else:
+        default_limit, default_window = RATE_LIMIT_PROFILES['default']
+        limit = limit or default_limit
+        window = window or default_window
+        name = 'default' if (limit, window) == (default_limit, default_window) else f"{limit}/{window}"
+
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr)
-            
-            if rate_limiter.is_rate_limited(ip, limit, window):
-                return jsonify({
-                    "status": "error",
-                    "error": "Rate limit exceeded",
-                    "message": "Too many requests. Please try again later."
-                }), 429
-            
+            limited = _check_rate_limit(name, limit, window)
+            if limited:
+                return limited
+
             return f(*args, **kwargs)
+        # limit_blueprint leaves routes with their own limit alone
+        decorated_function._rate_limit_profile = name
         return decorated_function
     return decorator
+
+
+def limit_blueprint(blueprint, profile):
+    """Apply profile to every route of blueprint that has no @rate_limit of its own"""
+    limit, window = RATE_LIMIT_PROFILES[profile]
+
+    @blueprint.before_request
+    def _apply_rate_limit_profile():
+        if request.method == 'OPTIONS':
+            return None
+        view = current_app.view_functions.get(request.endpoint)
+        if view is None or getattr(view, '_rate_limit_profile', None):
+            return None
+        return _check_rate_limit(profile, limit, window)
+
+    return blueprint
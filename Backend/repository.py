@@ -0,0 +1,314 @@
+"""
+Timetable repository abstraction.
+
+routes.py, manage_resources.py and conflict_detector.py read and write
+timetables through this interface instead of a pymongo collection, so the
+same code paths run against MongoDB in production and against the indexed
+in-memory backend in benchmarks and offline tests.
+
+Queries use the subset of MongoDB filter syntax the app relies on: field
+equality, $regex/$options, $exists, $ne, $in, $gt/$gte/$lt/$lte and $or.
+"""
+
+import re
+import threading
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Dict, Iterator, List, Optional
+
+from bson import ObjectId
+
+# Bookkeeping fields the incremental importer stores on each document; never returned to callers
+IMPORT_FIELDS = ('_natural_key', '_fingerprint')
+
+# Explicit override installed by benchmarks/tests; None means "use the module's own default"
+_override = None
+_override_lock = threading.Lock()
+
+
+def set_timetable_repository(repository):
+    """Route every module's timetable access to this repository (None restores the defaults)"""
+    global _override
+    with _override_lock:
+        _override = repository
+
+
+def get_timetable_repository(default=None):
+    """Return the installed override, or the caller's default repository"""
+    return _override if _override is not None else default
+
+
+class TimetableRepository(ABC):
+    """Operations the timetable code paths need, independent of storage"""
+
+    @abstractmethod
+    def find(self, query: Dict = None, include_id: bool = False, skip: int = 0,
+             limit: int = 0, sort: List = None) -> List[Dict]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def iter_find(self, query: Dict = None, include_id: bool = False, sort: List = None,
+                  batch_size: int = 1000) -> Iterator[Dict]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def find_one(self, query: Dict, include_id: bool = True) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def find_by_room_day(self, room_id: str = None, day: str = None, include_id: bool = False) -> List[Dict]:
+        query = {}
+        if room_id is not None:
+            query['Room ID'] = room_id
+        if day is not None:
+            query['Day'] = day
+        return self.find(query, include_id=include_id)
+
+    @abstractmethod
+    def distinct_rooms(self, query: Dict = None) -> List:
+        raise NotImplementedError
+
+    @abstractmethod
+    def room_day_groups(self, min_count: int = 1) -> List[Dict]:
+        """[{'room_id', 'day', 'count'}] for every room/day with at least min_count schedules"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def insert(self, doc: Dict) -> str:
+        """Insert doc, setting doc['_id'] like pymongo does; returns the id as a string"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def update(self, doc_id, fields: Dict) -> int:
+        """$set fields on one document; returns the matched count"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def count(self, query: Dict = None) -> int:
+        raise NotImplementedError
+
+
+class MongoTimetableRepository(TimetableRepository):
+    def __init__(self, collection):
+        self.collection = collection
+
+    @staticmethod
+    def _projection(include_id):
+        projection = {field: 0 for field in IMPORT_FIELDS}
+        if not include_id:
+            projection['_id'] = 0
+        return projection
+
+    def find(self, query=None, include_id=False, skip=0, limit=0, sort=None):
+        cursor = self.collection.find(query or {}, self._projection(include_id))
+        if sort:
+            cursor = cursor.sort(sort)
+        if skip:
+            cursor = cursor.skip(skip)
+        if limit:
+            cursor = cursor.limit(limit)
+        return list(cursor)
+
+    def iter_find(self, query=None, include_id=False, sort=None, batch_size=1000):
+        cursor = self.collection.find(
+            query or {},
+            self._projection(include_id),
+            batch_size=batch_size,
+            allow_disk_use=True
+        )
+        if sort:
+            cursor = cursor.sort(sort)
+        return cursor
+
+    def find_one(self, query, include_id=True):
+        return self.collection.find_one(query, self._projection(include_id))
+
+    def distinct_rooms(self, query=None):
+        return self.collection.distinct('Room ID', query or {})
+
+    def room_day_groups(self, min_count=1):
+        pipeline = [
+            {"$group": {
+                "_id": {"room_id": "$Room ID", "day": "$Day"},
+                "count": {"$sum": 1}
+            }}
+        ]
+        if min_count > 1:
+            pipeline.append({"$match": {"count": {"$gte": min_count}}})
+        return [
+            {'room_id': group['_id'].get('room_id'), 'day': group['_id'].get('day'), 'count': group['count']}
+            for group in self.collection.aggregate(pipeline)
+        ]
+
+    def aggregate(self, pipeline, batch_size=1000):
+        """Raw aggregation, only available on the Mongo backend"""
+        return self.collection.aggregate(pipeline, batchSize=batch_size, allowDiskUse=True)
+
+    def insert(self, doc):
+        result = self.collection.insert_one(doc)
+        return str(result.inserted_id)
+
+    def update(self, doc_id, fields):
+        result = self.collection.update_one({'_id': doc_id}, {'$set': fields})
+        return result.matched_count
+
+    def count(self, query=None):
+        return self.collection.count_documents(query or {})
+
+
+def _match_value(value, condition):
+    if not isinstance(condition, dict):
+        return value == condition
+
+    for op, operand in condition.items():
+        if op == '$regex':
+            flags = re.IGNORECASE if 'i' in condition.get('$options', '') else 0
+            if not isinstance(value, str) or not re.search(operand, value, flags):
+                return False
+        elif op == '$options':
+            continue
+        elif op == '$exists':
+            if (value is not None) != bool(operand):
+                return False
+        elif op == '$ne':
+            if value == operand:
+                return False
+        elif op == '$in':
+            if value not in operand:
+                return False
+        elif op in ('$gt', '$gte', '$lt', '$lte'):
+            if value is None:
+                return False
+            try:
+                if op == '$gt' and not value > operand:
+                    return False
+                if op == '$gte' and not value >= operand:
+                    return False
+                if op == '$lt' and not value < operand:
+                    return False
+                if op == '$lte' and not value <= operand:
+                    return False
+            except TypeError:
+                return False
+        else:
+            raise ValueError(f"Unsupported query operator for in-memory repository: {op}")
+    return True
+
+
+def matches_query(doc, query):
+    """Evaluate a Mongo-style filter against a plain dict"""
+    for field, condition in query.items():
+        if field == '$or':
+            if not any(matches_query(doc, sub) for sub in condition):
+                return False
+        elif not _match_value(doc.get(field), condition):
+            return False
+    return True
+
+
+class InMemoryTimetableRepository(TimetableRepository):
+    """Timetables held in process memory, indexed by room, day and room/day"""
+
+    def __init__(self, docs=None):
+        self._lock = threading.RLock()
+        self._docs = {}
+        # dicts as insertion-ordered sets, so results keep a natural scan order
+        self._by_room = defaultdict(dict)
+        self._by_day = defaultdict(dict)
+        self._by_room_day = defaultdict(dict)
+        for doc in docs or []:
+            self.insert(dict(doc))
+
+    def _index(self, doc_id, doc):
+        room, day = doc.get('Room ID'), doc.get('Day')
+        self._by_room[room][doc_id] = None
+        self._by_day[day][doc_id] = None
+        self._by_room_day[(room, day)][doc_id] = None
+
+    def _unindex(self, doc_id, doc):
+        room, day = doc.get('Room ID'), doc.get('Day')
+        self._by_room[room].pop(doc_id, None)
+        self._by_day[day].pop(doc_id, None)
+        self._by_room_day[(room, day)].pop(doc_id, None)
+
+    def _candidate_ids(self, query):
+        room, day = query.get('Room ID'), query.get('Day')
+        if isinstance(room, str) and isinstance(day, str):
+            return self._by_room_day.get((room, day), ())
+        if isinstance(room, str):
+            return self._by_room.get(room, ())
+        if isinstance(day, str):
+            return self._by_day.get(day, ())
+        return self._docs.keys()
+
+    def _select(self, query, include_id):
+        query = query or {}
+        with self._lock:
+            results = []
+            for doc_id in list(self._candidate_ids(query)):
+                doc = self._docs[doc_id]
+                if matches_query(doc, query):
+                    doc = {k: v for k, v in doc.items() if k not in IMPORT_FIELDS}
+                    if not include_id:
+                        doc.pop('_id', None)
+                    results.append(doc)
+            return results
+
+    @staticmethod
+    def _sort(docs, sort):
+        for field, direction in reversed(sort):
+            docs.sort(key=lambda d: (d.get(field) is None, str(d.get(field))), reverse=direction < 0)
+        return docs
+
+    def find(self, query=None, include_id=False, skip=0, limit=0, sort=None):
+        results = self._select(query, include_id)
+        if sort:
+            results = self._sort(results, sort)
+        if skip:
+            results = results[skip:]
+        if limit:
+            results = results[:limit]
+        return results
+
+    def iter_find(self, query=None, include_id=False, sort=None, batch_size=1000):
+        return iter(self.find(query, include_id=include_id, sort=sort))
+
+    def find_one(self, query, include_id=True):
+        results = self.find(query, include_id=include_id, limit=1)
+        return results[0] if results else None
+
+    def distinct_rooms(self, query=None):
+        seen = {}
+        for doc in self._select(query, include_id=False):
+            seen.setdefault(doc.get('Room ID'), None)
+        return [room for room in seen if room is not None]
+
+    def room_day_groups(self, min_count=1):
+        with self._lock:
+            return [
+                {'room_id': room, 'day': day, 'count': len(ids)}
+                for (room, day), ids in self._by_room_day.items()
+                if len(ids) >= max(1, min_count)
+            ]
+
+    def insert(self, doc):
+        with self._lock:
+            doc.setdefault('_id', ObjectId())
+            stored = dict(doc)
+            self._docs[stored['_id']] = stored
+            self._index(stored['_id'], stored)
+            return str(stored['_id'])
+
+    def update(self, doc_id, fields):
+        with self._lock:
+            doc = self._docs.get(doc_id)
+            if doc is None:
+                return 0
+            self._unindex(doc_id, doc)
+            doc.update(fields)
+            self._index(doc_id, doc)
+            return 1
+
+    def count(self, query=None):
+        if not query:
+            return len(self._docs)
+        return len(self._select(query, include_id=False))
@@ -41,6 +41,12 @@ def reset_admin_password():
         
         # Verify the update worked
         user = db.admin_users.find_one({'username': 'admin.super'})
+        
+        # End existing sessions; running app workers pick this up from admin_sessions
+        db.admin_sessions.update_many(
+            {'admin_id': str(user['_id']), 'is_active': True},
+            {'$set': {'is_active': False, 'invalidated_at': datetime.utcnow(), 'invalidation_reason': 'password_reset'}}
+        )
         test_verify = bcrypt.checkpw(new_password.encode('utf-8'), user['password'].encode('utf-8'))
         print(f"🧪 Verification test: {'✅ SUCCESS' if test_verify else '❌ FAILED'}")
         
@@ -0,0 +1,11 @@
+"""
+Operations /api/manage_resources dispatches.
+
+Kept in its own module, free of database connections, so metrics can label
+requests by operation without importing manage_resources.
+"""
+
+MANAGE_OPERATIONS = frozenset({
+    'reallocate', 'inject_schedule', 'get_room_schedules', 'suggest_rooms',
+    'conflict_monitoring', 'get_room_count', 'check_overlap'
+})
@@ -5,7 +5,11 @@ import pandas as pd
 from datetime import datetime, timedelta
 from flask_jwt_extended import jwt_required
 import os
-from process import preprocess_data
+from process import preprocess_data, total_availableHrs
+from serialization import json_response
+from streaming import EXPORT_BATCH_SIZE, EXPORT_FORMATS, stream_export
+from snapshots import load_snapshot, snapshot_source_enabled
+from repository import MongoTimetableRepository, get_timetable_repository
 
 from dotenv import load_dotenv
 load_dotenv()
@@ -28,6 +32,8 @@ except Exception as e:
     print(f"MongoDB connection error in routes: {e}")
     # Fallback to local MongoDB if available
     try:
+        if os.getenv('MONGO_LOCAL_FALLBACK', 'true').lower() != 'true':
+            raise RuntimeError("local fallback disabled by MONGO_LOCAL_FALLBACK")
         client = MongoClient('mongodb://localhost:27017/', serverSelectionTimeoutMS=100000)
         client.server_info()
         print("Connected to local MongoDB in routes")
@@ -39,13 +45,39 @@ except Exception as e:
         db = None
         timetables_collection = None
 
+timetable_repository = MongoTimetableRepository(timetables_collection) if timetables_collection is not None else None
+
+
+def get_timetables():
+    """Timetable repository in use: an installed override, else this module's MongoDB one"""
+    return get_timetable_repository(default=timetable_repository)
+
+
+def _timetable_source_available():
+    """Whether timetable reads can be served, from the repository or from a snapshot"""
+    if snapshot_source_enabled():
+        return True
+    return get_timetables() is not None
+
+
+def _load_timetable_frame(room_id=None):
+    """Load timetable rows as a DataFrame from Mongo, or from the snapshot when TIMETABLE_SOURCE=snapshot"""
+    if snapshot_source_enabled():
+        df = load_snapshot('timetables', categorical=False)
+        if room_id and not df.empty:
+            df = df[df['Room ID'] == room_id].reset_index(drop=True)
+        return df
+
+    query = {'Room ID': room_id} if room_id else {}
+    return pd.DataFrame(get_timetables().find(query))
+
 
 @routes_bp.route('/available_rooms', methods=['GET'])
 def get_available_rooms():
     
     try:
         # Check if database connection is available
-        if db is None or timetables_collection is None:
+        if not _timetable_source_available():
             return jsonify({
                 'status': 'error',
                 'error': 'Database connection is not available. Please check your MongoDB connection.'
@@ -53,18 +85,10 @@ def get_available_rooms():
 
         room_id = request.args.get('room_id')
        
-        # Fetch data from MongoDB
-        query = {}
-        if room_id:
-            query['Room ID'] = room_id
-        raw_data = list(timetables_collection.find(query, {'_id': 0}))
-        if not raw_data:
-            return jsonify({"status": "error", "error": "No data found for the given filters"}), 404
-
-        # Convert to DataFrame
-        df = pd.DataFrame(raw_data)
+        # Fetch data from MongoDB (or the columnar snapshot)
+        df = _load_timetable_frame(room_id)
         if df.empty:
-            return jsonify({"status": "error", "error": "No data found after processing"}), 404
+            return jsonify({"status": "error", "error": "No data found for the given filters"}), 404
 
         # Apply preprocessing
         df, daily_summary, weekly_summary = preprocess_data(df)
@@ -155,13 +179,13 @@ def get_available_rooms():
                 'Status': lambda x: ', '.join(x.dropna().unique())
             }).reset_index()
 
-            return jsonify({
+            return json_response({
                 "status": "success",
                 "room_status": room_status.to_dict(orient="records")[0],
-                "daily_utilization": daily_summary_df.to_dict(orient='records'),
-                "weekly_summary": weekly_summary_df.to_dict(orient='records'),
-                "current_time_matches": current_time_df.to_dict(orient='records'),
-            }), 200
+                "daily_utilization": daily_summary_df,
+                "weekly_summary": weekly_summary_df,
+                "current_time_matches": current_time_df,
+            }, 200)
         else:
             room_status = df_sorted.groupby('Room ID').agg({
                 'Utilization': 'mean',
@@ -169,13 +193,13 @@ def get_available_rooms():
                 'Status': lambda x: ', '.join(x.dropna().unique())
             }).reset_index().sort_values('Room ID')  # Sort room status by Room ID
 
-            return jsonify({
+            return json_response({
                 "status": "success",
-                "room_status": room_status.to_dict(orient="records"),
-                "daily_utilization": daily_summary_sorted.to_dict(orient='records'),
-                "weekly_summary": weekly_summary_sorted.to_dict(orient='records'),
-                "current_time_matches": current_time_df.to_dict(orient='records')
-            }), 200
+                "room_status": room_status,
+                "daily_utilization": daily_summary_sorted,
+                "weekly_summary": weekly_summary_sorted,
+                "current_time_matches": current_time_df
+            }, 200)
 
     except KeyError as e:
         return jsonify({'status': 'error', 'error': f'Key error: {e}'}), 500
@@ -185,12 +209,17 @@ def get_available_rooms():
 
 
 
+def _parse_hhmm(value):
+    """'HH:MM' -> time, raising ValueError like pd.to_datetime(format='%H:%M')"""
+    return datetime.strptime(str(value), '%H:%M').time()
+
+
 @routes_bp.route('/current_utilization', methods=['POST'])
 def current_utilization():
    
     try:
        
-        if db is None or timetables_collection is None:
+        if not _timetable_source_available():
             return jsonify({
                 'status': 'error',
                 'error': 'Database connection is not available. Please check your MongoDB connection.'
@@ -199,24 +228,31 @@ def current_utilization():
         data = request.get_json()
         room_id = data.get('room_id')
         
-        # Get data from database
-        query = {'Room ID': room_id} if room_id else {}
-        raw_data = list(timetables_collection.find(query, {'_id': 0}))
+        # Get data from database (or the columnar snapshot)
+        df = _load_timetable_frame(room_id)
         
-        if not raw_data:
+        if df.empty:
             return jsonify({"status": "error", "error": "No data found for the specified room"}), 404
 
         # Process data
-        df = pd.DataFrame(raw_data)
         df, daily_summary, _ = preprocess_data(df)
 
         results = []
         room_ids = [room_id] if room_id else df['Room ID'].unique()
+
+        # Group once instead of masking the whole frame for every room and day
+        daily_by_room = {rid: group for rid, group in daily_summary.groupby('Room ID')}
+        sessions_by_room_day = {key: group for key, group in df.groupby(['Room ID', 'Day'])}
+        day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
+        timeslots = [f"{h:02d}:00-{h+1:02d}:00" for h in range(8, 20)]
+        slot_bounds = [
+            (slot, _parse_hhmm(slot.split('-')[0]), _parse_hhmm(slot.split('-')[1])) for slot in timeslots
+        ]
         
         for rid in room_ids:
-            room_daily = daily_summary[daily_summary['Room ID'] == rid].copy()
+            room_daily = daily_by_room.get(rid)
             
-            if room_daily.empty:
+            if room_daily is None or room_daily.empty:
                 continue
 
             # Calculate basic utilization metrics
@@ -242,13 +278,10 @@ def current_utilization():
 
             # Daily analysis - get actual values for each date
             daily_analysis = []
-            day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
-            timeslots = [f"{h:02d}:00-{h+1:02d}:00" for h in range(8, 20)]
-            room_df = df[df['Room ID'] == rid]
             
             for day in day_order:
                 day_data = room_daily[room_daily['Day'] == day]
-                day_sessions = room_df[room_df['Day'] == day]
+                day_sessions = sessions_by_room_day.get((rid, day), df.iloc[0:0])
                 
                 if day_data.empty:
                     day_utilization = 0
@@ -273,20 +306,17 @@ def current_utilization():
                     
                     # Calculate booked slots from session data
                     booked_slots = set()
-                    for _, session in day_sessions.iterrows():
+                    for session_start, session_end in zip(day_sessions['Start'], day_sessions['End']):
                         try:
-                            start = pd.to_datetime(session['Start'], format='%H:%M').time()
-                            end = pd.to_datetime(session['End'], format='%H:%M').time()
-                            
-                            # Check which time slots are booked
-                            for slot in timeslots:
-                                slot_start = pd.to_datetime(slot.split('-')[0], format='%H:%M').time()
-                                slot_end = pd.to_datetime(slot.split('-')[1], format='%H:%M').time()
-                                
-                                if start < slot_end and end > slot_start:
-                                    booked_slots.add(slot)
-                        except (ValueError, KeyError):
+                            start = _parse_hhmm(session_start)
+                            end = _parse_hhmm(session_end)
+                        except (ValueError, TypeError):
                             continue
+                        
+                        # Check which time slots are booked
+                        for slot, slot_start, slot_end in slot_bounds:
+                            if start < slot_end and end > slot_start:
+                                booked_slots.add(slot)
                     
                     # Calculate free slots
                     free_slots = [slot for slot in timeslots if slot not in booked_slots]
@@ -368,12 +398,12 @@ def current_utilization():
                 }
             })
 
-        return jsonify({
+        return json_response({
             'status': 'success',
             'message': 'Utilization analysis completed',
             'total_rooms_analyzed': len(results),
             'results': results
-        }), 200
+        }, 200)
 
     except Exception as e:
         return jsonify({'status': 'error', 'error': f'Error: {str(e)}'}), 500
@@ -384,7 +414,8 @@ def get_room_schedules():
     
     try:
         # Check if database connection is available
-        if db is None or timetables_collection is None:
+        timetables = get_timetables()
+        if timetables is None:
             return jsonify({
                 'status': 'error',
                 'error': 'Database connection is not available. Please check your MongoDB connection.'
@@ -412,12 +443,12 @@ def get_room_schedules():
             query['Day'] = day
         
         
-        total_count = db.timetables.count_documents(query)
+        total_count = timetables.count(query)
         
         skip = (page - 1) * per_page
         
         
-        schedules = list(db.timetables.find(query, {'_id': 0}).skip(skip).limit(per_page))
+        schedules = timetables.find(query, skip=skip, limit=per_page)
         
         # Format times consistently for display
         for schedule in schedules:
@@ -456,7 +487,7 @@ def refresh_aggregated_data():
    
     try:
         # Check if database connection is available
-        if db is None or timetables_collection is None:
+        if not _timetable_source_available():
             return jsonify({
                 'status': 'error',
                 'error': 'Database connection is not available. Please check your MongoDB connection.'
@@ -465,20 +496,10 @@ def refresh_aggregated_data():
         room_id = request.args.get('room_id')
         prioritize_day = request.args.get('prioritize_day', 'true').lower() == 'true'
         
-        # Build query based on parameters
-        query = {}
-        if room_id:
-            query['Room ID'] = room_id
-        
-        # Fetch data from MongoDB
-        raw_data = list(timetables_collection.find(query, {'_id': 0}))
-        if not raw_data:
-            return jsonify({"status": "error", "error": "No data found for the given filters"}), 404
-
-        # Convert to DataFrame and reprocess
-        df = pd.DataFrame(raw_data)
+        # Fetch data from MongoDB (or the columnar snapshot)
+        df = _load_timetable_frame(room_id)
         if df.empty:
-            return jsonify({"status": "error", "error": "No data found after processing"}), 404
+            return jsonify({"status": "error", "error": "No data found for the given filters"}), 404
 
         # Apply preprocessing to regenerate aggregated data
         df, daily_summary, weekly_summary = preprocess_data(df) 
@@ -497,19 +518,19 @@ def refresh_aggregated_data():
             daily_summary_df = daily_summary[daily_summary['Room ID'] == room_id]
             weekly_summary_df = weekly_summary[weekly_summary['Room ID'] == room_id]
             
-            return jsonify({
+            return json_response({
                 "status": "success",
-                "daily_utilization": daily_summary_df.to_dict(orient='records'),
-                "weekly_summary": weekly_summary_df.to_dict(orient='records'),
+                "daily_utilization": daily_summary_df,
+                "weekly_summary": weekly_summary_df,
                 "message": "Aggregated data refreshed successfully"
-            }), 200
+            }, 200)
         else:
-            return jsonify({
+            return json_response({
                 "status": "success",
-                "daily_utilization": daily_summary.to_dict(orient='records'),
-                "weekly_summary": weekly_summary.to_dict(orient='records'),
+                "daily_utilization": daily_summary,
+                "weekly_summary": weekly_summary,
                 "message": "All aggregated data refreshed successfully"
-            }), 200
+            }, 200)
             
     except Exception as e:
         print(f"Error refreshing aggregated data: {str(e)}")
@@ -521,7 +542,8 @@ def get_day_based_schedules():
    
     try:
         # Check if database connection is available
-        if db is None or timetables_collection is None:
+        timetables = get_timetables()
+        if timetables is None:
             return jsonify({
                 'status': 'error',
                 'error': 'Database connection is not available. Please check your MongoDB connection.'
@@ -544,7 +566,7 @@ def get_day_based_schedules():
         
         # Get all schedules for this room
         query = {'Room ID': room_id}
-        schedules = list(timetables_collection.find(query, {'_id': 0}))
+        schedules = timetables.find(query)
         
         if not schedules:
             return jsonify({'status': 'error', 'error': f'No schedules found for room {room_id}'}), 404
@@ -660,4 +682,208 @@ def get_day_based_schedules():
 
 
 
-    
\ No newline at end of file
+    
+
+
+TIMETABLE_EXPORT_FIELDS = [
+    'Room ID', 'Date', 'Day', 'Start', 'End', 'Course', 'Department',
+    'Year', 'Status', 'Room Type', 'Instructor', 'Lecturer'
+]
+DAILY_SUMMARY_EXPORT_FIELDS = [
+    'Room ID', 'Day', 'Daily_Booked_Hours', 'Daily_Utilization', 'Courses',
+    'Time_Slot', 'Department', 'Status', 'Year', 'Totalrooms'
+]
+WEEKLY_SUMMARY_EXPORT_FIELDS = [
+    'Room ID', 'Week', 'Weekly_Booked_Hours', 'Weekly_Utilization', 'Day'
+]
+
+
+def _build_export_query(args):
+    """Build a timetable filter from room_id, day, department, start_date and end_date"""
+    query = {}
+    if args.get('room_id'):
+        query['Room ID'] = args.get('room_id')
+    if args.get('day'):
+        query['Day'] = args.get('day')
+    if args.get('department'):
+        query['Department'] = args.get('department')
+
+    date_range = {}
+    for param, operator in (('start_date', '$gte'), ('end_date', '$lte')):
+        value = args.get(param)
+        if value:
+            # Raises ValueError for anything that is not YYYY-MM-DD
+            datetime.strptime(value, '%Y-%m-%d')
+            date_range[operator] = value
+    if date_range:
+        query['Date'] = date_range
+
+    return query
+
+
+def _minutes_expr(field):
+    """Aggregation expression turning an 'HH:MM' field into minutes since midnight"""
+    parts = {'$split': [{'$ifNull': [field, '']}, ':']}
+    return {'$add': [
+        {'$multiply': [
+            {'$convert': {'input': {'$arrayElemAt': [parts, 0]}, 'to': 'int', 'onError': 0, 'onNull': 0}},
+            60
+        ]},
+        {'$convert': {'input': {'$arrayElemAt': [parts, 1]}, 'to': 'int', 'onError': 0, 'onNull': 0}}
+    ]}
+
+
+def _summary_pipeline(query, kind):
+    """Aggregation pipeline producing the same daily/weekly summaries as preprocess_data"""
+    booked_hours = {'$divide': [{'$subtract': [_minutes_expr('$End'), _minutes_expr('$Start')]}, 60]}
+
+    # Same duplicate rule as preprocess_data: first row per room/day/slot/course
+    # in insertion order
+    dedupe = [
+        {'$match': query},
+        {'$sort': {'_id': 1}},
+        {'$group': {
+            '_id': {'room_id': '$Room ID', 'day': '$Day', 'start': '$Start', 'end': '$End', 'course': '$Course'},
+            'doc': {'$first': '$$ROOT'}
+        }},
+        {'$replaceRoot': {'newRoot': '$doc'}}
+    ]
+
+    if kind == 'weekly':
+        # Monday of the ISO week; $dateFromParts works on MongoDB 3.6+, unlike $dateTrunc (5.0+)
+        date = {'$convert': {'input': '$Date', 'to': 'date', 'onError': None, 'onNull': None}}
+        week = {'$dateFromParts': {
+            'isoWeekYear': {'$isoWeekYear': date},
+            'isoWeek': {'$isoWeek': date},
+            'isoDayOfWeek': 1
+        }}
+        return dedupe + [
+            {'$group': {
+                '_id': {'room_id': '$Room ID', 'week': week},
+                'Weekly_Booked_Hours': {'$sum': booked_hours},
+                'Day': {'$first': '$Day'}
+            }},
+            {'$project': {
+                '_id': 0,
+                'Room ID': '$_id.room_id',
+                'Week': '$_id.week',
+                'Weekly_Booked_Hours': 1,
+                'Weekly_Utilization': {'$multiply': [
+                    {'$divide': ['$Weekly_Booked_Hours', total_availableHrs * 5]}, 100
+                ]},
+                'Day': 1
+            }},
+            {'$sort': {'Room ID': 1, 'Week': 1}}
+        ]
+
+    def joined(field):
+        return {'$reduce': {
+            'input': field,
+            'initialValue': '',
+            'in': {'$cond': [
+                {'$eq': ['$$value', '']},
+                {'$toString': '$$this'},
+                {'$concat': ['$$value', ', ', {'$toString': '$$this'}]}
+            ]}
+        }}
+
+    return dedupe + [
+        {'$group': {
+            '_id': {'room_id': '$Room ID', 'day': '$Day'},
+            'Daily_Booked_Hours': {'$sum': booked_hours},
+            'Courses': {'$addToSet': '$Course'},
+            'Time_Slot': {'$addToSet': {'$concat': [
+                {'$toString': '$Start'}, '–', {'$toString': '$End'}
+            ]}},
+            'Department': {'$addToSet': '$Department'},
+            'Status': {'$addToSet': '$Status'},
+            'Year': {'$addToSet': '$Year'},
+            'Totalrooms': {'$sum': 1}
+        }},
+        {'$project': {
+            '_id': 0,
+            'Room ID': '$_id.room_id',
+            'Day': '$_id.day',
+            'Daily_Booked_Hours': 1,
+            'Daily_Utilization': {'$multiply': [
+                {'$divide': ['$Daily_Booked_Hours', total_availableHrs]}, 100
+            ]},
+            'Courses': joined('$Courses'),
+            'Time_Slot': joined('$Time_Slot'),
+            'Department': joined('$Department'),
+            'Status': joined('$Status'),
+            'Year': joined('$Year'),
+            'Totalrooms': 1
+        }},
+        {'$sort': {'Room ID': 1, 'Day': 1}}
+    ]
+
+
+@routes_bp.route('/export/timetables', methods=['GET'])
+@jwt_required()
+def export_timetables():
+
+    try:
+        timetables = get_timetables()
+        if timetables is None:
+            return jsonify({
+                'status': 'error',
+                'error': 'Database connection is not available. Please check your MongoDB connection.'
+            }), 503
+
+        export_format = request.args.get('format', 'ndjson').lower()
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'status': 'error', 'error': f'Invalid format. Use: {", ".join(EXPORT_FORMATS)}'}), 400
+
+        try:
+            query = _build_export_query(request.args)
+        except ValueError:
+            return jsonify({'status': 'error', 'error': 'Invalid date format, use YYYY-MM-DD'}), 400
+
+        cursor = timetables.iter_find(
+            query,
+            sort=[('Room ID', 1), ('Day', 1), ('Start', 1)],
+            batch_size=EXPORT_BATCH_SIZE
+        )
+
+        return stream_export(cursor, export_format, TIMETABLE_EXPORT_FIELDS, filename='timetables')
+
+    except Exception as e:
+        return jsonify({'status': 'error', 'error': f'Unexpected error: {str(e)}'}), 500
+
+
+@routes_bp.route('/export/summaries', methods=['GET'])
+@jwt_required()
+def export_summaries():
+
+    try:
+        timetables = get_timetables()
+        if timetables is None:
+            return jsonify({
+                'status': 'error',
+                'error': 'Database connection is not available. Please check your MongoDB connection.'
+            }), 503
+
+        export_format = request.args.get('format', 'ndjson').lower()
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'status': 'error', 'error': f'Invalid format. Use: {", ".join(EXPORT_FORMATS)}'}), 400
+
+        kind = request.args.get('kind', 'daily').lower()
+        if kind not in ('daily', 'weekly'):
+            return jsonify({'status': 'error', 'error': 'Invalid kind. Use: daily, weekly'}), 400
+
+        try:
+            query = _build_export_query(request.args)
+        except ValueError:
+            return jsonify({'status': 'error', 'error': 'Invalid date format, use YYYY-MM-DD'}), 400
+
+        if not hasattr(timetables, 'aggregate'):
+            return jsonify({'status': 'error', 'error': 'Summary export requires the MongoDB backend'}), 501
+
+        cursor = timetables.aggregate(_summary_pipeline(query, kind), batch_size=EXPORT_BATCH_SIZE)
+        fieldnames = WEEKLY_SUMMARY_EXPORT_FIELDS if kind == 'weekly' else DAILY_SUMMARY_EXPORT_FIELDS
+
+        return stream_export(cursor, export_format, fieldnames, filename=f'{kind}_summary')
+
+    except Exception as e:
+        return jsonify({'status': 'error', 'error': f'Unexpected error: {str(e)}'}), 500
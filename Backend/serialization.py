@@ -0,0 +1,118 @@
+"""
+Response serialization for large analytics payloads.
+
+DataFrames and NumPy arrays are encoded directly instead of going through
+DataFrame.to_dict() followed by jsonify(), and datetimes are written natively.
+orjson is used when installed; the standard library json module is the fallback.
+"""
+
+import json
+import math
+from datetime import date, datetime, time
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+from bson import ObjectId
+from flask import Response, request
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+RECORDS = 'records'
+COLUMNS = 'columns'
+RESPONSE_FORMATS = (RECORDS, COLUMNS)
+
+# Extra encoders registered by other modules: type -> callable(obj) -> JSON-able value
+_encoders = {}
+
+
+def register_encoder(obj_type, encoder):
+    """Register an encoder for a type the serializer does not handle natively"""
+    _encoders[obj_type] = encoder
+
+
+def get_response_format(default=RECORDS):
+    """Read the requested response format from the ?format= query parameter"""
+    requested = (request.args.get('format') or default).lower()
+    return requested if requested in RESPONSE_FORMATS else default
+
+
+def _column_values(series, native=False):
+    """Return a column as a list, or as an ndarray orjson can encode without a copy"""
+    values = series.to_numpy()
+
+    if native and orjson is not None:
+        if values.dtype.kind in 'biuf':
+            return np.ascontiguousarray(values)
+        if values.dtype.kind == 'M' and not series.isna().any():
+            return np.ascontiguousarray(values)
+
+    if values.dtype.kind in 'biu':
+        return values.tolist()
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+def encode_frame(df, orient=RECORDS):
+    """Encode a DataFrame as a list of records or as a dict of per-column arrays"""
+    if orient == COLUMNS:
+        return {str(col): _column_values(df[col], native=True) for col in df.columns}
+
+    columns = [str(col) for col in df.columns]
+    column_values = [_column_values(df[col]) for col in df.columns]
+    return [dict(zip(columns, row)) for row in zip(*column_values)]
+
+
+def _make_default(orient):
+    def default(obj):
+        if isinstance(obj, pd.DataFrame):
+            return encode_frame(obj, orient)
+        if isinstance(obj, pd.Series):
+            return obj.astype(object).where(obj.notna(), None).tolist()
+        if obj is pd.NaT:
+            return None
+        if isinstance(obj, pd.Timestamp):
+            return obj.isoformat()
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+        if isinstance(obj, np.generic):
+            value = obj.item()
+            if isinstance(value, float) and math.isnan(value):
+                return None
+            return value
+        if isinstance(obj, (datetime, date, time)):
+            return obj.isoformat()
+        if isinstance(obj, pd.Period):
+            return str(obj)
+        if isinstance(obj, ObjectId):
+            return str(obj)
+        if isinstance(obj, Decimal):
+            return float(obj)
+        if isinstance(obj, (set, frozenset)):
+            return list(obj)
+        for obj_type, encoder in _encoders.items():
+            if isinstance(obj, obj_type):
+                return encoder(obj)
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    return default
+
+
+def dumps(payload, orient=RECORDS) -> bytes:
+    """Serialize a payload that may contain DataFrames, NumPy values and datetimes"""
+    default = _make_default(orient)
+    if orjson is not None:
+        return orjson.dumps(
+            payload,
+            default=default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        )
+    return json.dumps(payload, default=default).encode('utf-8')
+
+
+def json_response(payload, status=200, orient=None):
+    """Build a JSON response, honouring ?format=columns when no orient is given"""
+    if orient is None:
+        orient = get_response_format()
+    return Response(dumps(payload, orient), status=status, mimetype='application/json')
@@ -0,0 +1,252 @@
+"""
+Slow MongoDB query log with explain capture.
+
+SlowQueryListener logs every command slower than SLOW_QUERY_MS with its
+collection, filter shape (values replaced by '?'), duration, documents
+returned and the endpoint that issued it. When explain capture is on
+(default outside production) the slowest query shapes are re-run through
+explain on a single background worker, and plans that scan a whole collection are
+logged as warnings, so a missing index on timetables, admin_notifications or
+detected_conflicts shows up on the first slow request.
+
+Like the metrics listener, register_slow_query_listener() must run before
+any MongoClient is created.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+from collections import OrderedDict
+
+from flask import has_request_context, request
+from pymongo import MongoClient, monitoring
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '100'))
+SLOW_QUERY_EXPLAIN = os.getenv(
+    'SLOW_QUERY_EXPLAIN', 'false' if os.getenv('FLASK_ENV') == 'production' else 'true'
+).lower() == 'true'
+EXPLAIN_TOP_SHAPES = int(os.getenv('SLOW_QUERY_EXPLAIN_TOP', '5'))
+EXPLAIN_DIR = os.path.join('logs', 'explain')
+
+TRACKED_COMMANDS = {'find', 'aggregate', 'count', 'distinct', 'update', 'delete', 'findAndModify', 'getMore'}
+EXPLAINABLE_COMMANDS = {'find', 'aggregate', 'count', 'distinct'}
+MAX_PENDING = 10000
+# Shapes waiting for the explain worker; further ones are dropped until it catches up
+EXPLAIN_QUEUE_SIZE = int(os.getenv('SLOW_QUERY_EXPLAIN_QUEUE', '20'))
+
+
+def query_shape(value):
+    """Replace literal values with '?' while keeping field names and operators"""
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        shapes = [query_shape(item) for item in value]
+        # $in/$or lists of scalars collapse to one placeholder
+        return shapes if any(isinstance(s, (dict, list)) for s in shapes) else '?'
+    return '?'
+
+
+def command_filter(command_name, command):
+    """The part of a command that determines index use"""
+    if command_name == 'find':
+        return command.get('filter', {})
+    if command_name in ('count', 'distinct'):
+        return command.get('query', {})
+    if command_name == 'aggregate':
+        return [stage for stage in command.get('pipeline', []) if '$match' in stage or '$sort' in stage]
+    if command_name == 'update':
+        return [update.get('q', {}) for update in command.get('updates', [])[:1]]
+    if command_name == 'delete':
+        return [delete.get('q', {}) for delete in command.get('deletes', [])[:1]]
+    if command_name == 'findAndModify':
+        return command.get('query', {})
+    return {}
+
+
+def documents_returned(command_name, reply):
+    cursor = reply.get('cursor')
+    if isinstance(cursor, dict):
+        return len(cursor.get('firstBatch', cursor.get('nextBatch', [])))
+    if command_name == 'distinct':
+        return len(reply.get('values', []))
+    if 'n' in reply:
+        return reply['n']
+    return None
+
+
+def _request_label():
+    if not has_request_context():
+        return 'background'
+    rule = request.url_rule.rule if request.url_rule is not None else request.path
+    if request.endpoint == 'manage_resources.manage_resources':
+        data = request.get_json(silent=True) or {}
+        operation = data.get('operation') if isinstance(data, dict) else None
+        if operation:
+            return f"{rule}#{operation}"
+    return rule
+
+
+def _plan_stages(plan):
+    """Every stage name in a winning plan tree"""
+    stages = []
+    while isinstance(plan, dict):
+        if 'stage' in plan:
+            stages.append(plan['stage'])
+        for key in ('inputStage', 'queryPlan'):
+            if key in plan:
+                plan = plan[key]
+                break
+        else:
+            for child in plan.get('inputStages', []):
+                stages.extend(_plan_stages(child))
+            break
+    return stages
+
+
+class SlowQueryListener(monitoring.CommandListener):
+    def __init__(self, threshold_ms=SLOW_QUERY_MS, explain=SLOW_QUERY_EXPLAIN, top_shapes=EXPLAIN_TOP_SHAPES):
+        self.threshold_ms = threshold_ms
+        self.explain_enabled = explain
+        self.top_shapes = top_shapes
+        self._pending = OrderedDict()
+        self._shape_stats = {}
+        self._lock = threading.Lock()
+        self._explain_client = None
+        self._explain_client_lock = threading.Lock()
+        self._explain_queue = queue.Queue(maxsize=EXPLAIN_QUEUE_SIZE)
+        self._explain_worker = None
+
+    def started(self, event):
+        if event.command_name not in TRACKED_COMMANDS:
+            return
+        collection = event.command.get(event.command_name) if event.command_name != 'getMore' else event.command.get('collection')
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = (
+                event.database_name, collection, event.command, _request_label()
+            )
+            if len(self._pending) > MAX_PENDING:
+                self._pending.popitem(last=False)
+
+    def _pop(self, event):
+        with self._lock:
+            return self._pending.pop((event.connection_id, event.request_id), None)
+
+    def succeeded(self, event):
+        pending = self._pop(event)
+        if pending is None:
+            return
+        duration_ms = event.duration_micros / 1000
+        if duration_ms < self.threshold_ms:
+            return
+        self._report(event.command_name, pending, duration_ms, documents_returned(event.command_name, event.reply))
+
+    def failed(self, event):
+        pending = self._pop(event)
+        if pending is None:
+            return
+        duration_ms = event.duration_micros / 1000
+        if duration_ms >= self.threshold_ms:
+            self._report(event.command_name, pending, duration_ms, None, failure=event.failure)
+
+    def _report(self, command_name, pending, duration_ms, docs, failure=None):
+        database, collection, command, endpoint = pending
+        shape = query_shape(command_filter(command_name, command))
+        shape_json = json.dumps(shape, sort_keys=True, default=str)
+        shape_key = hashlib.sha1(f"{database}.{collection}:{command_name}:{shape_json}".encode()).hexdigest()[:12]
+
+        logger.warning(
+            f"Slow Mongo {command_name} on {database}.{collection}: {duration_ms:.1f}ms, "
+            f"docs={docs if docs is not None else '-'}, shape={shape_json}, endpoint={endpoint}, "
+            f"shape_id={shape_key}" + (f", failure={failure}" if failure else "")
+        )
+
+        if not self.explain_enabled or command_name not in EXPLAINABLE_COMMANDS:
+            return
+
+        with self._lock:
+            stats = self._shape_stats.setdefault(shape_key, {
+                'database': database, 'collection': collection, 'command': command_name,
+                'shape': shape_json, 'count': 0, 'max_ms': 0.0, 'explained': False
+            })
+            stats['count'] += 1
+            stats['max_ms'] = max(stats['max_ms'], duration_ms)
+            slowest = sorted(self._shape_stats, key=lambda k: self._shape_stats[k]['max_ms'], reverse=True)
+            should_explain = not stats['explained'] and shape_key in slowest[:self.top_shapes]
+            if should_explain:
+                stats['explained'] = True
+
+        if should_explain:
+            self._start_explain_worker()
+            try:
+                self._explain_queue.put_nowait((shape_key, database, dict(command)))
+            except queue.Full:
+                # Let a later slow run of this shape try again
+                with self._lock:
+                    stats['explained'] = False
+
+    def _start_explain_worker(self):
+        with self._lock:
+            if self._explain_worker is not None:
+                return
+            self._explain_worker = threading.Thread(
+                target=self._explain_loop, name='slow-query-explain', daemon=True
+            )
+            self._explain_worker.start()
+
+    def _explain_loop(self):
+        while True:
+            self._capture_explain(*self._explain_queue.get())
+
+    def _get_explain_client(self):
+        with self._explain_client_lock:
+            if self._explain_client is None:
+                self._explain_client = MongoClient(os.getenv('MONGO_URI'), serverSelectionTimeoutMS=5000)
+            return self._explain_client
+
+    def _capture_explain(self, shape_key, database, command):
+        try:
+            explain_client = self._get_explain_client()
+            explainable = {key: value for key, value in command.items()
+                           if not key.startswith('$') and key not in ('lsid', 'txnNumber')}
+            result = explain_client[database].command('explain', explainable, verbosity='queryPlanner')
+
+            planner = result.get('queryPlanner', {})
+            if not planner and result.get('stages'):
+                planner = result['stages'][0].get('$cursor', {}).get('queryPlanner', {})
+            stages = _plan_stages(planner.get('winningPlan', {}))
+
+            os.makedirs(EXPLAIN_DIR, exist_ok=True)
+            path = os.path.join(EXPLAIN_DIR, f"{shape_key}.json")
+            with open(path, 'w') as f:
+                json.dump(result, f, indent=2, default=str)
+
+            if 'COLLSCAN' in stages:
+                logger.warning(f"Slow query shape {shape_key} on {planner.get('namespace', database)} "
+                               f"uses a collection scan ({' <- '.join(stages)}); explain saved to {path}")
+            else:
+                logger.info(f"Explain for slow query shape {shape_key}: {' <- '.join(stages) or 'unknown plan'}; saved to {path}")
+        except Exception as e:
+            logger.error(f"Failed to capture explain for shape {shape_key}: {e}")
+
+    def slowest_shapes(self, limit=10):
+        with self._lock:
+            stats = [dict(value, shape_id=key) for key, value in self._shape_stats.items()]
+        return sorted(stats, key=lambda s: s['max_ms'], reverse=True)[:limit]
+
+
+slow_query_listener = SlowQueryListener()
+_registered = False
+
+
+def register_slow_query_listener():
+    """Install the slow query listener globally; call before creating MongoClients"""
+    global _registered
+    if _registered:
+        return
+    monitoring.register(slow_query_listener)
+    _registered = True
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Columnar snapshots of the analytics collections.
+
+Writes timetables, the daily and weekly summaries and detected_conflicts to
+Parquet or Arrow IPC files with dictionary-encoded string columns, and loads
+them back through a memory map so analysts and benchmarks can run
+preprocess_data and the utilization routes without touching MongoDB.
+
+Requires pyarrow (pip install pyarrow), which is not needed by the web app.
+
+Usage:
+    python snapshots.py --out snapshots --format parquet
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+
+import pandas as pd
+from dotenv import load_dotenv
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+from process import preprocess_data
+
+load_dotenv()
+
+SNAPSHOT_DIR = os.getenv('SNAPSHOT_DIR', 'snapshots')
+SNAPSHOT_FORMATS = {
+    'parquet': '.parquet',
+    'arrow': '.arrow'
+}
+SNAPSHOT_TABLES = ['timetables', 'daily_summary', 'weekly_summary', 'detected_conflicts']
+MANIFEST_FILE = 'manifest.json'
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("pyarrow is required for snapshots. Install it with: pip install pyarrow")
+
+
+def _clean_object_columns(df):
+    """Arrow needs one type per column; coerce mixed object columns to strings"""
+    df = df.copy()
+    for col in df.select_dtypes(include='object').columns:
+        types = set(df[col].dropna().map(type))
+        if len(types) > 1:
+            df[col] = df[col].map(lambda v: None if v is None or v != v else str(v))
+    return df
+
+
+def _to_arrow_table(df):
+    """Convert a DataFrame to an Arrow table with dictionary-encoded string columns"""
+    table = pa.Table.from_pandas(_clean_object_columns(df), preserve_index=False)
+    for i, field in enumerate(table.schema):
+        if pa.types.is_string(field.type) or pa.types.is_large_string(field.type):
+            table = table.set_column(i, field.name, pc.dictionary_encode(table.column(i)))
+    return table
+
+
+def write_table(df, path, fmt='parquet'):
+    """Write one DataFrame to a Parquet or Arrow IPC file"""
+    _require_pyarrow()
+    table = _to_arrow_table(df)
+
+    if fmt == 'arrow':
+        with pa.OSFile(path, 'wb') as sink:
+            with ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+    else:
+        pq.write_table(table, path, use_dictionary=True, compression='zstd')
+
+    return table.num_rows
+
+
+def read_table(path, categorical=True):
+    """Memory-map a snapshot file back into a DataFrame.
+
+    With categorical=False dictionary columns come back as plain strings,
+    which is what preprocess_data's groupby expects.
+    """
+    _require_pyarrow()
+
+    if path.endswith(SNAPSHOT_FORMATS['arrow']):
+        with pa.memory_map(path, 'r') as source:
+            table = ipc.open_file(source).read_all()
+    else:
+        table = pq.read_table(path, memory_map=True)
+
+    df = table.to_pandas()
+    if not categorical:
+        for col in df.select_dtypes(include='category').columns:
+            df[col] = df[col].astype(object).where(df[col].notna(), None)
+    return df
+
+
+def _fetch_timetables(db, batch_size=5000):
+    return pd.DataFrame(list(db.timetables.find({}, {'_id': 0}, batch_size=batch_size)))
+
+
+def _fetch_conflicts(db, batch_size=5000):
+    docs = list(db.detected_conflicts.find({}, {'_id': 0}, batch_size=batch_size))
+    if not docs:
+        return pd.DataFrame()
+    return pd.json_normalize(docs, sep='_')
+
+
+def create_snapshot(db, out_dir=SNAPSHOT_DIR, fmt='parquet'):
+    """Snapshot the analytics collections into out_dir and write a manifest"""
+    _require_pyarrow()
+    if fmt not in SNAPSHOT_FORMATS:
+        raise ValueError(f"Unknown snapshot format: {fmt}")
+
+    os.makedirs(out_dir, exist_ok=True)
+    extension = SNAPSHOT_FORMATS[fmt]
+
+    timetables = _fetch_timetables(db)
+    frames = {'timetables': timetables}
+    if not timetables.empty:
+        _, daily_summary, weekly_summary = preprocess_data(timetables.copy())
+        frames['daily_summary'] = daily_summary
+        frames['weekly_summary'] = weekly_summary
+    frames['detected_conflicts'] = _fetch_conflicts(db)
+
+    manifest = {
+        'created_at': datetime.utcnow().isoformat(),
+        'format': fmt,
+        'tables': {}
+    }
+    for name, df in frames.items():
+        if df.empty:
+            continue
+        path = os.path.join(out_dir, f"{name}{extension}")
+        rows = write_table(df, path, fmt)
+        manifest['tables'][name] = {'file': os.path.basename(path), 'rows': rows}
+
+    with open(os.path.join(out_dir, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest
+
+
+def load_snapshot(name, snapshot_dir=SNAPSHOT_DIR, categorical=True):
+    """Load one table from the snapshot described by snapshot_dir/manifest.json"""
+    if name not in SNAPSHOT_TABLES:
+        raise ValueError(f"Unknown snapshot table: {name}")
+
+    manifest_path = os.path.join(snapshot_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        raise FileNotFoundError(f"No snapshot manifest found in {snapshot_dir}")
+
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+
+    entry = manifest['tables'].get(name)
+    if entry is None:
+        return pd.DataFrame()
+    return read_table(os.path.join(snapshot_dir, entry['file']), categorical=categorical)
+
+
+def snapshot_source_enabled() -> bool:
+    """True when TIMETABLE_SOURCE=snapshot routes reads to the snapshot files"""
+    return os.getenv('TIMETABLE_SOURCE', 'mongo').lower() == 'snapshot'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write a columnar snapshot of the analytics collections')
+    parser.add_argument('--out', default=SNAPSHOT_DIR, help='Output directory')
+    parser.add_argument('--format', choices=list(SNAPSHOT_FORMATS), default='parquet', help='File format')
+    parser.add_argument('--db', default='EduResourceDB', help='Database name')
+    args = parser.parse_args(argv)
+
+    mongo_uri = os.getenv('MONGO_URI')
+    if not mongo_uri:
+        print("Error: MONGO_URI environment variable not set")
+        return 1
+
+    from pymongo import MongoClient
+    client = MongoClient(mongo_uri)
+    try:
+        manifest = create_snapshot(client[args.db], args.out, args.format)
+    except Exception as e:
+        print(f"Error creating snapshot: {str(e)}")
+        return 1
+    finally:
+        client.close()
+
+    for name, entry in manifest['tables'].items():
+        print(f"{name}: {entry['rows']} rows -> {os.path.join(args.out, entry['file'])}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""
+Helpers for streaming large exports as NDJSON or CSV with bounded memory.
+"""
+
+import csv
+import io
+import os
+import zlib
+
+from flask import Response, request, stream_with_context
+
+from serialization import dumps
+
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', '1000'))
+# Rows buffered before a chunk is handed to the WSGI server
+EXPORT_FLUSH_ROWS = int(os.getenv('EXPORT_FLUSH_ROWS', '500'))
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+
+def iter_ndjson(rows):
+    """Yield NDJSON chunks, one document per line"""
+    buffer = []
+    for row in rows:
+        buffer.append(dumps(row))
+        if len(buffer) >= EXPORT_FLUSH_ROWS:
+            yield b'\n'.join(buffer) + b'\n'
+            buffer = []
+    if buffer:
+        yield b'\n'.join(buffer) + b'\n'
+
+
+def iter_csv(rows, fieldnames):
+    """Yield CSV chunks with a header row followed by one line per document"""
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=fieldnames, extrasaction='ignore')
+    writer.writeheader()
+
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count >= EXPORT_FLUSH_ROWS:
+            yield output.getvalue().encode('utf-8')
+            output.seek(0)
+            output.truncate(0)
+            count = 0
+
+    remaining = output.getvalue()
+    if remaining:
+        yield remaining.encode('utf-8')
+
+
+def iter_gzip(chunks):
+    """Compress a chunk iterator on the fly"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def client_accepts_gzip() -> bool:
+    """Check whether the client accepts a gzip-encoded response"""
+    accept_encoding = request.headers.get('Accept-Encoding', '')
+    return 'gzip' in accept_encoding.lower()
+
+
+def stream_export(rows, export_format, fieldnames=None, filename='export'):
+    """Build a streaming response for the rows in the requested format"""
+    if export_format == 'csv':
+        chunks = iter_csv(rows, fieldnames or [])
+    else:
+        chunks = iter_ndjson(rows)
+
+    headers = {
+        'Content-Disposition': f'attachment; filename="{filename}.{export_format}"',
+        'X-Accel-Buffering': 'no',
+        'Vary': 'Accept-Encoding'
+    }
+    if client_accepts_gzip():
+        chunks = iter_gzip(chunks)
+        headers['Content-Encoding'] = 'gzip'
+
+    return Response(
+        stream_with_context(chunks),
+        mimetype=EXPORT_FORMATS[export_format],
+        headers=headers
+    )
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Seeded synthetic timetable generator.
+
+Produces rows shaped like room_data_large.csv (Room ID, Date, Start, End,
+Room Type, Department, Year, Status, Day, Course, Instructor) at any scale,
+with a tunable number of rooms, buildings, departments and weeks, and a
+conflict rate controlling how many schedules overlap an existing booking.
+
+Usage:
+    python synthetic_data.py --rows 100000 --weeks 1 --conflict-rate 0.02 --out synthetic.csv
+"""
+
+import argparse
+import csv
+import math
+import random
+import sys
+from datetime import date, timedelta
+
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
+FIELDNAMES = ['Room ID', 'Date', 'Start', 'End', 'Room Type', 'Department',
+              'Year', 'Status', 'Day', 'Course', 'Instructor']
+
+DEPARTMENT_NAMES = [
+    'Computer Science', 'Mathematics', 'Physics', 'Chemistry', 'Biology',
+    'Environmental Science', 'Statistics', 'Actuarial Science', 'Biochemistry',
+    'Meteorology', 'Optometry', 'Food Science', 'Economics', 'Geography', 'English'
+]
+BUILDING_PREFIXES = ['SCB', 'FOSSB', 'BB', 'PB', 'CCB', 'NEB', 'ESB', 'LTB', 'KSB', 'GHB']
+FLOORS = ['GF', 'SF', 'TF', 'FF']
+ROOM_TYPES = [('Classroom', 0.7), ('Lecture Hall', 0.2), ('Laboratory', 0.1)]
+LAST_NAMES = ['Owusu', 'Gyamfi', 'Boateng', 'Aning', 'Mensah', 'Asante', 'Osei',
+              'Appiah', 'Darko', 'Agyeman', 'Amoah', 'Frimpong', 'Addo', 'Quaye']
+
+BUSINESS_START_HOUR = 8
+BUSINESS_END_HOUR = 20
+
+
+def _department_codes(n_departments):
+    codes = []
+    for i in range(n_departments):
+        name = DEPARTMENT_NAMES[i % len(DEPARTMENT_NAMES)]
+        suffix = '' if i < len(DEPARTMENT_NAMES) else f" {i // len(DEPARTMENT_NAMES) + 1}"
+        prefix = ''.join(word[0] for word in name.split()).upper()[:3]
+        codes.append((f"{name}{suffix}", f"{prefix}{i // len(DEPARTMENT_NAMES) or ''}"))
+    return codes
+
+
+def _make_room(rng, index, n_buildings):
+    prefix = BUILDING_PREFIXES[index % n_buildings % len(BUILDING_PREFIXES)]
+    building_index = index % n_buildings
+    building = prefix if building_index < len(BUILDING_PREFIXES) else f"{prefix}{building_index // len(BUILDING_PREFIXES)}"
+    floor = FLOORS[(index // n_buildings) % len(FLOORS)]
+    number = index // (n_buildings * len(FLOORS)) + 1
+
+    types, weights = zip(*ROOM_TYPES)
+    return {
+        'room_id': f"{building}-{floor}{number}",
+        'room_type': rng.choices(types, weights)[0]
+    }
+
+
+def _slot(start_hour, duration_hours):
+    """Class slots start on the hour and end five minutes before the next one"""
+    end_hour = start_hour + duration_hours - 1
+    return f"{start_hour:02d}:00", f"{end_hour:02d}:55"
+
+
+def _day_plan(rng, target):
+    """Sequential non-overlapping (start_hour, duration) slots for one room-day"""
+    plan = []
+    hour = BUSINESS_START_HOUR
+    while len(plan) < target and hour < BUSINESS_END_HOUR:
+        hour += rng.choice([0, 0, 0, 1])
+        duration = rng.choice([1, 2, 2, 3])
+        if hour + duration > BUSINESS_END_HOUR:
+            break
+        plan.append((hour, duration))
+        hour += duration
+    return plan
+
+
+def generate_timetable(n_schedules, n_rooms=None, n_buildings=10, n_departments=15,
+                       weeks=1, conflict_rate=0.02, seed=42, start_date=date(2025, 1, 20),
+                       schedules_per_day=4):
+    """
+    Generate n_schedules timetable rows.
+
+    Rooms default to however many are needed to hold n_schedules at about
+    schedules_per_day classes per room per day; with an explicit n_rooms the
+    result may hold fewer rows if the rooms fill up. Each week repeats the same
+    weekly pattern with shifted dates, like a real semester. conflict_rate is
+    the probability that a generated schedule is followed by another one that
+    overlaps it (a third of those are exact duplicates).
+    """
+    rng = random.Random(seed)
+    weeks = max(1, weeks)
+    rooms_fixed = n_rooms is not None
+
+    if n_rooms is None:
+        n_rooms = max(1, math.ceil(n_schedules / (weeks * len(DAYS) * schedules_per_day)))
+    n_buildings = max(1, min(n_buildings, n_rooms))
+
+    departments = _department_codes(max(1, n_departments))
+    course_numbers = list(range(101, 500))
+    needed_per_week = math.ceil(n_schedules / weeks)
+
+    # One weekly pattern, reused for every week
+    weekly = []
+    room_index = 0
+    while len(weekly) < needed_per_week and (room_index < n_rooms or not rooms_fixed):
+        room = _make_room(rng, room_index, n_buildings)
+        room_index += 1
+        department, code = departments[rng.randrange(len(departments))]
+
+        for day_index in range(len(DAYS)):
+            for start_hour, duration in _day_plan(rng, rng.randint(1, schedules_per_day * 2 - 1)):
+                start, end = _slot(start_hour, duration)
+                entry = {
+                    'room': room,
+                    'day_index': day_index,
+                    'start': start,
+                    'end': end,
+                    'department': department,
+                    'course': f"{code} {rng.choice(course_numbers)}",
+                    'year': rng.randint(1, 4),
+                    'instructor': f"{chr(65 + rng.randrange(26))}. {rng.choice(LAST_NAMES)}"
+                }
+                weekly.append(entry)
+
+                if rng.random() < conflict_rate:
+                    clash = dict(entry)
+                    clash['course'] = f"{code} {rng.choice(course_numbers)}"
+                    if rng.random() >= 1 / 3:
+                        # Partial overlap: a one-hour class starting inside this one
+                        shift = rng.randint(0, duration - 1) if duration > 1 else 0
+                        clash['start'], clash['end'] = _slot(start_hour + shift, 1)
+                        if clash['start'] == start and clash['end'] == end:
+                            clash['end'] = f"{start_hour:02d}:30"
+                    weekly.append(clash)
+
+    # Interleave rooms so truncating to n_schedules still covers every day
+    rng.shuffle(weekly)
+
+    rows = []
+    for week in range(weeks):
+        week_start = start_date + timedelta(weeks=week)
+        for entry in weekly:
+            if len(rows) >= n_schedules:
+                return rows
+            rows.append({
+                'Room ID': entry['room']['room_id'],
+                'Date': (week_start + timedelta(days=entry['day_index'])).isoformat(),
+                'Start': entry['start'],
+                'End': entry['end'],
+                'Room Type': entry['room']['room_type'],
+                'Department': entry['department'],
+                'Year': entry['year'],
+                'Status': 'Booked',
+                'Day': DAYS[entry['day_index']],
+                'Course': entry['course'],
+                'Instructor': entry['instructor']
+            })
+    return rows
+
+
+def write_csv(rows, path):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate a synthetic timetable CSV')
+    parser.add_argument('--rows', type=int, default=10000, help='Number of schedules')
+    parser.add_argument('--rooms', type=int, default=None, help='Number of rooms (default: derived from rows)')
+    parser.add_argument('--buildings', type=int, default=10, help='Number of buildings')
+    parser.add_argument('--departments', type=int, default=15, help='Number of departments')
+    parser.add_argument('--weeks', type=int, default=1, help='Weeks of dated schedules')
+    parser.add_argument('--conflict-rate', type=float, default=0.02, help='Probability of an overlapping booking')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed')
+    parser.add_argument('--out', default='synthetic_timetable.csv', help='Output CSV path')
+    args = parser.parse_args(argv)
+
+    rows = generate_timetable(
+        args.rows,
+        n_rooms=args.rooms,
+        n_buildings=args.buildings,
+        n_departments=args.departments,
+        weeks=args.weeks,
+        conflict_rate=args.conflict_rate,
+        seed=args.seed
+    )
+    write_csv(rows, args.out)
+    print(f"Wrote {len(rows)} schedules to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""
+Time string helpers shared by the manage_resources view and the timetable importer.
+
+Kept free of database connections so offline tools can import them without
+touching MongoDB.
+"""
+
+from tracing import get_tracer
+
+# Events stay under the manage_resources tracer so TRACE_MODULES=manage_resources still covers them
+_trace = get_tracer('manage_resources')
+
+
+def validate_time_format(time_str):
+   
+    if not isinstance(time_str, str):
+        return False
+    
+    # Check if time_str contains ':'
+    if ':' not in time_str:
+        return False
+    
+    parts = time_str.split(':')
+    if len(parts) != 2:
+        return False
+    
+    hours_str, minutes_str = parts
+    
+    
+    if not (hours_str.isdigit() and minutes_str.isdigit()):
+        return False
+    
+    try:
+        hours, minutes = int(hours_str), int(minutes_str)
+        # Validate range
+        if not (0 <= hours <= 23 and 0 <= minutes <= 59):
+            return False
+        return True
+    except ValueError:
+        return False
+
+def normalize_time_format(time_str):
+   
+    if not time_str or not isinstance(time_str, str):
+        return None
+    
+    # Remove extra whitespace
+    time_str = str(time_str).strip()
+    
+    # If it's already empty or None-like, return None
+    if not time_str or time_str.lower() in ['none', 'null', 'nan', '']:
+        return None
+    
+    try:
+        # Handle combined time format (e.g., "08:00–10:00")
+        if '–' in time_str or '-' in time_str:
+            # Extract just the start time
+            parts = time_str.replace('–', '-').split('-')
+            if len(parts) >= 2:
+                # Take the first part as the start time
+                time_str = parts[0].strip()
+        
+        # Remove common time suffixes
+        time_str = time_str.replace('hrs', '').replace('hr', '').replace('h', '').strip()
+        
+        # Handle formats without colons
+        if ':' not in time_str:
+            if time_str.isdigit():
+                if len(time_str) == 1:  # "8" -> "08:00"
+                    time_str = f"0{time_str}:00"
+                elif len(time_str) == 2:  # "14" -> "14:00"
+                    time_str = f"{time_str}:00"
+                elif len(time_str) == 3:  # "830" -> "08:30"
+                    time_str = f"0{time_str[0]}:{time_str[1:]}"
+                elif len(time_str) == 4:  # "1430" -> "14:30"
+                    time_str = f"{time_str[:2]}:{time_str[2:]}"
+        
+        # Handle formats with dots
+        if '.' in time_str:
+            time_str = time_str.replace('.', ':')
+        
+        # Handle formats with spaces (e.g., "8 30" -> "08:30")
+        if ' ' in time_str:
+            parts = time_str.split()
+            if len(parts) == 2 and parts[0].isdigit() and parts[1].isdigit():
+                time_str = f"{parts[0]}:{parts[1]}"
+        
+        # Ensure HH:MM format with leading zeros
+        if ':' in time_str:
+            parts = time_str.split(':')
+            if len(parts) >= 2:
+                hour = parts[0].zfill(2)  # Add leading zero if needed
+                minute = parts[1].zfill(2)  # Add leading zero if needed
+                
+                # Validate hour and minute ranges
+                if 0 <= int(hour) <= 23 and 0 <= int(minute) <= 59:
+                    normalized = f"{hour}:{minute}"
+                    if _trace.enabled:
+                        _trace.event('time_normalized', raw=time_str, normalized=normalized)
+                    return normalized
+        
+        if _trace.enabled:
+            _trace.event('time_not_normalized', raw=time_str)
+        return None
+        
+    except (ValueError, IndexError, AttributeError) as e:
+        if _trace.enabled:
+            _trace.event('time_normalize_error', raw=time_str, error=str(e))
+        return None
@@ -0,0 +1,193 @@
+"""
+In-memory revocation index for admin tokens.
+
+Logout, password change and the admin maintenance scripts end sessions by
+setting is_active False on admin_sessions rows. Honoring that used to need
+a database read per request. The revoked JTIs of those sessions' access and
+refresh tokens now live in a set, and Flask-JWT-Extended's blocklist loader
+checks every protected request against it with one dict lookup.
+
+The set is loaded from admin_sessions at startup and updated directly by
+revocations made in this process. Other workers' and scripts' revocations
+arrive by polling admin_sessions every REVOCATION_SYNC_SECONDS. With
+REVOCATION_CHANGE_STREAM=true they arrive through a change stream instead
+(needs a replica set), falling back to polling if the stream fails. Entries
+are dropped once the token they block has expired.
+
+This is the process's only admin_sessions poller: every session it sees end
+is also passed to the listeners added with add_session_listener, which is
+how the admin identity cache learns about other workers' invalidations.
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import jwt as pyjwt
+from flask import jsonify
+
+logger = logging.getLogger(__name__)
+
+REVOCATION_SYNC_SECONDS = float(os.getenv('REVOCATION_SYNC_SECONDS', '15'))
+REVOCATION_CHANGE_STREAM = os.getenv('REVOCATION_CHANGE_STREAM', 'false').lower() == 'true'
+# Refresh tokens live 30 days by default, so older ended sessions cannot hold a usable token
+REVOCATION_LOOKBACK_DAYS = int(os.getenv('REVOCATION_LOOKBACK_DAYS', '31'))
+
+SESSION_PROJECTION = {
+    'admin_id': 1, 'token': 1, 'refresh_token': 1, 'expires_at': 1, 'invalidated_at': 1, 'logged_out_at': 1
+}
+
+
+def _token_claims(token):
+    """jti and exp of a stored token, without verifying it (it may have expired)"""
+    try:
+        claims = pyjwt.decode(token, options={'verify_signature': False, 'verify_exp': False})
+        return claims.get('jti'), claims.get('exp')
+    except Exception:
+        return None, None
+
+
+class RevocationSet:
+    def __init__(self):
+        self._revoked = {}  # jti -> expiry epoch, or None when the token never expires
+        self._lock = threading.Lock()
+        self._last_sync = None
+        self._sync_started = False
+        self._session_listeners = []
+
+    def revoke(self, jti, expires_at=None):
+        if not jti:
+            return
+        with self._lock:
+            self._revoked[jti] = expires_at
+
+    def is_revoked(self, jti) -> bool:
+        return jti in self._revoked
+
+    def revoke_session(self, session):
+        """Revoke the access and refresh tokens stored on an admin_sessions row"""
+        fallback = session.get('expires_at')
+        fallback = fallback.replace(tzinfo=timezone.utc).timestamp() if fallback else None
+        for field in ('token', 'refresh_token'):
+            if session.get(field):
+                jti, exp = _token_claims(session[field])
+                self.revoke(jti, exp or fallback)
+
+    def add_session_listener(self, listener):
+        """Call listener(session) for every session the sync or change stream sees end"""
+        self._session_listeners.append(listener)
+
+    def _session_ended(self, session):
+        self.revoke_session(session)
+        for listener in self._session_listeners:
+            try:
+                listener(session)
+            except Exception as e:
+                logger.error(f"Session listener failed: {e}")
+
+    def prune(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [jti for jti, exp in self._revoked.items() if exp is not None and exp < now]
+            for jti in expired:
+                del self._revoked[jti]
+        return len(expired)
+
+    def load(self, sessions_collection) -> int:
+        """Revoke every recently ended session; called once at startup"""
+        started = datetime.utcnow()
+        cutoff = started - timedelta(days=REVOCATION_LOOKBACK_DAYS)
+        count = 0
+        for session in sessions_collection.find(
+            {'is_active': False, 'created_at': {'$gt': cutoff}}, SESSION_PROJECTION
+        ):
+            self.revoke_session(session)
+            count += 1
+        self._last_sync = started
+        self.prune()
+        return count
+
+    def sync(self, sessions_collection) -> int:
+        """Revoke sessions ended since the last load or sync"""
+        since, now = self._last_sync, datetime.utcnow()
+        count = 0
+        for session in sessions_collection.find(
+            {'$or': [{'invalidated_at': {'$gt': since}}, {'logged_out_at': {'$gt': since}}]},
+            SESSION_PROJECTION
+        ):
+            self._session_ended(session)
+            count += 1
+        self._last_sync = now
+        self.prune()
+        return count
+
+    def _watch(self, sessions_collection):
+        pipeline = [{'$match': {
+            'operationType': 'update',
+            'updateDescription.updatedFields.is_active': False
+        }}]
+        with sessions_collection.watch(pipeline, full_document='updateLookup') as stream:
+            for change in stream:
+                if change.get('fullDocument'):
+                    self._session_ended(change['fullDocument'])
+
+    def start_sync(self, sessions_collection, interval=REVOCATION_SYNC_SECONDS):
+        """Keep the set current from other processes in a daemon thread (once per process)"""
+        with self._lock:
+            if self._sync_started:
+                return
+            self._sync_started = True
+
+        stop = threading.Event()
+
+        def _loop():
+            if REVOCATION_CHANGE_STREAM:
+                try:
+                    self._watch(sessions_collection)
+                except Exception as e:
+                    logger.warning(f"Session change stream unavailable, polling instead: {e}")
+            while not stop.wait(interval):
+                try:
+                    self.sync(sessions_collection)
+                except Exception as e:
+                    logger.error(f"Token revocation sync failed: {e}")
+
+        threading.Thread(target=_loop, name='token-revocation-sync', daemon=True).start()
+
+    def stats(self):
+        with self._lock:
+            return {'revoked': len(self._revoked), 'last_sync': self._last_sync}
+
+
+revocation_set = RevocationSet()
+
+
+def init_token_revocation(app, jwt_manager, db):
+    """Check every protected request against the revocation set"""
+
+    @jwt_manager.token_in_blocklist_loader
+    def _token_revoked(jwt_header, jwt_payload):
+        return revocation_set.is_revoked(jwt_payload.get('jti'))
+
+    @jwt_manager.revoked_token_loader
+    def _revoked_token_response(jwt_header, jwt_payload):
+        return jsonify({
+            "status": "error",
+            "error": "Token revoked",
+            "message": "This session has ended; please log in again"
+        }), 401
+
+    if db is None:
+        return
+    sessions = db.admin_sessions
+    try:
+        sessions.create_index([('is_active', 1), ('created_at', -1)])
+        sessions.create_index([('invalidated_at', 1)], sparse=True)
+        sessions.create_index([('logged_out_at', 1)], sparse=True)
+        loaded = revocation_set.load(sessions)
+        app.logger.info(f"Loaded {loaded} ended admin sessions into the revocation set")
+    except Exception as e:
+        app.logger.error(f"Failed to load revoked sessions: {e}")
+    revocation_set.start_sync(sessions)
@@ -0,0 +1,131 @@
+"""
+Structured debug tracing for hot code paths.
+
+Call sites guard on the tracer so a disabled trace costs one attribute check
+and never formats its message:
+
+    _trace = get_tracer(__name__)
+    if _trace.enabled:
+        _trace.event('overlap_check', slot1=..., slot2=..., result=...)
+
+Tracing turns on in two ways:
+  - per module, with TRACE_MODULES=manage_resources,conflict_detector (or *)
+  - per request, with an X-Trace: 1 header. This is allowed outside
+    production, or for admin access tokens, once init_tracing(app) is
+    registered.
+
+Events go to the "trace.<module>" logger at INFO level. Traced requests also
+get an X-Trace-Id header that tags every event they produced.
+"""
+
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import threading
+import uuid
+
+TRACE_MODULES = {m.strip() for m in os.getenv('TRACE_MODULES', '').split(',') if m.strip()}
+TRACE_HEADER = 'X-Trace'
+ADMIN_ROLES = ('admin', 'super_admin')
+
+# Trace id of the current request when it asked for tracing, else None
+_request_trace = contextvars.ContextVar('request_trace', default=None)
+# Number of requests currently tracing; lets disabled tracers skip the context lookup
+_active_requests = 0
+_active_lock = threading.Lock()
+
+_tracers = {}
+
+
+class Tracer:
+    __slots__ = ('name', 'module_enabled', 'logger')
+
+    def __init__(self, name):
+        self.name = name
+        self.module_enabled = '*' in TRACE_MODULES or name in TRACE_MODULES
+        self.logger = logging.getLogger(f"trace.{name}")
+
+    @property
+    def enabled(self):
+        return self.module_enabled or (_active_requests > 0 and _request_trace.get() is not None)
+
+    def event(self, name, **fields):
+        trace_id = _request_trace.get()
+        if trace_id is not None:
+            fields['trace_id'] = trace_id
+        self.logger.info(f"{name} {json.dumps(fields, default=str)}")
+
+
+def get_tracer(name):
+    """Shared tracer for a module; accepts __name__"""
+    name = name.rsplit('.', 1)[-1]
+    tracer = _tracers.get(name)
+    if tracer is None:
+        tracer = _tracers[name] = Tracer(name)
+    return tracer
+
+
+def set_module_tracing(name, enabled):
+    """Turn a module's tracing on or off at runtime"""
+    get_tracer(name).module_enabled = enabled
+
+
+def _adjust_active(delta):
+    global _active_requests
+    with _active_lock:
+        _active_requests += delta
+
+
+@contextlib.contextmanager
+def traced(trace_id=None):
+    """Trace everything in this block as if it were a traced request"""
+    token = _request_trace.set(trace_id or uuid.uuid4().hex[:12])
+    _adjust_active(1)
+    try:
+        yield _request_trace.get()
+    finally:
+        _adjust_active(-1)
+        _request_trace.reset(token)
+
+
+def _request_may_trace():
+    if os.getenv('FLASK_ENV') != 'production':
+        return True
+    try:
+        from flask_jwt_extended import get_jwt, verify_jwt_in_request
+        verify_jwt_in_request(optional=True)
+        return get_jwt().get('role') in ADMIN_ROLES
+    except Exception:
+        return False
+
+
+def init_tracing(app):
+    """Enable per-request tracing through the X-Trace header"""
+    from flask import g, request
+
+    @app.before_request
+    def _start_request_trace():
+        if request.headers.get(TRACE_HEADER) != '1' or not _request_may_trace():
+            return
+        g._trace_token = _request_trace.set(uuid.uuid4().hex[:12])
+        _adjust_active(1)
+
+    @app.after_request
+    def _tag_traced_response(response):
+        trace_id = _request_trace.get()
+        if trace_id is not None and '_trace_token' in g:
+            response.headers['X-Trace-Id'] = trace_id
+        return response
+
+    @app.teardown_request
+    def _end_request_trace(error=None):
+        token = g.pop('_trace_token', None)
+        if token is None:
+            return
+        _adjust_active(-1)
+        try:
+            _request_trace.reset(token)
+        except ValueError:
+            _request_trace.set(None)
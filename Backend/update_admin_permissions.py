@@ -4,6 +4,7 @@ Script to update admin.manager user permissions to include booking:create
 """
 
 import os
+from datetime import datetime
 from pymongo import MongoClient
 from dotenv import load_dotenv
 
@@ -55,6 +56,11 @@ def update_admin_permissions():
         )
         
         if result.modified_count > 0:
+            # Running app workers drop cached identities and stale token claims for this admin
+            db.admin_sessions.update_many(
+                {'admin_id': str(user['_id']), 'is_active': True},
+                {'$set': {'is_active': False, 'invalidated_at': datetime.utcnow(), 'invalidation_reason': 'permissions_changed'}}
+            )
             print("✅ Successfully updated admin.manager permissions!")
             print(f"New permissions: {updated_permissions}")
         else:
@@ -930,6 +930,19 @@ export class AdminDashboardComponent implements OnInit, OnDestroy, AfterViewInit
   viewConflictDetails(notification: Notification): void {
     console.log('📋 Viewing conflict details for notification:', notification.id);
 
+    // Older and locally created notifications carry their conflicts inline
+    if (notification.data?.conflicts) {
+      this.showConflictDetails(notification);
+      return;
+    }
+
+    this.notificationService.getNotificationDetails(notification.id).subscribe({
+      next: (detailed) => this.showConflictDetails(detailed),
+      error: (error) => console.error('Failed to load conflict details:', error)
+    });
+  }
+
+  private showConflictDetails(notification: Notification): void {
     if (!notification.data?.conflicts) {
       console.warn('No conflict data available in notification');
       return;
@@ -1005,6 +1018,14 @@ export class AdminDashboardComponent implements OnInit, OnDestroy, AfterViewInit
       detailsMessage += `⚠️ ... and ${conflictCount - 5} more conflicts (showing first 5 only)\n\n`;
     }
 
+    if (notification.data.recommended_actions?.length > 0) {
+      detailsMessage += `🔧 RECOMMENDED ACTIONS (${notification.data.severity}):\n`;
+      notification.data.recommended_actions.forEach((action: string, index: number) => {
+        detailsMessage += `${index + 1}. ${action}\n`;
+      });
+      detailsMessage += `\n`;
+    }
+
     detailsMessage += `🔧 RECOMMENDED ADMINISTRATIVE ACTIONS:\n`;
     detailsMessage += `1. 📞 Contact affected departments immediately\n`;
     detailsMessage += `2. 👨‍🏫 Notify lecturers of scheduling conflicts\n`;
@@ -1,7 +1,7 @@
 import { Injectable } from '@angular/core';
 import { HttpClient, HttpHeaders } from '@angular/common/http';
 import { BehaviorSubject, Observable, interval } from 'rxjs';
-import { switchMap, tap, catchError } from 'rxjs/operators';
+import { switchMap, tap, catchError, map } from 'rxjs/operators';
 import { environment } from '../../environments/environment';
 import { SecurityService } from './security.service';
 
@@ -14,6 +14,7 @@ export interface Notification {
   read: boolean;
   created_at: string;
   time_ago: string;
+  deleted?: boolean;
 }
 
 export interface NotificationResponse {
@@ -21,6 +22,14 @@ export interface NotificationResponse {
   unread_count: number;
 }
 
+export interface NotificationChangesResponse {
+  changed: boolean;
+  resync: boolean;
+  notifications: Notification[];
+  unread_count?: number;
+  server_time: string;
+}
+
 @Injectable({
   providedIn: 'root'
 })
@@ -34,6 +43,12 @@ export class NotificationService {
   private readonly apiUrl = environment.apiUrl || 'http://localhost:5000';
   private pollingInterval = 30000; // 30 seconds
   private pollingSubscription: any;
+  private eventSource: EventSource | null = null;
+  private streamTicketSubscription: any = null;
+  private streamRetryTimer: any = null;
+  private streamFailures = 0;
+  private readonly maxStreamFailures = 3;
+  private lastSync: string | null = null;
 
   constructor(private http: HttpClient, private securityService: SecurityService) {
     // Don't start polling automatically - wait for user authentication
@@ -95,6 +110,24 @@ export class NotificationService {
     );
   }
 
+  /**
+   * Get one notification with its full details (conflicts are expanded on the server)
+   */
+  getNotificationDetails(notificationId: string): Observable<Notification> {
+    const headers = this.getAuthHeaders();
+    if (!headers) {
+      return new Observable(subscriber => {
+        subscriber.complete();
+      });
+    }
+
+    return this.http.get<{ notification: Notification }>(
+      `${this.apiUrl}/admin/notifications/${notificationId}/details`, { headers }
+    ).pipe(
+      map(response => response.notification)
+    );
+  }
+
   /**
    * Mark a notification as read
    */
@@ -195,24 +228,178 @@ export class NotificationService {
   }
 
   /**
-   * Start polling for notifications (call this after user login)
+   * Get only the notifications that changed since the last check
+   */
+  getChanges(): Observable<NotificationChangesResponse> {
+    const headers = this.getAuthHeaders();
+    if (!headers) {
+      return new Observable(subscriber => {
+        subscriber.complete();
+      });
+    }
+
+    const params: { [key: string]: string } = this.lastSync ? { since: this.lastSync } : {};
+
+    return this.http.get<NotificationChangesResponse>(`${this.apiUrl}/admin/notifications/changes`, {
+      params,
+      headers
+    }).pipe(
+      tap(response => {
+        if (!this.lastSync || response.resync) {
+          // The first check, or one too far behind for a diff, returns the full list
+          this.notificationsSubject.next(response.notifications);
+        } else {
+          response.notifications.forEach(notification => this.upsertNotification(notification));
+        }
+        if (response.unread_count !== undefined) {
+          this.unreadCountSubject.next(response.unread_count);
+        }
+        this.lastSync = response.server_time;
+      }),
+      catchError(error => {
+        if (error.status === 401) {
+          console.log('🔐 Authentication error - token may be expired');
+          this.notificationsSubject.next([]);
+          this.unreadCountSubject.next(0);
+        }
+        return [];
+      })
+    );
+  }
+
+  /**
+   * Start receiving notification updates (call this after user login).
+   * Uses the server-sent event stream, falling back to polling for changes.
    */
   startPolling(): void {
-    if (this.pollingSubscription) {
-      this.stopPolling();
+    this.stopPolling();
+
+    if (typeof EventSource === 'undefined') {
+      this.startChangesPolling();
+    } else {
+      this.openStream();
     }
-    
-    this.pollingSubscription = interval(this.pollingInterval).pipe(
-      switchMap(() => this.getNotifications())
-    ).subscribe();
   }
 
   /**
-   * Stop polling
+   * Stop receiving notification updates
    */
   stopPolling(): void {
+    if (this.streamTicketSubscription) {
+      this.streamTicketSubscription.unsubscribe();
+      this.streamTicketSubscription = null;
+    }
+    if (this.streamRetryTimer) {
+      clearTimeout(this.streamRetryTimer);
+      this.streamRetryTimer = null;
+    }
+    this.streamFailures = 0;
+    if (this.eventSource) {
+      this.eventSource.close();
+      this.eventSource = null;
+    }
     if (this.pollingSubscription) {
       this.pollingSubscription.unsubscribe();
+      this.pollingSubscription = null;
+    }
+  }
+
+  private openStream(): void {
+    const headers = this.getAuthHeaders();
+    if (!headers) {
+      this.startChangesPolling();
+      return;
+    }
+
+    // EventSource cannot send an Authorization header, so the stream URL carries a
+    // short-lived ticket that only opens the stream instead of the access token
+    this.streamTicketSubscription = this.http.post<{ ticket: string }>(
+      `${this.apiUrl}/admin/notifications/stream-ticket`, {}, { headers }
+    ).subscribe({
+      next: response => {
+        this.streamTicketSubscription = null;
+        this.connectStream(response.ticket);
+      },
+      error: () => {
+        this.streamTicketSubscription = null;
+        this.startChangesPolling();
+      }
+    });
+  }
+
+  private connectStream(ticket: string): void {
+    const source = new EventSource(`${this.apiUrl}/admin/notifications/stream?ticket=${encodeURIComponent(ticket)}`);
+
+    source.addEventListener('open', () => {
+      this.streamFailures = 0;
+    });
+
+    source.addEventListener('notification', (event: MessageEvent) => {
+      this.upsertNotification(JSON.parse(event.data));
+    });
+    source.addEventListener('unread_count', (event: MessageEvent) => {
+      this.unreadCountSubject.next(JSON.parse(event.data).unread_count);
+    });
+    source.addEventListener('read', (event: MessageEvent) => {
+      const ids: string[] = JSON.parse(event.data).ids;
+      this.notificationsSubject.next(this.notificationsSubject.value.map(notification =>
+        ids.includes(notification.id) ? { ...notification, read: true } : notification
+      ));
+    });
+    source.addEventListener('read_all', () => {
+      this.notificationsSubject.next(this.notificationsSubject.value.map(notification => ({
+        ...notification,
+        read: true
+      })));
+    });
+
+    source.onerror = () => {
+      if (this.eventSource !== source) {
+        return;
+      }
+      // The ticket has expired by the time the browser would reconnect, so reopen with a fresh one
+      source.close();
+      this.eventSource = null;
+      this.streamFailures++;
+      if (this.streamFailures >= this.maxStreamFailures) {
+        console.log('Notification stream unavailable, polling for changes instead');
+        this.startChangesPolling();
+        return;
+      }
+      this.streamRetryTimer = setTimeout(() => {
+        this.streamRetryTimer = null;
+        this.openStream();
+      }, 5000);
+    };
+
+    this.eventSource = source;
+  }
+
+  private startChangesPolling(): void {
+    if (this.pollingSubscription) {
+      return;
+    }
+
+    this.pollingSubscription = interval(this.pollingInterval).pipe(
+      switchMap(() => this.getChanges())
+    ).subscribe();
+  }
+
+  private upsertNotification(notification: Notification): void {
+    const notifications = this.notificationsSubject.value;
+    if (notification.deleted) {
+      // Tombstone for a notification the server expired
+      this.notificationsSubject.next(notifications.filter(existing => existing.id !== notification.id));
+      return;
+    }
+    const index = notifications.findIndex(existing => existing.id === notification.id);
+
+    if (index === -1) {
+      this.notificationsSubject.next([notification, ...notifications]);
+    } else {
+      const updated = [...notifications];
+      updated[index] = notification;
+      this.notificationsSubject.next(updated);
     }
   }
 
@@ -262,6 +449,7 @@ export class NotificationService {
   clearNotifications(): void {
     this.notificationsSubject.next([]);
     this.unreadCountSubject.next(0);
+    this.lastSync = null;
   }
 
   /**